@@ -1,50 +1,1772 @@
-import speech_recognition as sr
-import pyttsx3
 import datetime
 import json
 import sqlite3
-import requests
 import random
+import importlib
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import threading
-import schedule
 import time
+import re
+import sys
+import socket
+import argparse
+import asyncio
+import math
+import hashlib
+import unicodedata
+import os
+import shutil
+import subprocess
+import queue
+import heapq
+import atexit
+import signal
+import bisect
+import itertools
+import csv
+import glob
+import wave
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+class LazyModule:
+    """Stand-in for a heavy module that is imported on first attribute access"""
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+    
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+# Audio stacks are only imported once speech I/O is actually used
+sr = LazyModule('speech_recognition')
+pyttsx3 = LazyModule('pyttsx3')
+np = LazyModule('numpy')
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'knowledge')
+RECIPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'recipes.csv')
+VOCAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'vocab')
+# Built artifacts go in the user's cache directory, wherever the assistant is started from
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                         'ai-assistant')
+KNOWLEDGE_CACHE_DIR = os.path.join(CACHE_DIR, 'knowledge')
+TTS_CACHE_DIR = os.path.join(CACHE_DIR, 'tts')
+
+# Intent Router
+@dataclass(slots=True)
+class Intent:
+    name: str
+    confidence: float
+    score: float
+
+class IntentRouter:
+    """Keyword intent router built once and scored in a single pass over the utterance"""
+
+    TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+    SUFFIXES = ('ing', 'es', 'ed', 's')
+    MAX_CACHED_TOKENS = 50000
 
-class VoiceAssistant:
     def __init__(self):
-        # Initialize speech recognition and text-to-speech
+        self.index = {}  # keyword -> list of (intent, weight)
+        self.intents = []  # declaration order doubles as the tie-breaker
+        self.fallback_intents = {}  # keyword -> intent, only used when no module scored
+        self.token_cache = {}  # token -> resolved postings, so suffix stripping runs once per word
+
+    def add_intent(self, name, keywords, weak_keywords=(), weak_weight=0.5):
+        """Register an intent with its trigger keywords"""
+        self.intents.append(name)
+        self.token_cache.clear()
+        for keyword in keywords:
+            self.index.setdefault(keyword, []).append((name, 1.0))
+        for keyword in weak_keywords:
+            self.index.setdefault(keyword, []).append((name, weak_weight))
+
+    def add_fallback(self, name, keywords):
+        """Register an intent that only wins when no other intent matched"""
+        for keyword in keywords:
+            self.fallback_intents[keyword] = name
+
+    def lookup(self, token):
+        """Return index postings for a token, trying simple suffix stripping on a miss"""
+        postings = self.index.get(token)
+        if postings is not None:
+            return postings
+        for suffix in self.SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                postings = self.index.get(token[:-len(suffix)])
+                if postings is not None:
+                    return postings
+        return ()
+
+    def route(self, command):
+        """Score every intent in one pass and return the best Intent, or None"""
+        scores = {}
+        fallback = None
+        cache = self.token_cache
+        for token in self.TOKEN_PATTERN.findall(command.lower()):
+            postings = cache.get(token)
+            if postings is None:
+                postings = self.lookup(token)
+                if len(cache) < self.MAX_CACHED_TOKENS:
+                    cache[token] = postings
+            if postings:
+                for name, weight in postings:
+                    scores[name] = scores.get(name, 0.0) + weight
+            elif fallback is None:
+                fallback = self.fallback_intents.get(token)
+
+        if not scores:
+            if fallback is not None:
+                return Intent(fallback, 1.0, 0.0)
+            return None
+
+        if len(scores) == 1:
+            name, score = scores.popitem()
+            return Intent(name, 1.0, score)
+
+        best = None
+        for name in self.intents:
+            if name in scores and (best is None or scores[name] > scores[best]):
+                best = name
+        best_score = scores[best]
+        return Intent(best, best_score / sum(scores.values()), best_score)
+
+# Ambient Noise Calibration
+def frame_rms(frame_data, sample_width):
+    """Root-mean-square energy of raw little-endian PCM frames"""
+    typecode = {1: 'b', 2: 'h', 4: 'i'}[sample_width]
+    samples = array(typecode, frame_data[:len(frame_data) - len(frame_data) % sample_width])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(x * x for x in samples) / len(samples))
+
+class NoiseCalibrator:
+    """Calibrate the energy threshold once, then track ambient noise from captured audio.
+    
+    recognizer.listen() keeps non_speaking_duration seconds of audio before the phrase
+    starts, so the head of every capture is ambient noise we already paid for. Its energy
+    feeds a rolling estimate of the noise floor, and the full blocking calibration only
+    runs again once that estimate drifts more than `tolerance` away from the last one.
+    """
+    def __init__(self, recognizer, duration=1.0, smoothing=0.2, tolerance=0.5):
+        self.recognizer = recognizer
+        self.duration = duration
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.baseline = None  # ambient energy at the last full calibration
+        self.ambient = None  # rolling ambient energy estimate
+        self.needs_calibration = True
+        self.calibrations = 0
+        # The rolling estimate replaces the library's own per-listen adjustment
+        recognizer.dynamic_energy_threshold = False
+    
+    def calibrate(self, source):
+        """Full calibration against live ambient audio"""
+        self.recognizer.adjust_for_ambient_noise(source, duration=self.duration)
+        self.baseline = self.ambient = self.recognizer.energy_threshold / self.recognizer.dynamic_energy_ratio
+        self.needs_calibration = False
+        self.calibrations += 1
+    
+    def ensure_calibrated(self, source):
+        if self.needs_calibration:
+            self.calibrate(source)
+    
+    def observe(self, audio):
+        """Update the noise estimate from the leading silence of a captured utterance"""
+        if self.baseline is None:
+            return
+        leading_bytes = int(audio.sample_rate * self.recognizer.non_speaking_duration / 2) * audio.sample_width
+        self.update(frame_rms(audio.frame_data[:leading_bytes], audio.sample_width))
+    
+    def update(self, energy):
+        """Fold one ambient energy measurement into the rolling estimate"""
+        if self.baseline is None or energy <= 0:
+            return
+        self.ambient += self.smoothing * (energy - self.ambient)
+        self.recognizer.energy_threshold = self.ambient * self.recognizer.dynamic_energy_ratio
+        if abs(self.ambient - self.baseline) > self.tolerance * self.baseline:
+            self.needs_calibration = True
+
+# Voice Activity Detection
+class VoiceActivityDetector:
+    """Frame-level endpointing on raw PCM, so only the speech itself reaches the recognizer.
+    
+    Audio is cut into `frame_ms` frames with NumPy RMS energy and zero-crossing rate. A frame
+    is speech when its energy clears `ratio` times the noise floor, or when it is quieter but
+    crosses zero often (fricatives such as "s" and "f"). Speech starts after `min_speech`
+    seconds of speech frames and ends after `end_silence` seconds without any; the segment
+    is kept with `padding` on either side. The noise floor follows the frames heard before
+    speech starts. recognizer.listen() instead waits pause_threshold (0.8 s) of quiet, in
+    64 ms chunks, and keeps up to half a second of silence at each end.
+    
+    feed() takes audio in pieces of any size, as it arrives; trim() runs it over a whole clip.
+    """
+    DTYPES = {1: 'int8', 2: '<i2', 4: '<i4'}
+    FRICATIVE_RATIO = 2.0  # energy over the floor needed by a frame that qualifies on zero crossings
+    FRICATIVE_ZCR = 0.25  # zero crossings per sample; voiced speech sits well below, hiss above
+    END_SILENCE = 0.35
+    
+    def __init__(self, sample_rate=16000, sample_width=2, noise_floor=None, frame_ms=20, ratio=3.0,
+                 min_speech=0.08, end_silence=None, padding=0.15, smoothing=0.05):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * sample_width
+        self.frame_seconds = frame_ms / 1000
+        self.floor = noise_floor  # set from the first frame when not given
+        self.ratio = ratio
+        self.min_frames = max(1, round(min_speech / self.frame_seconds))
+        self.end_frames = max(1, round((end_silence or self.END_SILENCE) / self.frame_seconds))
+        self.pad_frames = round(padding / self.frame_seconds)
+        self.smoothing = smoothing
+        self.audio = bytearray()  # frames from `offset` on: pre-speech audio is dropped beyond the padding
+        self.offset = 0  # index of the first frame still in `audio`
+        self.frames = 0  # frames classified so far
+        self.run = 0  # consecutive speech frames while waiting for speech to start
+        self.start = None  # first speech frame
+        self.last = None  # last speech frame
+        self.ended = False
+    
+    def features(self, data):
+        """RMS energy and zero-crossing rate of each whole frame in data"""
+        samples = np.frombuffer(data, dtype=self.DTYPES[self.sample_width]).astype(np.float32)
+        samples = samples.reshape(-1, self.frame_bytes // self.sample_width)
+        energy = np.sqrt(np.mean(samples * samples, axis=1))
+        crossings = np.count_nonzero(np.diff(np.signbit(samples), axis=1), axis=1) / samples.shape[1]
+        return energy.tolist(), crossings.tolist()
+    
+    def feed(self, data):
+        """Classify the whole frames now available; returns True once speech has ended"""
+        self.audio += data
+        classified = (self.frames - self.offset) * self.frame_bytes
+        count = (len(self.audio) - classified) // self.frame_bytes
+        if self.ended or not count:
+            return self.ended
+        energies, crossings = self.features(self.audio[classified:classified + count * self.frame_bytes])
+        if self.floor is None:
+            self.floor = max(energies[0], 1.0)
+        for energy, zcr in zip(energies, crossings):
+            speech = energy > self.ratio * self.floor or (energy > self.FRICATIVE_RATIO * self.floor
+                                                           and zcr > self.FRICATIVE_ZCR)
+            if self.start is None:
+                if speech:
+                    self.run += 1
+                    if self.run >= self.min_frames:
+                        self.start = self.frames - self.run + 1
+                        self.last = self.frames
+                else:
+                    self.run = 0
+                    self.floor = max(self.floor + self.smoothing * (energy - self.floor), 1.0)
+            elif speech:
+                self.last = self.frames
+            elif self.frames - self.last >= self.end_frames:
+                self.ended = True
+                break
+            self.frames += 1
+        if self.start is None:
+            # Only the padding and a possible speech onset are worth keeping
+            drop = self.frames - self.run - self.pad_frames - self.offset
+            if drop > 0:
+                del self.audio[:drop * self.frame_bytes]
+                self.offset += drop
+        return self.ended
+    
+    def segment(self):
+        """The speech frames plus padding, as raw bytes (empty if no speech was heard)"""
+        if self.start is None:
+            return b''
+        first = max(self.start - self.pad_frames, self.offset)
+        end = self.last + 1 + self.pad_frames
+        return bytes(self.audio[(first - self.offset) * self.frame_bytes:(end - self.offset) * self.frame_bytes])
+    
+    def trim(self, frame_data):
+        """Speech segment of a complete clip"""
+        self.feed(frame_data)
+        return self.segment()
+    
+    def onset_level(self, seconds=0.3):
+        """RMS energy of the first `seconds` of speech (0.0 if no speech was heard)"""
+        if self.start is None:
+            return 0.0
+        first = (self.start - self.offset) * self.frame_bytes
+        count = min(max(1, round(seconds / self.frame_seconds)), self.last - self.start + 1)
+        return frame_rms(bytes(self.audio[first:first + count * self.frame_bytes]), self.sample_width)
+    
+    def capture(self, source, timeout=None, phrase_limit=30.0, preroll=b''):
+        """Read an audio source until speech has started and ended; returns the speech as AudioData.
+        
+        `preroll` is audio already read from the source, such as what followed a wake word.
+        Raises sr.WaitTimeoutError when nobody spoke for `timeout` seconds, like recognizer.listen().
+        """
+        chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+        waited = heard = 0.0
+        ended = self.feed(preroll)
+        while not ended:
+            data = source.stream.read(source.CHUNK)
+            if not data:
+                break
+            ended = self.feed(data)
+            if self.start is None:
+                waited += chunk_seconds
+                if timeout and waited > timeout:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            else:
+                heard += chunk_seconds
+                if heard > phrase_limit:
+                    break
+        if self.start is None:
+            raise sr.WaitTimeoutError("no speech before the audio stream ended")
+        return sr.AudioData(self.segment(), self.sample_rate, self.sample_width)
+
+# Wake Word
+def mel_filterbank(sample_rate, fft_size, bands, low=100.0, high=4000.0):
+    """Triangular mel filters over an rfft spectrum, as a (bands, fft_size // 2 + 1) matrix.
+    
+    Each filter sums to one and the bands are fixed in Hz, so band powers from recordings at
+    different sample rates compare.
+    """
+    mels = np.linspace(2595 * np.log10(1 + low / 700), 2595 * np.log10(1 + min(high, sample_rate / 2) / 700), bands + 2)
+    edges = 700 * (10 ** (mels / 2595) - 1)
+    freqs = np.fft.rfftfreq(fft_size, 1 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    filters = np.maximum(0, np.minimum((freqs - lower) / (center - lower), (upper - freqs) / (upper - center)))
+    return filters / filters.sum(axis=1, keepdims=True)
+
+class MelPower:
+    """Mel band powers of fixed-length frames at one sample rate.
+    
+    Scaled so white noise of RMS `x` reads x ** 2 in every band, whatever the frame length.
+    """
+    def __init__(self, sample_rate, frame_samples, bands=16):
+        self.fft_size = 1 << (frame_samples - 1).bit_length()
+        window = np.hanning(frame_samples)
+        self.window = window.astype(np.float32)
+        self.filters = (mel_filterbank(sample_rate, self.fft_size, bands) / (window ** 2).sum()).astype(np.float32)
+    
+    def __call__(self, frames):
+        """(n, frame_samples) samples -> (n, bands) powers"""
+        spectrum = np.abs(np.fft.rfft(frames * self.window, self.fft_size)) ** 2
+        return spectrum @ self.filters.T
+
+class WakeWordDetector:
+    """Always-on wake word spotting over a ring buffer of audio frames, gating the recognizer.
+    
+    Every 20 ms frame costs one RMS energy value: frames well above the noise floor mark
+    someone talking (the VoiceActivityDetector rule). Only then, every hop, is the end of
+    the ring compared with the enrolled recordings of the wake word. Frames become log mel
+    band powers floored at twice the noise floor, so background noise reads the same in the
+    recordings and the room, minus each frame's mean, so loudness does not count. One
+    distance matrix per recording scores every place the word could have ended within the
+    hop, at a few speaking rates, each template frame matched to the closest of its nearby
+    window frames. Band powers are computed on demand for frames in the window, so silence
+    never pays for an FFT.
+    
+    The recordings are the only model: it answers to the voice that enrolled, with no
+    training step or ML dependency. The threshold is `margin` times the worst distance
+    between one recording and the others at their own noise level, so enroll at least two.
+    
+    The ring buffer keeps the audio after a match, which becomes the pre-roll of the command
+    capture: "hey computer what's the weather" in one breath keeps its first words.
+    
+    With a `cpu_budget` (fraction of one core) the detector measures its own thread time
+    and steps down to cheaper TIERS (longer hops, fewer speaking rates) when over budget,
+    and back up when well under it.
+    """
+    FRAME_MS = 20
+    BANDS = 16
+    FLOOR_RATIO = 2.0  # band powers are floored at this multiple of the noise floor
+    FLOOR_CREEP = 1.002  # per frame above the floor: a room that got louder stops looking like speech
+    WARP = 2  # frames either side a template frame may match
+    # (seconds between matches, speaking-rate stretches), from full effort to the cheapest
+    TIERS = ((0.1, (0.8, 0.9, 1.0, 1.12, 1.25)), (0.2, (0.85, 1.0, 1.18)), (0.4, (1.0,)))
+    THRESHOLD_MARGIN = 1.5
+    PREROLL_PAD = 0.1  # seconds before the estimated end of the word kept with the command
+    
+    def __init__(self, templates, sample_rate=16000, sample_width=2, margin=None, noise_floor=None,
+                 ratio=3.0, ring_seconds=3.0, hangover=0.3, cpu_budget=None, clock=time.thread_time):
+        if len(templates) < 2:
+            raise ValueError("the wake word needs at least two recordings")
+        self.templates = templates  # mel band powers per recording
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frame_samples = int(sample_rate * self.FRAME_MS / 1000)
+        self.frame_bytes = self.frame_samples * sample_width
+        self.frame_seconds = self.FRAME_MS / 1000
+        self.mel = MelPower(sample_rate, self.frame_samples, self.BANDS)
+        self.margin = margin or self.THRESHOLD_MARGIN
+        self.ratio = ratio
+        self.hangover_frames = round(hangover / self.frame_seconds)
+        self.pad_frames = round(self.PREROLL_PAD / self.frame_seconds)
+        self.longest = max(round(len(template) * self.TIERS[0][1][-1]) for template in templates)
+        ring_frames = max(round(ring_seconds / self.frame_seconds), self.longest + round(self.TIERS[-1][0] / self.frame_seconds))
+        self.ring = deque(maxlen=ring_frames)  # raw frame bytes
+        self.ring_power = deque(maxlen=ring_frames)  # mel band powers per frame, None until needed
+        self.pending = bytearray()  # bytes short of a whole frame
+        self.quiet_frames = math.inf  # frames since the last loud one
+        self.since_match = 0
+        # Quietest frames of the recordings, which keep a little silence at either end
+        self.floor = max(float(np.sqrt(np.percentile(template.mean(axis=1), 10))) for template in templates)
+        self.refloor()
+        self.threshold = self.spread() * self.margin
+        self.floor = noise_floor
+        self.cpu_budget = cpu_budget
+        self.clock = clock
+        self.tier = 0
+        self.stats = {'frames': 0, 'matches': 0, 'detections': 0, 'cpu_seconds': 0.0}
+        self.window_cpu = self.window_frames = 0  # for the budget check
+        self.load = None  # average fraction of a core
+    
+    @classmethod
+    def load_templates(cls, directory):
+        """Mel band powers of each WAV recording of the wake word in directory, silence trimmed"""
+        templates = []
+        for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+            with wave.open(path) as wav:
+                rate, width, data = wav.getframerate(), wav.getsampwidth(), wav.readframes(wav.getnframes())
+                if wav.getnchannels() != 1:
+                    raise ValueError(f"{path}: wake word recordings must be mono")
+            speech = VoiceActivityDetector(rate, width).trim(data) or data
+            frame_samples = int(rate * cls.FRAME_MS / 1000)
+            samples = np.frombuffer(speech, dtype=VoiceActivityDetector.DTYPES[width]).astype(np.float32)
+            frames = samples[:len(samples) // frame_samples * frame_samples].reshape(-1, frame_samples)
+            templates.append(MelPower(rate, frame_samples, cls.BANDS)(frames))
+        if not templates:
+            raise ValueError(f"no wake word recordings (*.wav) in {directory}")
+        return templates
+    
+    def features(self, power):
+        features = np.log(power + (self.FLOOR_RATIO * self.floor) ** 2)
+        return features - features.mean(axis=1, keepdims=True)
+    
+    @classmethod
+    def distance(cls, window, template, stretches, ends=1):
+        """Best mean frame distance of the template against the window ending up to `ends` frames early.
+        
+        Returns (distance, frames before the end of the window where the best match ended).
+        """
+        n, m = len(window), len(template)
+        frames = np.sqrt(((window[:, None, :] - template[None, :, :]) ** 2).mean(axis=2))
+        padded = np.pad(frames, ((cls.WARP, cls.WARP), (0, 0)), constant_values=np.inf)
+        nearby = np.minimum.reduce([padded[k:k + n] for k in range(2 * cls.WARP + 1)])
+        columns = np.arange(m)
+        rows, backs = [], []
+        for back in range(min(ends, n)):
+            for stretch in stretches:
+                length = min(n - back, round(m * stretch))
+                rows.append(n - back - length + columns * length // m)
+                backs.append(back)
+        scores = nearby[np.array(rows), columns].mean(axis=1)
+        best = int(np.argmin(scores))
+        return float(scores[best]), backs[best]
+    
+    def refloor(self):
+        """Template features for the current noise floor"""
+        self.floored_at = self.floor
+        self.template_features = [self.features(template) for template in self.templates]
+    
+    def spread(self):
+        """Worst distance between one recording and the closest other"""
+        stretches = self.TIERS[0][1]
+        return max(min(self.distance(other, template, stretches)[0] for other in self.template_features if other is not template)
+                   for template in self.template_features)
+    
+    def feed(self, data):
+        """Process audio as it arrives; returns the audio after the wake word once it is heard, else None"""
+        start = self.clock()
+        self.pending += data
+        count = len(self.pending) // self.frame_bytes
+        heard = None
+        if count:
+            chunk = bytes(self.pending[:count * self.frame_bytes])
+            del self.pending[:count * self.frame_bytes]
+            samples = np.frombuffer(chunk, dtype=VoiceActivityDetector.DTYPES[self.sample_width])
+            energies = np.sqrt(np.mean(samples.reshape(count, -1).astype(np.float32) ** 2, axis=1)).tolist()
+            if self.floor is None:
+                self.floor = max(energies[0], 1.0)
+            hop_frames = round(self.TIERS[self.tier][0] / self.frame_seconds)
+            for i, energy in enumerate(energies):
+                self.ring.append(chunk[i * self.frame_bytes:(i + 1) * self.frame_bytes])
+                self.ring_power.append(None)
+                if energy > self.ratio * self.floor:
+                    self.quiet_frames = 0
+                else:
+                    self.quiet_frames += 1
+                # Follow the quietest frames: quieter ones pull the floor down fast, the rest push it up slowly
+                if energy < self.floor:
+                    self.floor = max(self.floor + 0.05 * (energy - self.floor), 1.0)
+                else:
+                    self.floor *= self.FLOOR_CREEP
+                self.since_match += 1
+                # Keep matching a hop past the hangover, so a word that ended in the last hop is scored
+                if self.quiet_frames <= self.hangover_frames + hop_frames and self.since_match >= hop_frames:
+                    self.since_match = 0
+                    back = self.match(hop_frames)
+                    if back is not None:
+                        kept = min(back + self.pad_frames, len(self.ring))
+                        heard = (b''.join(self.ring[j] for j in range(len(self.ring) - kept, len(self.ring)))
+                                 + chunk[(i + 1) * self.frame_bytes:] + bytes(self.pending))
+                        self.reset()
+                        break
+            self.stats['frames'] += count
+        self.account(self.clock() - start, count)
+        return heard
+    
+    def match(self, hop_frames):
+        """How many frames ago the wake word ended, if it did within the last hop; else None"""
+        self.stats['matches'] += 1
+        if self.floored_at is None or not 0.8 < self.floor / self.floored_at < 1.25:
+            self.refloor()
+        window = self.features(self.window(self.longest + hop_frames))
+        stretches = self.TIERS[self.tier][1]
+        score, back = min(self.distance(window, template, stretches, hop_frames) for template in self.template_features)
+        if score >= self.threshold:
+            return None
+        self.stats['detections'] += 1
+        return back
+    
+    def window(self, frames):
+        """Mel band powers of the last `frames` frames in the ring, computing those not needed before"""
+        first = max(0, len(self.ring) - frames)
+        missing = [i for i in range(first, len(self.ring)) if self.ring_power[i] is None]
+        if missing:
+            samples = np.frombuffer(b''.join(self.ring[i] for i in missing),
+                                    dtype=VoiceActivityDetector.DTYPES[self.sample_width]).astype(np.float32)
+            for i, row in zip(missing, self.mel(samples.reshape(len(missing), -1))):
+                self.ring_power[i] = row
+        return np.array([self.ring_power[i] for i in range(first, len(self.ring))])
+    
+    def account(self, seconds, frames):
+        """Track thread time against the CPU budget every few seconds of audio"""
+        self.stats['cpu_seconds'] += seconds
+        if self.cpu_budget is None:
+            return
+        self.window_cpu += seconds
+        self.window_frames += frames
+        if self.window_frames * self.frame_seconds >= 5.0:
+            # Averaged over the last few windows: talking costs far more than the silence around it
+            load = self.window_cpu / (self.window_frames * self.frame_seconds)
+            self.load = load if self.load is None else self.load + 0.25 * (load - self.load)
+            if self.load > self.cpu_budget and self.tier < len(self.TIERS) - 1:
+                self.tier += 1
+            elif self.load < self.cpu_budget / 2 and self.tier > 0:
+                self.tier -= 1
+            self.window_cpu = self.window_frames = 0
+    
+    def reset(self):
+        self.ring.clear()
+        self.ring_power.clear()
+        self.pending.clear()
+        self.quiet_frames = math.inf
+    
+    def listen(self, source, timeout=None):
+        """Read the source until the wake word; returns the audio after it, or None after `timeout` seconds"""
+        heard_for = 0.0
+        chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+        while timeout is None or heard_for < timeout:
+            data = source.stream.read(source.CHUNK)
+            if not data:
+                return None
+            after = self.feed(data)
+            if after is not None:
+                return after
+            heard_for += chunk_seconds
+        return None
+
+# Speech Recognition Backends
+class GoogleBackend:
+    """Google Web Speech API (network round trip per utterance)"""
+    name = 'google'
+    
+    def __init__(self, recognizer, **options):
+        self.recognizer = recognizer
+    
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+class OfflineBackend:
+    """CMU Sphinx running locally through pocketsphinx"""
+    name = 'offline'
+    
+    def __init__(self, recognizer, **options):
+        self.recognizer = recognizer
+    
+    def recognize(self, audio):
+        return self.recognizer.recognize_sphinx(audio)
+
+class FixtureBackend:
+    """Deterministic transcripts keyed by a hash of the captured audio frames, for tests and benchmarks"""
+    name = 'fixture'
+    
+    def __init__(self, recognizer=None, fixture_path=None, transcripts=None, **options):
+        self.transcripts = dict(transcripts or {})
+        if fixture_path:
+            with open(fixture_path, encoding='utf-8') as f:
+                self.transcripts.update(json.load(f))
+    
+    @staticmethod
+    def audio_key(audio):
+        return hashlib.sha1(audio.frame_data).hexdigest()
+    
+    def add(self, audio, transcript):
+        self.transcripts[self.audio_key(audio)] = transcript
+    
+    def recognize(self, audio):
+        transcript = self.transcripts.get(self.audio_key(audio))
+        if transcript is None:
+            raise sr.UnknownValueError()
+        return transcript
+
+RECOGNIZER_BACKENDS = {backend.name: backend for backend in (GoogleBackend, OfflineBackend, FixtureBackend)}
+
+class FallbackRecognizer:
+    """Try recognizer backends in order, giving each at most `timeout` seconds.
+    
+    A backend that is slow, offline or unable to understand the audio hands over to the
+    next one, so one stalled request never blocks the listen loop. Each backend gets its
+    own small worker pool; calls that time out keep running there and their late results
+    are discarded, and a backend whose workers are all still stuck is skipped outright.
+    """
+    def __init__(self, backends, timeout=3.0, workers_per_backend=2):
+        self.backends = list(backends)
+        self.timeout = timeout
+        self.workers_per_backend = workers_per_backend
+        self.executors = {backend.name: ThreadPoolExecutor(max_workers=workers_per_backend,
+                                                           thread_name_prefix=f"recognizer-{backend.name}")
+                          for backend in self.backends}
+        self.in_flight = {backend.name: 0 for backend in self.backends}
+        self.lock = threading.Lock()
+        self.stats = {backend.name: {'ok': 0, 'timeout': 0, 'error': 0, 'unknown': 0, 'skipped': 0}
+                      for backend in self.backends}
+    
+    @classmethod
+    def from_names(cls, names, recognizer, timeout=3.0, **options):
+        return cls([RECOGNIZER_BACKENDS[name](recognizer, **options) for name in names], timeout)
+    
+    def submit(self, backend, audio):
+        """Start a recognition call, or return None if the backend has no free worker"""
+        with self.lock:
+            if self.in_flight[backend.name] >= self.workers_per_backend:
+                return None
+            self.in_flight[backend.name] += 1
+        future = self.executors[backend.name].submit(backend.recognize, audio)
+        future.add_done_callback(lambda _: self.release(backend.name))
+        return future
+    
+    def release(self, name):
+        with self.lock:
+            self.in_flight[name] -= 1
+    
+    def recognize(self, audio):
+        understood_nothing = False
+        for backend in self.backends:
+            stats = self.stats[backend.name]
+            future = self.submit(backend, audio)
+            if future is None:
+                stats['skipped'] += 1
+                tracer.count('assistant_backend_results_total', (backend.name, 'skipped'))
+                continue
+            try:
+                with tracer.span('assistant_backend_seconds', backend.name):
+                    text = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                outcome = 'timeout'
+            except sr.UnknownValueError:
+                outcome = 'unknown'
+                understood_nothing = True
+            except sr.RequestError:
+                outcome = 'error'
+            else:
+                outcome = 'ok'
+            stats[outcome] += 1
+            tracer.count('assistant_backend_results_total', (backend.name, outcome))
+            if outcome == 'ok':
+                return text
+        
+        if understood_nothing:
+            raise sr.UnknownValueError()
+        raise sr.RequestError("no recognizer backend produced a result")
+
+# Input/Output Adapters
+class SpeechInput:
+    """Microphone capture with a configurable recognizer backend chain.
+    
+    The microphone stream is opened once and kept open across turns. With `wake_word` (a
+    directory of recordings of it) nothing reaches the recognizer until the wake word is
+    heard; the words after it are captured with the voice activity detector.
+    """
+    NOT_UNDERSTOOD = "Sorry, I didn't understand that."
+    SERVICE_ERROR = "Sorry, there was an error with the speech recognition service."
+    
+    def __init__(self, backends=('google', 'offline'), timeout=3.0, vad_silence=None, wake_word=None,
+                 wake_margin=None, wake_cpu_budget=None, **backend_options):
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
-        self.tts_engine = pyttsx3.init()
+        self.calibrator = NoiseCalibrator(self.recognizer)
+        self.backend = FallbackRecognizer.from_names(backends, self.recognizer, timeout, **backend_options)
+        self.vad_silence = vad_silence  # seconds of quiet ending an utterance; None leaves endpointing to listen()
+        self.wake_templates = WakeWordDetector.load_templates(wake_word) if wake_word else None
+        self.wake_options = {'margin': wake_margin, 'cpu_budget': wake_cpu_budget}
+        self.wake = None
+        self.source = None
+    
+    def open(self):
+        """Open the microphone stream and calibrate for ambient noise"""
+        if self.source is None:
+            self.source = self.microphone.__enter__()
+            self.calibrator.calibrate(self.source)
+            if self.wake_templates is not None:
+                self.wake = WakeWordDetector(self.wake_templates, self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH,
+                                             noise_floor=self.calibrator.ambient, **self.wake_options)
+        return self.source
+    
+    def listen(self):
+        """Listen for voice input"""
+        return self.recognize(self.capture())
+    
+    def capture(self):
+        """Record one utterance; returns AudioData, or "timeout" when nobody spoke"""
+        source = self.open()
+        preroll = b''
+        if self.wake is not None:
+            preroll = self.await_wake_word(source)
+            if preroll is None:
+                return "timeout"
+        try:
+            with tracer.stage('calibrate'):
+                self.calibrator.ensure_calibrated(source)
+            print("Listening...")
+            with tracer.stage('capture'):
+                if self.vad_silence is None and self.wake is None:
+                    audio = self.recognizer.listen(source, timeout=5)
+                else:
+                    audio = self.capture_speech(source, timeout=5, preroll=preroll)
+        except sr.WaitTimeoutError:
+            tracer.count('assistant_recognition_failures_total', 'timeout')
+            return "timeout"
+        if self.vad_silence is None and self.wake is None:
+            self.calibrator.observe(audio)
+        return audio
+    
+    def await_wake_word(self, source):
+        """Spot the wake word for a few seconds; returns the audio heard after it, or None"""
+        cpu, tier = self.wake.stats['cpu_seconds'], self.wake.tier
+        with tracer.stage('wake'):
+            preroll = self.wake.listen(source, timeout=5)
+        self.calibrator.update(self.wake.floor)
+        tracer.count('assistant_wake_cpu_seconds_total', str(tier), self.wake.stats['cpu_seconds'] - cpu)
+        tracer.count('assistant_wake_word_total', 'idle' if preroll is None else 'heard')
+        return preroll
+    
+    def capture_speech(self, source, timeout, preroll=b''):
+        """Endpoint with VoiceActivityDetector and keep only the speech segment"""
+        detector = VoiceActivityDetector(source.SAMPLE_RATE, source.SAMPLE_WIDTH, self.calibrator.ambient,
+                                         end_silence=self.vad_silence)
+        audio = detector.capture(source, timeout, preroll=preroll)
+        self.calibrator.update(detector.floor)
+        tracer.count('assistant_vad_bytes_total', 'kept', len(audio.frame_data))
+        tracer.count('assistant_vad_bytes_total', 'trimmed', detector.frames * detector.frame_bytes - len(audio.frame_data))
+        return audio
+    
+    def recognize(self, audio):
+        """Turn captured audio into a lowercase command (sentinel strings pass through)"""
+        if isinstance(audio, str):
+            return audio
+        try:
+            with tracer.stage('recognize'):
+                command = self.backend.recognize(audio).lower()
+            print(f"You said: {command}")
+            return command
+            
+        except sr.UnknownValueError:
+            tracer.count('assistant_recognition_failures_total', 'not_understood')
+            return self.NOT_UNDERSTOOD
+        except sr.RequestError:
+            tracer.count('assistant_recognition_failures_total', 'service_error')
+            return self.SERVICE_ERROR
+    
+    def close(self):
+        if self.source is not None:
+            self.microphone.__exit__(None, None, None)
+            self.source = None
+
+class SpeechOutput:
+    """pyttsx3 text-to-speech"""
+    def __init__(self, voice_index=1, rate=180, tts_engine=None):
+        self.tts_engine = tts_engine if tts_engine is not None else pyttsx3.init()
         
         # Configure voice settings
         voices = self.tts_engine.getProperty('voices')
-        self.tts_engine.setProperty('voice', voices[1].id)  # Female voice
-        self.tts_engine.setProperty('rate', 180)
+        self.voice_id = voices[min(voice_index, len(voices) - 1)].id  # Female voice
+        self.rate = rate
+        self.tts_engine.setProperty('voice', self.voice_id)
+        self.tts_engine.setProperty('rate', rate)
+    
+    def say(self, text):
+        print(f"Assistant: {text}")
+        self.tts_engine.say(text)
+        self.tts_engine.runAndWait()
+    
+    def close(self):
+        pass
+
+# Speech Output Cache
+class WavPlayer:
+    """Play rendered audio through whatever the platform provides"""
+    def __init__(self):
+        self.command = None
+        self.process = None
+        if sys.platform == 'darwin' and shutil.which('afplay'):
+            self.command = ['afplay']
+        elif shutil.which('aplay'):
+            self.command = ['aplay', '-q']
+    
+    @property
+    def available(self):
+        return sys.platform == 'win32' or self.command is not None
+    
+    def play(self, path, data):
+        """Play one clip, blocking until it finishes or stop() is called"""
+        if sys.platform == 'win32':
+            import winsound
+            winsound.PlaySound(data, winsound.SND_MEMORY)
+        else:
+            self.process = subprocess.Popen(self.command + [path])
+            self.process.wait()
+            self.process = None
+    
+    def stop(self):
+        process = self.process
+        if process is not None:
+            process.terminate()
+
+class TTSCache:
+    """Rendered speech keyed by (text, voice, rate): an LRU of audio bytes in memory over a directory on disk"""
+    def __init__(self, tts_engine, voice_id, rate, cache_dir=TTS_CACHE_DIR, max_memory_bytes=32 * 1024 * 1024):
+        self.tts_engine = tts_engine
+        self.voice_id = voice_id
+        self.rate = rate
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.memory = OrderedDict()  # key -> audio bytes, most recently used last
+        self.memory_bytes = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def key(self, text):
+        return hashlib.sha1(f"{self.voice_id}\0{self.rate}\0{text}".encode('utf-8')).hexdigest()
+    
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+    
+    @property
+    def hit_rate(self):
+        lookups = sum(self.stats.values())
+        return (self.stats['memory_hits'] + self.stats['disk_hits']) / lookups if lookups else 0.0
+    
+    def remember(self, key, data):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+        self.memory[key] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+    
+    def render(self, text, path):
+        """Synthesize text straight to a file"""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        self.tts_engine.save_to_file(text, tmp_path)
+        self.tts_engine.runAndWait()
+        os.replace(tmp_path, path)
+    
+    def get(self, text):
+        """Return (path, audio bytes) for text, rendering it on a miss"""
+        key = self.key(text)
+        path = self.path_for(key)
+        data = self.memory.get(key)
+        if data is not None:
+            self.stats['memory_hits'] += 1
+            self.memory.move_to_end(key)
+            return path, data
         
-        # Initialize database
-        self.init_database()
+        if os.path.exists(path):
+            self.stats['disk_hits'] += 1
+        else:
+            self.stats['misses'] += 1
+            self.render(text, path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.remember(key, data)
+        return path, data
+    
+    def prewarm(self, phrases):
+        """Render every phrase that is not on disk yet; returns how many were rendered"""
+        rendered = 0
+        for text in phrases:
+            path = self.path_for(self.key(text))
+            if not os.path.exists(path):
+                self.render(text, path)
+                rendered += 1
+        return rendered
+
+class CachedSpeechOutput(SpeechOutput):
+    """Speech output that plays cached renders instead of re-synthesizing repeated responses"""
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_memory_bytes=32 * 1024 * 1024, voice_index=1, rate=180,
+                 tts_engine=None, player=None):
+        super().__init__(voice_index, rate, tts_engine)
+        self.cache = TTSCache(self.tts_engine, self.voice_id, self.rate, cache_dir, max_memory_bytes)
+        self.player = player if player is not None else WavPlayer()
+        self.first_audio = StageMetrics('first_audio')
+    
+    def say(self, text):
+        print(f"Assistant: {text}")
+        if not self.player.available:
+            # Nothing can play files on this host; fall back to live synthesis
+            start = time.perf_counter()
+            self.tts_engine.say(text)
+            self.first_audio.record(time.perf_counter() - start)
+            self.tts_engine.runAndWait()
+            return
         
-        # Load assistant modules
-        self.study_assistant = StudyAssistant()
-        self.wellness_assistant = WellnessAssistant()
-        self.productivity_assistant = ProductivityAssistant()
-        self.support_chatbot = SupportChatbot()
-        self.finance_assistant = FinanceAssistant()
-        self.meal_planner = MealPlanner()
-        self.tech_troubleshooter = TechTroubleshooter()
-        self.language_buddy = LanguageBuddy()
+        start = time.perf_counter()
+        path, data = self.cache.get(text)
+        self.first_audio.record(time.perf_counter() - start)
+        self.player.play(path, data)
+    
+    def prewarm(self, phrases):
+        return self.cache.prewarm(phrases)
+    
+    def report(self):
+        stats = self.first_audio.summary()
+        return (f"TTS cache hit rate {self.cache.hit_rate:.1%} {self.cache.stats}, "
+                f"time to first audio p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
+
+class StreamingSpeechOutput(CachedSpeechOutput):
+    """Speak long responses sentence by sentence.
+    
+    Sentences longer than max_chunk_chars are cut further at clause boundaries, so a long
+    list is not rendered as one piece. Chunks are rendered in order on one dedicated engine thread while the caller's thread
+    plays them, so chunk N+1 is synthesized while chunk N is playing and the first sentence
+    is heard without waiting for the rest. interrupt() (barge-in) stops the current clip
+    and drops everything still queued.
+    """
+    SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+    CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
+    
+    def __init__(self, *args, min_chunk_chars=40, max_chunk_chars=100, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_chunk_chars = min_chunk_chars
+        self.max_chunk_chars = max_chunk_chars
+        self.render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-render")
+        self.interrupted = threading.Event()
+    
+    def split(self, text):
+        """Split at sentence boundaries and long sentences at clauses, merging fragments shorter than min_chunk_chars"""
+        chunks = []
+        for sentence in self.SENTENCE_END.split(text.strip()):
+            clauses = self.CLAUSE_END.split(sentence) if len(sentence) > self.max_chunk_chars else [sentence]
+            for i, clause in enumerate(clauses):
+                # Clauses of one sentence are packed back together up to max_chunk_chars
+                if chunks and (len(chunks[-1]) < self.min_chunk_chars
+                               or i and len(chunks[-1]) + len(clause) < self.max_chunk_chars):
+                    chunks[-1] = f"{chunks[-1]} {clause}"
+                else:
+                    chunks.append(clause)
+        return chunks
+    
+    def say(self, text):
+        if not self.player.available:
+            return super().say(text)  # no player: live synthesis, without chunking
+        print(f"Assistant: {text}")
+        self.interrupted.clear()
+        start = time.perf_counter()
+        renders = [self.render_executor.submit(self.cache.get, chunk) for chunk in self.split(text)]
+        try:
+            for i, render in enumerate(renders):
+                path, data = render.result()
+                if self.interrupted.is_set():
+                    break
+                if i == 0:
+                    self.first_audio.record(time.perf_counter() - start)
+                self.player.play(path, data)
+                if self.interrupted.is_set():
+                    break
+        finally:
+            for render in renders:
+                render.cancel()
+    
+    def prewarm(self, phrases):
+        # Playback looks chunks up individually, so warm the chunks rather than whole phrases
+        chunks = [chunk for text in phrases for chunk in self.split(text)]
+        return self.render_executor.submit(self.cache.prewarm, chunks).result()
+    
+    def interrupt(self):
+        """Barge-in: stop speaking now"""
+        self.interrupted.set()
+        self.player.stop()
+    
+    def close(self):
+        self.render_executor.shutdown(wait=True)
+
+class StreamInput:
+    """Read one command per line from a text stream (stdin by default)"""
+    def __init__(self, stream=None, prompt="You: "):
+        self.stream = stream or sys.stdin
+        self.prompt = prompt if self.stream.isatty() else None
+    
+    def listen(self):
+        if self.prompt:
+            print(self.prompt, end='', flush=True)
+        line = self.stream.readline()
+        if not line:
+            return None  # end of input
+        return line.strip().lower()
+    
+    def capture(self):
+        return self.listen()
+    
+    def recognize(self, text):
+        return text
+    
+    def close(self):
+        if self.stream is not sys.stdin:
+            self.stream.close()
+
+class StreamOutput:
+    """Write responses as text lines (stdout by default)"""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+    
+    def say(self, text):
+        self.stream.write(f"Assistant: {text}\n")
+        self.stream.flush()
+    
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+class JsonlInput(StreamInput):
+    """Read commands from JSONL records of the form {"command": "..."}"""
+    def __init__(self, path):
+        super().__init__(open(path, encoding='utf-8'), prompt=None)
+    
+    def listen(self):
+        while True:
+            line = self.stream.readline()
+            if not line:
+                return None
+            if line.strip():
+                return parse_command_record(line).lower()
+
+class JsonlOutput(StreamOutput):
+    """Write responses as JSONL records of the form {"response": "..."}"""
+    def __init__(self, path):
+        super().__init__(open(path, 'w', encoding='utf-8'))
+    
+    def say(self, text):
+        self.stream.write(json.dumps({'response': text}) + '\n')
+
+class SocketIO:
+    """Line-oriented local socket; one client connection acts as both input and output"""
+    def __init__(self, host='127.0.0.1', port=8765):
+        self.server = socket.create_server((host, port))
+        print(f"Waiting for a client on {host}:{port}...")
+        self.conn, _ = self.server.accept()
+        self.reader = self.conn.makefile('r', encoding='utf-8')
+        self.writer = self.conn.makefile('w', encoding='utf-8')
+    
+    def listen(self):
+        line = self.reader.readline()
+        if not line:
+            return None
+        return line.strip().lower()
+    
+    def capture(self):
+        return self.listen()
+    
+    def recognize(self, text):
+        return text
+    
+    def say(self, text):
+        self.writer.write(text + '\n')
+        self.writer.flush()
+    
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+        self.conn.close()
+        self.server.close()
+
+class BackgroundAdapter:
+    """Build an adapter on a background thread; the first use waits for it to be ready.
+    
+    Lets slow engine start-up (pyttsx3 voice enumeration, PyAudio) overlap with the rest
+    of assistant start-up. For a caching speech output, `prewarm` phrases are rendered on
+    the same thread before it counts as ready, when the host has a player for them.
+    """
+    def __init__(self, factory, prewarm=()):
+        self.adapter = None
+        self.error = None
+        self.ready = threading.Event()
+        threading.Thread(target=self.build, args=(factory, prewarm), name="adapter-init", daemon=True).start()
+    
+    def build(self, factory, prewarm):
+        try:
+            adapter = factory()
+            if prewarm and adapter.player.available:
+                adapter.prewarm(prewarm)
+            self.adapter = adapter
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.ready.set()
+    
+    def resolve(self):
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self.adapter
+    
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+def parse_command_record(line):
+    """Accept either a JSON object with a "command" field or a bare JSON string"""
+    record = json.loads(line)
+    return record['command'] if isinstance(record, dict) else str(record)
+
+def read_commands(path):
+    """Stream commands from a JSONL file or a plain text file with one command per line"""
+    is_jsonl = path.endswith('.jsonl')
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            yield (parse_command_record(line) if is_jsonl else line.strip()).lower()
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+@dataclass
+class BatchStats:
+    count: int
+    elapsed: float
+    requests_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    
+    def __str__(self):
+        return (f"{self.count} requests in {self.elapsed:.3f}s - {self.requests_per_sec:,.0f} req/s, "
+                f"p50 {self.p50_ms:.3f} ms, p99 {self.p99_ms:.3f} ms")
+
+# Tracing
+class Histogram:
+    """Fixed-bucket latency histogram; cumulative bucket counts are only built on export.
+    
+    Updates take no lock: a thread switch in the middle of one can very rarely lose an
+    increment, which monitoring can live with, while a lock would be most of a span's cost.
+    """
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+    
+    def snapshot(self):
+        return list(itertools.accumulate(list(self.counts))), self.sum
+
+class Span:
+    """Times one stage of a turn: `with tracer.span('assistant_stage_seconds', 'recognize'):`
+    
+    Each thread reuses one Span per (family, label), so entering a span allocates nothing;
+    a stage never nests inside itself on one thread.
+    """
+    __slots__ = ('histogram', 'label', 'local', 'start')
+    
+    def __init__(self, histogram, label, local):
+        self.histogram = histogram
+        self.label = label
+        self.local = local
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        histogram = self.histogram  # Histogram.observe() inlined: this runs for every span
+        histogram.counts[bisect.bisect_left(histogram.bounds, seconds)] += 1
+        histogram.sum += seconds
+        trace = self.local.trace
+        if trace is not None:
+            trace.append((self.label, self.start, seconds))
+
+class NullSpan:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        pass
+
+NULL_SPAN = NullSpan()
+
+class SamplingProfiler:
+    """Samples every thread's stack on a background thread while running.
+    
+    Unlike cProfile it can be started and stopped from any thread (an HTTP request, a
+    signal handler) and sees the recognizer and pipeline worker threads too. Output is in
+    collapsed-stack format, one "thread;outer;...;inner count" line per distinct stack, which
+    flamegraph.pl and speedscope read directly.
+    """
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.thread = None
+        self.stopping = threading.Event()
+    
+    @property
+    def running(self):
+        return self.thread is not None
+    
+    def start(self):
+        if self.thread is None:
+            self.stacks, self.samples = {}, 0
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+            self.thread.start()
+    
+    def stop(self):
+        """Stop sampling and return the collapsed stacks"""
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+        return self.folded()
+    
+    def toggle(self):
+        """Start if stopped; stop and return the collapsed stacks if running"""
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+    
+    def run(self):
+        me = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+    
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+class TurnSpans(list):
+    """The (label, start, seconds) spans of one turn; formatted only when someone asks for traces"""
+    def __init__(self, start, at):
+        super().__init__()
+        self.start = start
+        self.at = at
+        self.total = 0.0
+        self.outcome = None
+    
+    def as_dict(self):
+        return {'at': self.at, 'total_ms': round(self.total * 1000, 3), 'outcome': self.outcome,
+                'spans': [{'name': label, 'offset_ms': round((start - self.start) * 1000, 3), 'ms': round(seconds * 1000, 3)}
+                          for label, start, seconds in self]}
+
+class TurnLocal(threading.local):
+    def __init__(self):
+        self.spans = {}  # (family, label) -> this thread's Span
+        self.stages = {}  # stage name -> this thread's Span, skipping the (family, label) tuple
+        self.turn_start = None  # between begin_turn() and end_turn()
+        self.trace = None  # TurnSpans of a sampled turn
+
+class Tracer:
+    """Per-stage spans and counters for the assistant, exported in Prometheus text format.
+    
+    Disabled by default, in which case span() hands back a shared no-op and observe()/count()
+    return at once. When enabled each span costs two clock reads and a histogram update. Every
+    `trace_every`th listen -> speak turn also keeps its spans together in `traces` for inspection;
+    the other turns allocate nothing.
+    """
+    # family -> (type, label names, help)
+    FAMILIES = {
+        'assistant_stage_seconds': ('histogram', ('stage',), "Time spent in each stage of a turn"),
+        'assistant_module_seconds': ('histogram', ('module',), "Time spent in each assistant module's handler"),
+        'assistant_backend_seconds': ('histogram', ('backend',), "Time spent waiting on each recognizer backend"),
+        'assistant_recognition_failures_total': ('counter', ('reason',),
+                                                 "Turns that produced no command: not_understood, service_error or timeout"),
+        'assistant_backend_results_total': ('counter', ('backend', 'outcome'), "Recognizer backend calls by outcome"),
+        'assistant_vad_bytes_total': ('counter', ('part',), "Captured audio bytes the voice activity detector kept or trimmed"),
+        'assistant_wake_word_total': ('counter', ('outcome',),
+                                      "Wake word listens: heard, or idle when nobody said it before the listen timed out"),
+        'assistant_wake_cpu_seconds_total': ('counter', ('tier',), "Thread time spent spotting the wake word, by effort tier"),
+    }
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+               1.0, 2.5, 5.0, 10.0, 30.0)
+    
+    def __init__(self, enabled=False, trace_window=100, trace_every=10):
+        self.enabled = enabled
+        self.histograms = {}  # (family, label) -> Histogram
+        self.counters = {}  # (family, label) -> count
+        self.lock = threading.Lock()
+        self.local = TurnLocal()
+        self.traces = deque(maxlen=trace_window)
+        self.trace_every = trace_every
+        self.turns = 0
+        self.turn_histogram = self.histogram('assistant_stage_seconds', 'turn')
+        self.profiler = SamplingProfiler()
+        self.http = None
+    
+    def histogram(self, family, label):
+        """The histogram for family{label}; label is a string, or a tuple for families with several labels"""
+        histogram = self.histograms.get((family, label))
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault((family, label), Histogram(self.BUCKETS))
+        return histogram
+    
+    def span(self, family, label):
+        if not self.enabled:
+            return NULL_SPAN
+        local = self.local
+        span = local.spans.get((family, label))
+        if span is None:
+            span = local.spans[(family, label)] = Span(self.histogram(family, label), label, local)
+        return span
+    
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        local = self.local
+        span = local.stages.get(name)
+        if span is None:
+            span = local.stages[name] = self.span('assistant_stage_seconds', name)
+        return span
+    
+    def observe(self, family, label, seconds):
+        if self.enabled:
+            self.histogram(family, label).observe(seconds)
+    
+    def count(self, family, label, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[(family, label)] = self.counters.get((family, label), 0) + n
+    
+    def begin_turn(self):
+        """Time this thread's turn until end_turn(), collecting its spans as a trace if it is sampled"""
+        if not self.enabled:
+            return
+        local = self.local
+        local.turn_start = time.perf_counter()
+        self.turns += 1
+        local.trace = TurnSpans(local.turn_start, time.time()) if self.turns % self.trace_every == 0 else None
+    
+    def end_turn(self, outcome='ok'):
+        local = self.local
+        start = local.turn_start
+        if start is None:
+            return
+        local.turn_start = None
+        total = time.perf_counter() - start
+        self.turn_histogram.observe(total)
+        trace = local.trace
+        if trace is not None:
+            local.trace = None
+            trace.total = total
+            trace.outcome = outcome
+            self.traces.append(trace)
+    
+    @staticmethod
+    def format_labels(family, label):
+        values = label if isinstance(label, tuple) else (label,)
+        names = Tracer.FAMILIES[family][1]
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in values)
+        return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+    
+    def export(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        lines = []
+        for family, (kind, _, help_text) in self.FAMILIES.items():
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            for (name, label), histogram in histograms:
+                if name != family:
+                    continue
+                labels = self.format_labels(family, label)
+                cumulative, total = histogram.snapshot()
+                for bound, count in zip(self.BUCKETS, cumulative):
+                    lines.append(f'{family}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{family}_bucket{{{labels},le="+Inf"}} {cumulative[-1]}')
+                lines.append(f'{family}_sum{{{labels}}} {total}')
+                lines.append(f'{family}_count{{{labels}}} {cumulative[-1]}')
+            for (name, label), count in counters:
+                if name == family:
+                    lines.append(f'{family}{{{self.format_labels(family, label)}}} {count}')
+        return "\n".join(lines) + "\n"
+    
+    def dump(self, path):
+        """Write the metrics file atomically, for node_exporter's textfile collector or a cron job"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.export())
+        os.replace(tmp_path, path)
+    
+    def dump_every(self, path, interval=15.0):
+        """Keep the metrics file fresh from a daemon thread"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.dump(path)
+        threading.Thread(target=loop, name="metrics-dump", daemon=True).start()
+    
+    def toggle_profiler(self, path=None):
+        """Start the sampling profiler, or stop it and write its stacks to path (returns them too)"""
+        folded = self.profiler.toggle()
+        if folded is not None and path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(folded)
+        return folded
+    
+    def serve(self, port=9464, host='127.0.0.1'):
+        """Serve /metrics, /traces and /profile/start|stop over HTTP from a daemon thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        tracer = self
         
-        self.is_listening = False
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    self.reply(tracer.export(), 'text/plain; version=0.0.4')
+                elif self.path == '/traces':
+                    self.reply(json.dumps([spans.as_dict() for spans in list(tracer.traces)]), 'application/json')
+                elif self.path == '/profile/start':
+                    tracer.profiler.start()
+                    self.reply("profiling\n", 'text/plain')
+                elif self.path == '/profile/stop':
+                    self.reply(tracer.profiler.stop(), 'text/plain')
+                else:
+                    self.send_error(404)
+            
+            def reply(self, body, content_type):
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, *args):
+                pass
         
-    def init_database(self):
-        """Initialize SQLite database for storing user data"""
-        self.conn = sqlite3.connect('assistant_data.db', check_same_thread=False)
-        cursor = self.conn.cursor()
+        self.http = ThreadingHTTPServer((host, port), Handler)
+        self.http.daemon_threads = True
+        threading.Thread(target=self.http.serve_forever, name="metrics-http", daemon=True).start()
+        return self.http.server_address
+    
+    def close(self):
+        if self.http is not None:
+            self.http.shutdown()
+            self.http.server_close()
+            self.http = None
+
+# Process-wide, like a logger: speech adapters, backends and the assistant all report here
+tracer = Tracer()
+
+# Concurrent Pipeline
+class StageMetrics:
+    """Latency samples for one pipeline stage"""
+    def __init__(self, name, window=1000):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+    
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+    
+    def summary(self):
+        samples = sorted(self.recent)
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': percentile(samples, 50) * 1000,
+            'p99_ms': percentile(samples, 99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+class AsyncPipeline:
+    """listen -> recognize -> process -> speak as asyncio stages joined by bounded queues.
+    
+    Blocking engines run on dedicated single-thread executors, so capture of the next
+    utterance overlaps with speaking the current response while each engine stays on
+    one thread and utterances keep their order.
+    
+    Typed input captured during playback always interrupts it. Audio only does when its
+    speech starts clearly louder than the echo floor: the level at which the microphone
+    hears the assistant's own voice, learned from what it picks up while the greeting
+    plays and kept current from the echo it drops afterwards. Both levels come from the
+    same microphone, whatever format the speech was rendered in.
+    """
+    STAGES = ('capture', 'recognize', 'process', 'speak', 'response')
+    END = object()
+    BARGE_IN_RATIO = 2.0  # speech must start this much louder than the echo floor
+    ECHO_SMOOTHING = 0.2
+    
+    def __init__(self, assistant, queue_size=4):
+        self.assistant = assistant
+        self.queue_size = queue_size
+        self.metrics = {name: StageMetrics(name) for name in self.STAGES}
+        self.executors = {name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"pipeline-{name}")
+                          for name in ('capture', 'recognize', 'process', 'speak')}
+        self.stopped = None
+        self.speaking = False
+        self.calibrating = False  # the greeting is playing: whatever the microphone hears is echo
+        self.echo_floor = None  # onset level of the assistant's voice at the microphone, once heard
+        self.announcing = set()
+    
+    async def timed(self, stage, fn, *args):
+        """Run a blocking call on the stage's executor and record its latency"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        result = await loop.run_in_executor(self.executors[stage], fn, *args)
+        self.metrics[stage].record(time.perf_counter() - start)
+        return result
+    
+    async def capture_stage(self, audio_q):
+        try:
+            while not self.stopped.is_set():
+                audio = await self.timed('capture', self.assistant.input.capture)
+                if audio is None:
+                    break
+                if audio == "timeout":
+                    continue
+                interrupt = getattr(self.assistant.output, 'interrupt', None)
+                if self.speaking and interrupt is not None:
+                    # Typed input is always meant; audio may be the response itself
+                    if not isinstance(audio, str) and not self.is_barge_in(audio):
+                        continue
+                    interrupt()
+                await audio_q.put((audio, time.perf_counter()))
+        finally:
+            # Even a failed capture must end the pipeline rather than leave it waiting
+            if not self.stopped.is_set():
+                await audio_q.put(self.END)
+    
+    def is_barge_in(self, audio):
+        """True when audio captured during playback is the user talking, not the response's own echo"""
+        calibrator = getattr(self.assistant.input, 'calibrator', None)
+        detector = VoiceActivityDetector(audio.sample_rate, audio.sample_width,
+                                         getattr(calibrator, 'ambient', None))
+        detector.trim(audio.frame_data)
+        level = detector.onset_level()
+        if level == 0.0:
+            return False
+        # Echo is what the microphone hears during the greeting, or anything not clearly louder
+        # than that since; until it has heard the assistant at all, any speech is the user
+        if self.calibrating or (self.echo_floor is not None and level <= self.BARGE_IN_RATIO * self.echo_floor):
+            if self.echo_floor is None:
+                self.echo_floor = level
+            else:
+                self.echo_floor += self.ECHO_SMOOTHING * (level - self.echo_floor)
+            return False
+        return True
+    
+    async def recognize_stage(self, audio_q, text_q):
+        while (item := await audio_q.get()) is not self.END:
+            audio, captured_at = item
+            command = await self.timed('recognize', self.assistant.input.recognize, audio)
+            await text_q.put((command, captured_at))
+        await text_q.put(self.END)
+    
+    async def process_stage(self, text_q, speech_q):
+        while (item := await text_q.get()) is not self.END:
+            command, captured_at = item
+            if not command or command == "timeout":
+                continue
+            if "Sorry" in command:
+                await speech_q.put((command, captured_at, None))
+                continue
+            
+            response = await self.timed('process', self.assistant.process_command, command)
+            if response == "stop":
+                await speech_q.put((self.assistant.GOODBYE, captured_at, None))
+                break
+            await speech_q.put((response, captured_at, None))
+        await speech_q.put(self.END)
+    
+    async def speak_stage(self, speech_q):
+        while (item := await speech_q.get()) is not self.END:
+            text, captured_at, reminder = item
+            if captured_at is not None:
+                self.metrics['response'].record(time.perf_counter() - captured_at)
+            self.speaking = True
+            try:
+                await self.timed('speak', self.assistant.speak, text)
+            finally:
+                self.speaking = self.calibrating = False
+            self.assistant.announced(reminder)
+        self.stopped.set()
+    
+    async def run(self, greeting=None):
+        self.stopped = asyncio.Event()
+        audio_q = asyncio.Queue(self.queue_size)
+        text_q = asyncio.Queue(self.queue_size)
+        speech_q = asyncio.Queue(self.queue_size)
+        if greeting:
+            speech_q.put_nowait((greeting, None, None))
+            self.calibrating = True
+        loop = asyncio.get_running_loop()
+        self.assistant.announce_hook = lambda: loop.call_soon_threadsafe(self.announce, speech_q)
+        self.announce(speech_q)
         
-        # Create tables for different modules
-        cursor.execute('''
+        tasks = [
+            asyncio.create_task(self.capture_stage(audio_q)),
+            asyncio.create_task(self.recognize_stage(audio_q, text_q)),
+            asyncio.create_task(self.process_stage(text_q, speech_q)),
+        ]
+        try:
+            await self.speak_stage(speech_q)
+        finally:
+            self.stopped.set()
+            self.assistant.announce_hook = None
+            for task in tasks + list(self.announcing):
+                task.cancel()
+            results = await asyncio.gather(*tasks, *self.announcing, return_exceptions=True)
+            for executor in self.executors.values():
+                executor.shutdown(wait=False)
+        # A stage that failed ended the pipeline early; say why
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+    
+    def announce(self, speech_q):
+        """Queue fired reminders for the speak stage; capture and recognition carry on untouched"""
+        for text, reminder in self.assistant.drain_announcements():
+            task = asyncio.create_task(speech_q.put((text, None, reminder)))
+            self.announcing.add(task)
+            task.add_done_callback(self.announcing.discard)
+    
+    def report(self):
+        """Per-stage latency summary, one line per stage"""
+        lines = []
+        for name, metrics in self.metrics.items():
+            stats = metrics.summary()
+            lines.append(f"{name:<10} n={stats['count']:<6} mean {stats['mean_ms']:9.3f} ms  "
+                         f"p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  max {stats['max_ms']:9.3f} ms")
+        return "\n".join(lines)
+
+# Storage
+# Tables feeding the reporting rollups: table -> (day, key, value) of a row, with {row} for NEW or OLD
+CHANGE_SOURCES = {
+    'expenses': ('{row}.date', "COALESCE({row}.category, 'other')", '{row}.amount'),
+    # created_at is UTC; the other dates are local, so tasks are counted on their local day too
+    'tasks': ("date({row}.created_at, 'localtime')", "COALESCE({row}.priority, '')", '{row}.completed'),
+    'meals': ('{row}.date', "COALESCE({row}.meal_type, '')", 'COALESCE({row}.calories, 0)'),
+}
+
+def change_log_statements(tables=None):
+    """Triggers logging every row change of CHANGE_SOURCES as signed deltas, and the backfill of existing rows"""
+    statements = []
+    for table in tables or CHANGE_SOURCES:
+        columns = CHANGE_SOURCES[table]
+        def logged(row):
+            return ', '.join([f"{row}.user_id", *(column.format(row=row) for column in columns)])
+        
+        def log(row, sign):
+            return (f"INSERT INTO change_log (source, user_id, day, key, value, sign) "
+                    f"VALUES ('{table}', {logged(row)}, {sign});")
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_log_insert AFTER INSERT ON {table} BEGIN {log('NEW', 1)} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_log_delete AFTER DELETE ON {table} BEGIN {log('OLD', -1)} END",
+            # Only updates that move a row between rollups, such as completing a task
+            f"CREATE TRIGGER IF NOT EXISTS {table}_log_update AFTER UPDATE ON {table} "
+            f"WHEN ({logged('OLD')}) IS NOT ({logged('NEW')}) BEGIN {log('OLD', -1)} {log('NEW', 1)} END",
+        ]
+        day, key, value = (column.format(row=table) for column in columns)
+        statements.append(f"INSERT INTO change_log (source, user_id, day, key, value, sign) "
+                          f"SELECT '{table}', user_id, {day}, {key}, {value}, 1 FROM {table}")
+    return statements
+
+EXPENSE_TOTALS_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS expenses_totals_insert AFTER INSERT ON expenses BEGIN
+        INSERT INTO expense_totals (user_id, category, month, total, count)
+        VALUES (NEW.user_id, NEW.category, substr(NEW.date, 1, 7), NEW.amount, 1)
+        ON CONFLICT (user_id, category, month) DO UPDATE SET total = total + NEW.amount, count = count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS expenses_totals_delete AFTER DELETE ON expenses BEGIN
+        UPDATE expense_totals SET total = total - OLD.amount, count = count - 1
+        WHERE user_id = OLD.user_id AND category = OLD.category AND month = substr(OLD.date, 1, 7);
+    END
+    ''',
+    # An edit moves the expense out of its old rollup and into its new one
+    '''
+    CREATE TRIGGER IF NOT EXISTS expenses_totals_update AFTER UPDATE OF amount, category, date, user_id ON expenses BEGIN
+        UPDATE expense_totals SET total = total - OLD.amount, count = count - 1
+        WHERE user_id = OLD.user_id AND category = OLD.category AND month = substr(OLD.date, 1, 7);
+        INSERT INTO expense_totals (user_id, category, month, total, count)
+        VALUES (NEW.user_id, NEW.category, substr(NEW.date, 1, 7), NEW.amount, 1)
+        ON CONFLICT (user_id, category, month) DO UPDATE SET total = total + NEW.amount, count = count + 1;
+    END
+    ''',
+]
+
+class Storage:
+    """Owns the assistant database: pragmas, schema migrations, per-thread read
+    connections and a single writer thread that group-commits queued writes.
+    
+    Writes are queued and return Futures; the writer drains whatever has queued up
+    (up to batch_size) into one transaction, so concurrent writers share one fsync.
+    If any write in a batch fails, the batch is rolled back and replayed one write per
+    transaction, so only the failing write's Future fails. In WAL mode readers never
+    block on the writer.
+    """
+    PRAGMAS = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-16000',
+        'PRAGMA busy_timeout=5000',
+    ]
+    
+    # (version, statements); applied in order and recorded in PRAGMA user_version
+    MIGRATIONS = [
+        (1, [
+            '''
             CREATE TABLE IF NOT EXISTS tasks (
                 id INTEGER PRIMARY KEY,
                 task TEXT,
@@ -53,9 +1775,8 @@ class VoiceAssistant:
                 completed BOOLEAN DEFAULT FALSE,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
-        
-        cursor.execute('''
+            ''',
+            '''
             CREATE TABLE IF NOT EXISTS expenses (
                 id INTEGER PRIMARY KEY,
                 amount REAL,
@@ -64,9 +1785,8 @@ class VoiceAssistant:
                 date TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
-        
-        cursor.execute('''
+            ''',
+            '''
             CREATE TABLE IF NOT EXISTS meals (
                 id INTEGER PRIMARY KEY,
                 meal_name TEXT,
@@ -75,168 +1795,1621 @@ class VoiceAssistant:
                 ingredients TEXT,
                 date TEXT
             )
-        ''')
+            ''',
+        ]),
+        (2, [
+            'CREATE INDEX IF NOT EXISTS idx_tasks_open ON tasks(completed, id)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(completed, priority, id)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(completed, due_date)',
+        ]),
+        (3, [
+            'CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)',
+            'CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category, date)',
+            # Running per-category, per-month totals maintained by triggers on every insert/delete
+            '''
+            CREATE TABLE IF NOT EXISTS expense_totals (
+                category TEXT,
+                month TEXT,
+                total REAL NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (category, month)
+            )
+            ''',
+            '''
+            INSERT OR REPLACE INTO expense_totals (category, month, total, count)
+            SELECT category, substr(date, 1, 7), SUM(amount), COUNT(*) FROM expenses GROUP BY category, substr(date, 1, 7)
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS expenses_totals_insert AFTER INSERT ON expenses BEGIN
+                INSERT INTO expense_totals (category, month, total, count)
+                VALUES (NEW.category, substr(NEW.date, 1, 7), NEW.amount, 1)
+                ON CONFLICT (category, month) DO UPDATE SET total = total + NEW.amount, count = count + 1;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS expenses_totals_delete AFTER DELETE ON expenses BEGIN
+                UPDATE expense_totals SET total = total - OLD.amount, count = count - 1
+                WHERE category = OLD.category AND month = substr(OLD.date, 1, 7);
+            END
+            ''',
+        ]),
+        (4, [
+            '''
+            CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY,
+                message TEXT,
+                due_at REAL,
+                fired BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_reminders_pending ON reminders(fired, due_at)',
+        ]),
+        # Per-user data for the session server; existing rows belong to the local user
+        (5, [
+            "ALTER TABLE tasks ADD COLUMN user_id TEXT NOT NULL DEFAULT 'local'",
+            "ALTER TABLE expenses ADD COLUMN user_id TEXT NOT NULL DEFAULT 'local'",
+            "ALTER TABLE meals ADD COLUMN user_id TEXT NOT NULL DEFAULT 'local'",
+            "ALTER TABLE reminders ADD COLUMN user_id TEXT NOT NULL DEFAULT 'local'",
+            'DROP INDEX IF EXISTS idx_tasks_open',
+            'DROP INDEX IF EXISTS idx_tasks_priority',
+            'DROP INDEX IF EXISTS idx_tasks_due',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_open ON tasks(user_id, completed, id)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(user_id, completed, priority, id)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(user_id, completed, due_date)',
+            'DROP INDEX IF EXISTS idx_expenses_category',
+            'CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(user_id, category, date)',
+            'DROP TRIGGER IF EXISTS expenses_totals_insert',
+            'DROP TRIGGER IF EXISTS expenses_totals_delete',
+            'DROP TABLE IF EXISTS expense_totals',
+            '''
+            CREATE TABLE expense_totals (
+                user_id TEXT,
+                category TEXT,
+                month TEXT,
+                total REAL NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, category, month)
+            )
+            ''',
+            '''
+            INSERT INTO expense_totals (user_id, category, month, total, count)
+            SELECT user_id, category, substr(date, 1, 7), SUM(amount), COUNT(*) FROM expenses
+            GROUP BY user_id, category, substr(date, 1, 7)
+            ''',
+            '''
+            CREATE TRIGGER expenses_totals_insert AFTER INSERT ON expenses BEGIN
+                INSERT INTO expense_totals (user_id, category, month, total, count)
+                VALUES (NEW.user_id, NEW.category, substr(NEW.date, 1, 7), NEW.amount, 1)
+                ON CONFLICT (user_id, category, month) DO UPDATE SET total = total + NEW.amount, count = count + 1;
+            END
+            ''',
+            '''
+            CREATE TRIGGER expenses_totals_delete AFTER DELETE ON expenses BEGIN
+                UPDATE expense_totals SET total = total - OLD.amount, count = count - 1
+                WHERE user_id = OLD.user_id AND category = OLD.category AND month = substr(OLD.date, 1, 7);
+            END
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders(user_id, fired, due_at)',
+        ]),
+        # Meal plans are replaced and totalled per user and day
+        (6, [
+            'CREATE INDEX IF NOT EXISTS idx_meals_user_date ON meals(user_id, date)',
+        ]),
+        # Spaced-repetition state of every vocabulary card a user has started learning
+        (7, [
+            '''
+            CREATE TABLE IF NOT EXISTS vocab_cards (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL DEFAULT 'local',
+                language TEXT NOT NULL,
+                term TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                easiness REAL NOT NULL DEFAULT 2.5,
+                interval_days REAL NOT NULL DEFAULT 0,
+                repetitions INTEGER NOT NULL DEFAULT 0,
+                due_at REAL NOT NULL,
+                reviewed_at REAL,
+                UNIQUE (user_id, language, term)
+            )
+            ''',
+        ]),
+        # Reporting: row changes are logged by triggers and folded into rollups by Reports.refresh()
+        (8, [
+            '''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                day TEXT,
+                key TEXT NOT NULL,
+                value REAL NOT NULL,
+                sign INTEGER NOT NULL
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS rollups (
+                user_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                grain TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                key TEXT NOT NULL,
+                total REAL NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                days INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, source, grain, bucket, key)
+            ) WITHOUT ROWID
+            ''',
+            *change_log_statements(),
+        ]),
+        # Task rollups counted UTC days: rebuild them from the local day each task was created
+        (9, [
+            *(f'DROP TRIGGER IF EXISTS tasks_log_{event}' for event in ('insert', 'delete', 'update')),
+            "DELETE FROM change_log WHERE source = 'tasks'",
+            "DELETE FROM rollups WHERE source = 'tasks'",
+            *change_log_statements(['tasks']),
+        ]),
+        # Fired reminders waiting for a session server user's next request
+        (10, [
+            '''
+            CREATE TABLE IF NOT EXISTS announcements (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                text TEXT NOT NULL
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_announcements_user ON announcements (user_id)',
+        ]),
+        # How far into each language's word list a user's new cards have got
+        (11, [
+            '''
+            CREATE TABLE IF NOT EXISTS vocab_progress (
+                user_id TEXT NOT NULL,
+                language TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (user_id, language)
+            )
+            ''',
+        ]),
+        # NULL categories never matched ON CONFLICT in expense_totals: rebuild expenses with category
+        # NOT NULL (dropping the old table drops its indexes and triggers) and recount the rollups
+        (12, [
+            '''
+            CREATE TABLE expenses_rebuilt (
+                id INTEGER PRIMARY KEY,
+                amount REAL,
+                category TEXT NOT NULL DEFAULT 'other',
+                description TEXT,
+                date TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                user_id TEXT NOT NULL DEFAULT 'local'
+            )
+            ''',
+            '''
+            INSERT INTO expenses_rebuilt (id, amount, category, description, date, created_at, user_id)
+            SELECT id, amount, COALESCE(NULLIF(category, ''), 'other'), description, date, created_at, user_id
+            FROM expenses
+            ''',
+            'DROP TABLE expenses',
+            'ALTER TABLE expenses_rebuilt RENAME TO expenses',
+            'CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)',
+            'CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(user_id, category, date)',
+            'DELETE FROM expense_totals',
+            '''
+            INSERT INTO expense_totals (user_id, category, month, total, count)
+            SELECT user_id, category, substr(date, 1, 7), SUM(amount), COUNT(*) FROM expenses
+            GROUP BY user_id, category, substr(date, 1, 7)
+            ''',
+            *EXPENSE_TOTALS_TRIGGERS,
+            "DELETE FROM change_log WHERE source = 'expenses'",
+            "DELETE FROM rollups WHERE source = 'expenses'",
+            *change_log_statements(['expenses']),
+        ]),
+    ]
+    
+    STOP = object()
+    
+    def __init__(self, path='assistant_data.db', batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        self.local = threading.local()
+        self.readers = []
+        self.readers_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.stats = {'writes': 0, 'commits': 0}
+        
+        self.writer_conn = self.connect()
+        self.migrate()
+        self.writer = threading.Thread(target=self.write_loop, name="storage-writer", daemon=True)
+        self.writer.start()
+    
+    def connect(self):
+        # isolation_level=None: transactions are managed explicitly with BEGIN/COMMIT
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def migrate(self):
+        conn = self.writer_conn
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for target, statements in self.MIGRATIONS:
+            if target <= version:
+                continue
+            conn.execute('BEGIN')
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {target}')
+            conn.execute('COMMIT')
+    
+    def reader(self):
+        """This thread's read connection"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
+            with self.readers_lock:
+                self.readers.append(conn)
+        return conn
+    
+    def query(self, sql, params=()):
+        return self.reader().execute(sql, params).fetchall()
+    
+    def submit(self, fn):
+        """Queue fn(conn) to run inside the writer's next transaction; returns a Future of its result"""
+        future = Future()
+        self.queue.put((fn, future))
+        return future
+    
+    def write(self, sql, params=()):
+        """Queue one statement; the Future resolves to its cursor once committed"""
+        return self.submit(lambda conn: conn.execute(sql, params))
+    
+    def write_many(self, sql, rows):
+        return self.submit(lambda conn: conn.executemany(sql, rows))
+    
+    def flush(self):
+        """Block until everything queued so far is committed"""
+        self.submit(lambda conn: None).result()
+    
+    def write_loop(self):
+        conn = self.writer_conn
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stopping = any(item is self.STOP for item in batch)
+            batch = [item for item in batch if item is not self.STOP]
+            if batch:
+                self.commit_batch(conn, batch)
+            if stopping:
+                return
+    
+    def commit_batch(self, conn, batch):
+        try:
+            conn.execute('BEGIN')
+            results = [fn(conn) for fn, _ in batch]
+            conn.execute('COMMIT')
+        except Exception as e:
+            conn.execute('ROLLBACK')
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+            else:
+                # Replay one write per transaction so only the failing write fails
+                for item in batch:
+                    self.commit_batch(conn, [item])
+            return
         
-        self.conn.commit()
+        self.stats['writes'] += len(batch)
+        self.stats['commits'] += 1
+        # Futures resolve only after COMMIT, so callers can read their own writes
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+    
+    def close(self):
+        self.queue.put(self.STOP)
+        self.writer.join()
+        self.writer_conn.close()
+        with self.readers_lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers.clear()
+
+# Reporting
+class Reports:
+    """Weekly and monthly trends over tasks, expenses and meals, read from materialized rollups.
+    
+    Triggers append every insert, update and delete on those tables to `change_log` as a
+    signed (day, key, value) delta. refresh() folds whatever has been logged since the
+    last refresh into `rollups`, one row per user, source, grain (day, week or month),
+    bucket and key, plus a '*' key over all keys, then clears the log, all in one writer
+    transaction. Work is proportional to the changes, never to the size of the tables, and
+    a report is a primary key range read of a few dozen rows.
+    
+    `total` sums the value (amount, calories, or 1 for a completed task), `count` the rows
+    and `days` the days with any rows in a week or month, for per-day averages. Weeks are
+    keyed by their Monday. Reports refresh first, so they include every committed write.
+    With `interval` a background thread also refreshes every `interval` seconds, so the
+    log stays small while nobody asks for a report.
+    """
+    GRAINS = ('day', 'week', 'month')
+    REFRESH_SECONDS = 60
+    # column -> pyarrow type name
+    EXPORT_COLUMNS = {'user_id': 'string', 'source': 'string', 'grain': 'string', 'bucket': 'string',
+                      'key': 'string', 'total': 'float64', 'count': 'int64', 'days': 'int64'}
+    UPSERT = '''
+        INSERT INTO rollups (user_id, source, grain, bucket, key, total, count, days) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, source, grain, bucket, key) DO UPDATE
+        SET total = total + excluded.total, count = count + excluded.count, days = days + excluded.days
+    '''
+    
+    def __init__(self, storage, interval=None):
+        self.storage = storage
+        self.buckets = {}  # day -> (week, month)
+        self.stopping = threading.Event()
+        self.thread = None
+        if interval:
+            self.thread = threading.Thread(target=self.run, args=(interval,), name="reports", daemon=True)
+            self.thread.start()
+    
+    def run(self, interval):
+        while not self.stopping.wait(interval):
+            self.refresh()
+    
+    def close(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+    
+    def refresh(self):
+        """Apply logged changes to the rollups; returns how many there were"""
+        if not self.storage.query('SELECT 1 FROM change_log LIMIT 1'):
+            return 0
+        return self.storage.submit(self.apply_changes).result()
+    
+    def apply_changes(self, conn):
+        last = conn.execute('SELECT MAX(seq) FROM change_log').fetchone()[0]
+        if last is None:
+            return 0
+        deltas = {}  # (user_id, source, day, key) -> [total, count]
+        changes = 0
+        for source, user_id, day, key, value, sign in conn.execute(
+                'SELECT source, user_id, day, key, value, sign FROM change_log WHERE seq <= ?', (last,)):
+            changes += 1
+            if not day:
+                continue
+            for k in (key, '*'):
+                delta = deltas.setdefault((user_id, source, day[:10], k), [0.0, 0])
+                delta[0] += sign * value
+                delta[1] += sign
+        
+        periods = {}  # (user_id, source, grain, bucket, key) -> [total, count, days]
+        emptied = []
+        for (user_id, source, day, key), (total, count) in deltas.items():
+            if not count and not total:
+                continue  # cancelled out, such as a meal plan replaced by the same meals
+            # The day row's count before and after says whether a week or month gained or lost a day
+            after = conn.execute(self.UPSERT + ' RETURNING count', (user_id, source, 'day', day, key, total, count, 0)).fetchone()[0]
+            gained = (after > 0) - (after - count > 0)
+            if not after:
+                emptied.append((user_id, source, 'day', day, key))
+            for grain, bucket in zip(('week', 'month'), self.periods(day)):
+                period = periods.setdefault((user_id, source, grain, bucket, key), [0.0, 0, 0])
+                period[0] += total
+                period[1] += count
+                period[2] += gained
+        conn.executemany(self.UPSERT, [(*k, *v) for k, v in periods.items() if any(v)])
+        emptied += [k for k, (_, count, _) in periods.items() if count <= 0]  # the DELETE checks they are empty
+        conn.executemany('DELETE FROM rollups WHERE user_id = ? AND source = ? AND grain = ? AND bucket = ? AND key = ? '
+                         'AND count = 0', emptied)
+        conn.execute('DELETE FROM change_log WHERE seq <= ?', (last,))
+        return changes
+    
+    def periods(self, day):
+        """(week, month) buckets of an ISO date; weeks are named by their Monday"""
+        buckets = self.buckets.get(day)
+        if buckets is None:
+            date = datetime.date.fromisoformat(day)
+            buckets = self.buckets[day] = ((date - datetime.timedelta(days=date.weekday())).isoformat(), day[:7])
+        return buckets
+    
+    def rows(self, user_id, source, grain, key='*', since=None):
+        """(bucket, total, count, days) for one key in bucket order, from the `since` bucket on"""
+        self.refresh()
+        return self.storage.query('SELECT bucket, total, count, days FROM rollups '
+                                  'WHERE user_id = ? AND source = ? AND grain = ? AND bucket >= ? AND key = ? '
+                                  'ORDER BY bucket', (user_id, source, grain, since or '', key))
+    
+    def spending(self, user_id, grain='month', since=None):
+        """(bucket, total spent, {category: spent}) per week or month"""
+        self.refresh()
+        trend = {}
+        for bucket, key, total in self.storage.query(
+                'SELECT bucket, key, total FROM rollups WHERE user_id = ? AND source = ? AND grain = ? AND bucket >= ? '
+                'ORDER BY bucket', (user_id, 'expenses', grain, since or '')):
+            entry = trend.setdefault(bucket, [bucket, 0.0, {}])
+            if key == '*':
+                entry[1] = round(total, 2)
+            else:
+                entry[2][key] = round(total, 2)
+        return [tuple(entry) for entry in trend.values()]
+    
+    def completion(self, user_id, grain='week', since=None):
+        """(bucket, tasks created, of those completed, completion rate) per week or month"""
+        return [(bucket, count, int(total), total / count) for bucket, total, count, _ in
+                self.rows(user_id, 'tasks', grain, since=since) if count]
+    
+    def calories(self, user_id, grain='week', since=None):
+        """(bucket, days with meals, meals, average calories per day) per week or month"""
+        return [(bucket, days, count, total / days) for bucket, total, count, days in
+                self.rows(user_id, 'meals', grain, since=since) if days]
+    
+    def summary(self, user_id='local', grain='week', periods=4):
+        """The last few weeks or months of every report, as text lines"""
+        lines = []
+        for bucket, spent, categories in self.spending(user_id, grain)[-periods:]:
+            top = ", ".join(f"{category} ${amount:.2f}" for category, amount in
+                            sorted(categories.items(), key=lambda item: -item[1])[:3])
+            lines.append(f"{grain} of {bucket}: spent ${spent:.2f} ({top})")
+        for bucket, created, completed, rate in self.completion(user_id, grain)[-periods:]:
+            lines.append(f"{grain} of {bucket}: completed {completed} of {created} new tasks ({rate:.0%})")
+        for bucket, days, meals, per_day in self.calories(user_id, grain)[-periods:]:
+            lines.append(f"{grain} of {bucket}: {per_day:.0f} calories a day over {days} day{'s' if days > 1 else ''} "
+                         f"({meals} meals)")
+        return lines or ["Nothing recorded yet."]
+    
+    def export(self, directory, format='parquet'):
+        """Write the rollups as one columnar file per grain; returns the paths.
+        
+        `format` is 'parquet' or 'arrow' (Arrow IPC), both through pyarrow, or 'csv'. Without
+        pyarrow installed the files are written as CSV.
+        """
+        self.refresh()
+        if format != 'csv':
+            try:
+                import pyarrow
+                import pyarrow.ipc
+                import pyarrow.parquet
+            except ImportError:
+                format = 'csv'
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for grain in self.GRAINS:
+            path = os.path.join(directory, f"rollups_{grain}.{format}")
+            cursor = self.storage.reader().execute(
+                f"SELECT {', '.join(self.EXPORT_COLUMNS)} FROM rollups WHERE grain = ? ORDER BY user_id, source, bucket, key",
+                (grain,))
+            if format == 'csv':
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(self.EXPORT_COLUMNS)
+                    writer.writerows(cursor)
+            else:
+                columns = list(zip(*cursor)) or [()] * len(self.EXPORT_COLUMNS)
+                table = pyarrow.table({name: pyarrow.array(values, type=getattr(pyarrow, kind)())
+                                       for (name, kind), values in zip(self.EXPORT_COLUMNS.items(), columns)})
+                if format == 'parquet':
+                    pyarrow.parquet.write_table(table, path)
+                else:
+                    with pyarrow.OSFile(path, 'wb') as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+            paths.append(path)
+        return paths
+
+# Reminders
+@dataclass(slots=True)
+class Reminder:
+    id: int
+    message: str
+    due_at: float  # epoch seconds
+    user_id: str = 'local'
+
+class ManualClock:
+    """A clock that only moves when advanced; pass it as `clock` to drive schedulers deterministically."""
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+class ReminderScheduler:
+    """Pending reminders in a min-heap keyed by due time, fired by one dedicated thread.
+    
+    The thread sleeps on a Condition until the earliest reminder is due, or until a
+    sooner one is added, so nothing polls. Adding is a heap push; cancelling forgets
+    the id and its heap entry is skipped once it reaches the top, so both are O(log n).
+    Reminders are written through Storage and reloaded on start, so they survive
+    restarts; any that came due while the assistant was off fire straight away.
+    
+    Pass a fake `clock` (and start=False) to drive it deterministically with run_pending().
+    user_id limits the scheduler to one user's reminders; None (the session server) takes everyone's.
+    With mark_fired=False a reminder stays unfired in storage until delivered() is called
+    for it, so one that fires but is never spoken fires again after a restart.
+    """
+    def __init__(self, storage=None, on_fire=None, clock=time.time, start=True, user_id='local', mark_fired=True):
+        self.storage = storage
+        self.user_id = user_id
+        self.on_fire = on_fire
+        self.mark_fired = mark_fired
+        self.clock = clock
+        self.heap = []  # (due_at, id); may hold entries for cancelled reminders
+        self.pending = {}  # id -> Reminder
+        self.next_id = 1
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.stats = {'added': 0, 'cancelled': 0, 'fired': 0, 'wakeups': 0}
+        self.load()
+        
+        self.thread = None
+        if start:
+            self.thread = threading.Thread(target=self.run, name="reminders", daemon=True)
+            self.thread.start()
+    
+    def load(self):
+        if self.storage is None:
+            return
+        sql = 'SELECT id, message, due_at, user_id FROM reminders WHERE fired = 0'
+        params = ()
+        if self.user_id is not None:
+            sql, params = sql + ' AND user_id = ?', (self.user_id,)
+        for reminder_id, message, due_at, user_id in self.storage.query(sql, params):
+            self.pending[reminder_id] = Reminder(reminder_id, message, due_at, user_id)
+        self.heap = [(reminder.due_at, reminder.id) for reminder in self.pending.values()]
+        heapq.heapify(self.heap)
+        self.next_id = self.storage.query('SELECT COALESCE(MAX(id), 0) + 1 FROM reminders')[0][0]
+    
+    def add(self, message, due_at, user_id='local'):
+        with self.condition:
+            reminder = Reminder(self.next_id, message, due_at, user_id)
+            self.next_id += 1
+            self.pending[reminder.id] = reminder
+            heapq.heappush(self.heap, (due_at, reminder.id))
+            self.stats['added'] += 1
+            if self.storage is not None:
+                # Queued under the lock so the writer sees adds, cancels and fires in order
+                self.storage.write('INSERT INTO reminders (id, message, due_at, user_id) VALUES (?, ?, ?, ?)',
+                                   (reminder.id, message, due_at, user_id))
+            # Only a new earliest reminder changes how long the thread should sleep
+            if self.heap[0][1] == reminder.id:
+                self.condition.notify()
+        return reminder
+    
+    def add_in(self, message, seconds, user_id='local'):
+        return self.add(message, self.clock() + seconds, user_id)
+    
+    def cancel(self, reminder_id, user_id=None):
+        with self.condition:
+            reminder = self.pending.get(reminder_id)
+            if reminder is None or (user_id is not None and reminder.user_id != user_id):
+                return False
+            del self.pending[reminder_id]
+            self.stats['cancelled'] += 1
+            if self.storage is not None:
+                self.storage.write('DELETE FROM reminders WHERE id = ?', (reminder_id,))
+            # Rebuild once cancelled entries dominate the heap, keeping the cost amortized O(1)
+            if len(self.heap) > 2 * len(self.pending) + 64:
+                self.heap = [(reminder.due_at, reminder.id) for reminder in self.pending.values()]
+                heapq.heapify(self.heap)
+        return True
+    
+    def upcoming(self, limit=10, user_id=None):
+        """The next `limit` pending reminders (for one user, if given), soonest first"""
+        with self.condition:
+            reminders = self.pending.values()
+            if user_id is not None:
+                reminders = [reminder for reminder in reminders if reminder.user_id == user_id]
+            return heapq.nsmallest(limit, reminders, key=lambda reminder: reminder.due_at)
+    
+    def pop_due(self):
+        """Remove and return every reminder due by now; call with the condition held"""
+        now = self.clock()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, reminder_id = heapq.heappop(self.heap)
+            reminder = self.pending.pop(reminder_id, None)
+            if reminder is not None:  # None: cancelled after it was scheduled
+                due.append(reminder)
+        if due:
+            self.stats['fired'] += len(due)
+            if self.mark_fired:
+                self.delivered(due)
+        return due
+    
+    def delivered(self, reminders):
+        """Record reminders as fired so they are not loaded again"""
+        if self.storage is not None:
+            self.storage.write_many('UPDATE reminders SET fired = 1 WHERE id = ?',
+                                    [(reminder.id,) for reminder in reminders])
+    
+    def fire(self, due):
+        if self.on_fire is not None:
+            for reminder in due:
+                self.on_fire(reminder)
+    
+    def run_pending(self):
+        """Fire every reminder that is due now; returns them"""
+        with self.condition:
+            due = self.pop_due()
+        self.fire(due)
+        return due
+    
+    def wake(self):
+        """Make the thread re-check the clock (after a fake clock has been advanced)"""
+        with self.condition:
+            self.condition.notify()
+    
+    def run(self):
+        while True:
+            with self.condition:
+                if self.stopping:
+                    return
+                due = self.pop_due()
+                if not due:
+                    timeout = max(self.heap[0][0] - self.clock(), 0) if self.heap else None
+                    self.condition.wait(timeout)
+                    self.stats['wakeups'] += 1
+                    continue
+            # on_fire runs outside the lock so it may add or cancel reminders
+            self.fire(due)
+    
+    def close(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+# Dialogue
+# Slot parsers take the text of an utterance and return (value, text with the value's words
+# removed), or None when the utterance says nothing about that slot.
+UNITS = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'eleven',
+         'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen', 'nineteen']
+TENS = ['twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+ORDINALS = ['first', 'second', 'third', 'fourth', 'fifth', 'sixth', 'seventh', 'eighth', 'ninth', 'tenth']
+NUMBER_WORDS = {word: i for i, word in enumerate(UNITS)}
+NUMBER_WORDS.update({word: 20 + 10 * i for i, word in enumerate(TENS)})
+NUMBER = (rf"\d+(?:\.\d+)?|(?:{'|'.join(TENS)})(?:[\s-](?:{'|'.join(UNITS[1:10])}))?"
+          rf"|{'|'.join(sorted(UNITS, key=len, reverse=True))}")
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+# Full names or the usual abbreviations only, so "novel", "mary" and "deck" are not months
+MONTH = (r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?"
+         r"|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b")
+DATE_PREFIX = r"(?:(?:due|by|on|for)\s+)?"
+
+AMOUNT_PATTERNS = [
+    re.compile(r"\$\s*(\d+(?:\.\d{1,2})?)"),
+    re.compile(rf"\b({NUMBER})\s*(?:dollars?|bucks|usd)\b"),
+    re.compile(r"\b(\d+(?:\.\d{1,2})?)\b"),
+]
+PRIORITY_PATTERN = re.compile(r"\b(?:(high|medium|low|normal)\s+priority|priority\s+(?:is\s+)?(high|medium|low|normal)"
+                              r"|(urgent|important))\b")
+TASK_NUMBER_PATTERN = re.compile(rf"\b(?:number\s+|task\s+)?(?:(\d+)(?:st|nd|rd|th)?|({'|'.join(ORDINALS)})"
+                                 rf"|({NUMBER}))\b|#\s*(\d+)\b")
+WHEN_PATTERN = re.compile(rf"\bin\s+({NUMBER}|an?)\s+(second|minute|hour|day)s?\b"
+                          r"|\bat\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b")
+UNIT_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+REMINDER_HOUR = 9  # when a reminder names a day but no time of day
+DATE_PATTERNS = [
+    re.compile(rf"\b{DATE_PREFIX}(day after tomorrow|today|tonight|tomorrow|yesterday)\b"),
+    re.compile(rf"\b{DATE_PREFIX}(next\s+)?({'|'.join(WEEKDAYS)})\b"),
+    re.compile(rf"\b{DATE_PREFIX}in\s+({NUMBER}|an?)\s+(day|week)s?\b"),
+    re.compile(r"\b(\d{4}-\d{2}-\d{2})\b"),
+    re.compile(rf"\b{DATE_PREFIX}{MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b"),
+    re.compile(rf"\b{DATE_PREFIX}(?:the\s+)?(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{MONTH}\b"),
+]
+FILLER_WORDS = {'to', 'about', 'that', 'for', 'on', 'and', 'please', 'of', 'by', 'at', 'due', 'with', 'called'}
+
+def number_value(text):
+    """12, 12.5, "seven" or "twenty one" as a number"""
+    try:
+        return float(text)
+    except ValueError:
+        return sum(NUMBER_WORDS[word] for word in re.split(r"[\s-]+", text))
+
+def remove_span(text, match):
+    return ' '.join((text[:match.start()] + ' ' + text[match.end():]).split())
+
+def parse_amount(text):
+    for pattern in AMOUNT_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return round(number_value(match.group(1)), 2), remove_span(text, match)
+    return None
+
+def parse_priority(text):
+    match = PRIORITY_PATTERN.search(text)
+    if match is None:
+        return None
+    word = match.group(1) or match.group(2) or 'high'
+    return ('medium' if word == 'normal' else word), remove_span(text, match)
+
+def parse_task_number(text):
+    match = TASK_NUMBER_PATTERN.search(text)
+    if match is None:
+        return None
+    digits, ordinal, words, hashed = match.groups()
+    if ordinal:
+        number = ORDINALS.index(ordinal) + 1
+    else:
+        number = int(number_value(digits or hashed or words))
+    return number, remove_span(text, match)
+
+def parse_date(text, today=None):
+    """ISO date for "tomorrow", "next friday", "in 3 days", "2026-05-01", "may 1st" or "1 may" """
+    today = today or datetime.date.today()
+    for kind, pattern in enumerate(DATE_PATTERNS):
+        match = pattern.search(text)
+        if match is None:
+            continue
+        if kind == 0:
+            offsets = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'yesterday': -1, 'day after tomorrow': 2}
+            date = today + datetime.timedelta(days=offsets[match.group(1)])
+        elif kind == 1:
+            ahead = (WEEKDAYS.index(match.group(2)) - today.weekday()) % 7
+            date = today + datetime.timedelta(days=ahead or (7 if match.group(1) else 0))
+        elif kind == 2:
+            count = 1 if match.group(1) in ('a', 'an') else int(number_value(match.group(1)))
+            date = today + datetime.timedelta(days=count * (7 if match.group(2) == 'week' else 1))
+        elif kind == 3:
+            try:
+                date = datetime.date.fromisoformat(match.group(1))
+            except ValueError:
+                continue
+        else:
+            month, day = (match.group(1), match.group(2)) if kind == 4 else (match.group(2), match.group(1))
+            try:
+                date = datetime.date(today.year, MONTHS.index(month[:3]) + 1, int(day))
+                if date < today:
+                    date = date.replace(year=today.year + 1)
+            except ValueError:
+                continue
+        return date.isoformat(), remove_span(text, match)
+    return None
+
+def parse_when(text, now):
+    """Epoch time for "in 10 minutes", "in an hour", "at 5:30 pm", a day as parse_date() reads it, or a day and a time.
+    
+    A time alone is the next such time; a day alone is at REMINDER_HOUR. A day and time
+    already past is None.
+    """
+    current = datetime.datetime.fromtimestamp(now)
+    match = WHEN_PATTERN.search(text)
+    time_of_day = None
+    if match is not None:
+        amount, unit, hour, minute, meridiem = match.groups()
+        if unit:
+            due_at = now + (1 if amount in ('a', 'an') else number_value(amount)) * UNIT_SECONDS[unit]
+            return due_at, remove_span(text, match)
+        
+        hour, minute = int(hour), int(minute or 0)
+        if hour > 23 or minute > 59:
+            return None
+        if meridiem == 'pm' and hour < 12:
+            hour += 12
+        elif meridiem == 'am' and hour == 12:
+            hour = 0
+        time_of_day = datetime.time(hour, minute)
+        text = remove_span(text, match)
+    
+    date = parse_date(text, current.date())
+    if date is not None:
+        day, text = date
+        due = datetime.datetime.combine(datetime.date.fromisoformat(day), time_of_day or datetime.time(REMINDER_HOUR))
+        if due <= current:
+            return None
+    elif time_of_day is not None:
+        due = datetime.datetime.combine(current.date(), time_of_day)
+        if due <= current:
+            due += datetime.timedelta(days=1)
+    else:
+        return None
+    return due.timestamp(), text
+
+def parse_free_text(text):
+    """Whatever is left of the utterance, minus connecting words at either end"""
+    words = re.sub(r"[^\w\s'$.:-]", ' ', text).split()
+    while words and words[0] in FILLER_WORDS:
+        words.pop(0)
+    while words and words[-1].rstrip('.') in FILLER_WORDS:
+        words.pop()
+    if not words:
+        return None
+    return ' '.join(words).rstrip('.'), ''
+
+@dataclass(frozen=True, slots=True)
+class Slot:
+    name: str
+    parse: Any  # slot parser: text -> (value, remaining text) or None
+    prompt: Optional[str] = None  # asked while the slot is empty; None makes it optional
+    default: Any = None
+
+class DialogueFrame:
+    """An action waiting on its slots, filled from the utterance that started it and from follow-ups.
+    
+    Slots are parsed in order, each from whatever the previous ones left of the text, so
+    structured slots (dates, amounts) come before free-text ones. str() of a frame is the
+    question it is currently asking. `intent` is the router intent of the module that asked,
+    and `restart` matches the command that starts a frame like it.
+    """
+    def __init__(self, slots, action, opening=None, intent=None, restart=None):
+        self.slots = slots
+        self.action = action
+        self.opening = opening  # asked instead of a single slot's prompt while nothing is filled
+        self.intent = intent
+        self.restart = restart
+        self.values = {}
+        self.prompt = None
+    
+    def fill(self, text):
+        """Parse every empty slot out of the text; returns how many were filled.
+        
+        Optional free-text slots are filled but not counted: they would accept any
+        unrelated utterance as an answer.
+        """
+        filled = 0
+        for slot in self.slots:
+            if slot.name not in self.values:
+                parsed = slot.parse(text)
+                if parsed is not None:
+                    self.values[slot.name], text = parsed
+                    filled += slot.prompt is not None or slot.parse is not parse_free_text
+        return filled
+    
+    def answers(self, text):
+        """True if the text fills an empty slot that, unlike free text, not just anything fills"""
+        return any(slot.name not in self.values and slot.parse is not parse_free_text and slot.parse(text) is not None
+                   for slot in self.slots)
+    
+    def step(self, text):
+        """Fill what the text gives; run the action once nothing required is missing, else return self"""
+        self.fill(text)
+        missing = [slot for slot in self.slots if slot.name not in self.values and slot.prompt is not None]
+        if not missing:
+            return self.action(**{slot.name: self.values.get(slot.name, slot.default) for slot in self.slots})
+        self.prompt = self.opening if self.opening and not self.values else missing[0].prompt
+        return self
+    
+    def __str__(self):
+        return self.prompt
+
+class DialogueManager:
+    """Per-session dialogue state: at most one frame waiting for an answer.
+    
+    A follow-up goes straight to the waiting frame instead of through the router. If it
+    fills nothing (the user moved on) or is an exit word, the frame is dropped and the
+    utterance is routed as usual. Free-text slots would accept anything, so a follow-up
+    is also taken for a new command, and the frame dropped, when it starts another frame
+    like the pending one, or when it has a strong keyword for any intent and fills none
+    of the structured slots (dates, amounts, numbers) the frame is waiting for.
+    """
+    CANCEL_WORDS = ('cancel', 'never mind', 'nevermind', 'forget it')
+    
+    def __init__(self, exit_words=(), router=None):
+        self.exit_words = set(exit_words)
+        self.router = router
+        self.pending = None
+        self.stats = {'started': 0, 'follow_ups': 0, 'completed': 0, 'abandoned': 0}
+    
+    def start(self, result):
+        """Handler result -> response text, keeping the frame if the handler is waiting for slots"""
+        if isinstance(result, DialogueFrame):
+            self.pending = result
+            self.stats['started'] += 1
+        return str(result)
+    
+    def follow_up(self, command):
+        """Response to an answer for the pending frame, or None to route the utterance normally"""
+        frame, self.pending = self.pending, None
+        text = command.lower().strip()
+        if text in self.exit_words:
+            self.stats['abandoned'] += 1
+            return None
+        if text.strip('. ') in self.CANCEL_WORDS:
+            self.stats['abandoned'] += 1
+            return "Okay, never mind."
+        if frame.restart is not None and frame.restart.search(text):
+            self.stats['abandoned'] += 1
+            return None
+        if frame.intent is not None and self.router is not None:
+            intent = self.router.route(text)
+            if intent is not None and intent.score >= 1.0 and not frame.answers(text):
+                self.stats['abandoned'] += 1
+                return None
+        if not frame.fill(text):
+            self.stats['abandoned'] += 1
+            return None
+        
+        self.stats['follow_ups'] += 1
+        result = frame.step('')
+        if isinstance(result, DialogueFrame):
+            self.pending = result
+        else:
+            self.stats['completed'] += 1
+        return str(result)
+
+# Module Registry
+class ModuleRegistry:
+    """Assistant modules declared up front and instantiated the first time they are used"""
+    def __init__(self):
+        self.factories = {}  # name -> (factory, handler method name)
+        self.instances = {}
+        self.lock = threading.Lock()
+    
+    def register(self, name, factory, handler):
+        self.factories[name] = (factory, handler)
+    
+    def get(self, name):
+        module = self.instances.get(name)
+        if module is None:
+            with self.lock:
+                module = self.instances.get(name)
+                if module is None:
+                    factory, _ = self.factories[name]
+                    module = self.instances[name] = factory()
+        return module
+    
+    def handle(self, name, command):
+        return getattr(self.get(name), self.factories[name][1])(command)
+    
+    def all(self):
+        """Every module, instantiating any that have not been used yet"""
+        return [self.get(name) for name in self.factories]
+    
+    def loaded(self):
+        return list(self.instances)
+
+class VoiceAssistant:
+    # intent -> (keywords, weak keywords); order is the tie-break priority
+    INTENT_KEYWORDS = {
+        'study': (['math', 'science', 'history', 'study', 'homework', 'algebra', 'geometry', 'calculus',
+                   'physics', 'chemistry', 'biology', 'solve'], []),
+        'wellness': (['mindfulness', 'meditation', 'meditate', 'stress', 'wellness', 'relax', 'breathing',
+                      'breathe', 'affirmation', 'anxiety', 'anxious'], []),
+        'productivity': (['task', 'reminder', 'remind', 'todo', 'schedule', 'productivity'], []),
+        'support': (['support', 'account', 'password', 'billing', 'refund'], ['help', 'problem', 'issue']),
+        'finance': (['money', 'budget', 'expense', 'finance', 'spend', 'spent', 'spending', 'saving'], []),
+        'meal': (['meal', 'food', 'nutrition', 'recipe', 'diet', 'breakfast', 'lunch', 'dinner', 'calorie', 'menu'], []),
+        'tech': (['tech', 'computer', 'wifi', 'troubleshoot', 'printer', 'internet', 'laptop'], ['fix']),
+        'language': (['language', 'translate', 'spanish', 'french', 'german', 'vocabulary', 'quiz', 'flashcard'],
+                     ['learn', 'practice', 'mean']),
+    }
+    STOP_WORDS = ['stop', 'quit', 'exit']
+    
+    GREETING = "Hello! I'm your personal AI assistant. I can help you with studies, wellness, productivity, support, finance, meals, tech issues, and language learning. How can I assist you today?"
+    GOODBYE = "Goodbye! Have a great day!"
+    FALLBACK_RESPONSE = "I'm not sure how to help with that. Try asking about studies, wellness, tasks, support, finance, meals, tech issues, or language learning."
+
+    # Modules holding one user's data; the rest are shared by every session of a SessionServer
+    PER_USER_MODULES = ('productivity', 'finance', 'meal', 'language')
+    
+    def __init__(self, input_adapter=None, output_adapter=None, db_path='assistant_data.db'):
+        self.user_id = 'local'
+        
+        # Speech I/O is the default; text adapters let the assistant run headless.
+        # Audio engines start up in the background while the rest of the assistant loads.
+        self.input = input_adapter if input_adapter is not None else BackgroundAdapter(SpeechInput)
+        self.output = output_adapter if output_adapter is not None else BackgroundAdapter(SpeechOutput)
+        
+        # Initialize database
+        self.db_path = db_path
+        self.init_database()
+        
+        # Fired reminders are queued here and spoken between turns (or by the pipeline's speak stage);
+        # each is marked fired in storage only once it has been spoken
+        self.announcements = queue.SimpleQueue()
+        self.announce_hook = None
+        self.reminders = ReminderScheduler(self.storage, on_fire=self.remind, mark_fired=False)
+        # Keeps the reporting change log folded into the rollups while the assistant runs
+        self.reports = Reports(self.storage, interval=Reports.REFRESH_SECONDS)
+        
+        # Declare assistant modules; each one is built the first time a command routes to it
+        self.modules = ModuleRegistry()
+        for name, (factory, handler) in self.module_factories().items():
+            self.modules.register(name, factory, handler)
+        
+        # Build the intent router once instead of scanning keyword lists per command
+        self.router = self.build_router()
+        self.dialogue = DialogueManager(self.STOP_WORDS, self.router)
+        
+        self.is_listening = False
+    
+    def module_factories(self):
+        """name -> (factory, handler method name) for every assistant module"""
+        return {
+            'study': (StudyAssistant, 'handle_query'),
+            'wellness': (WellnessAssistant, 'handle_request'),
+            'productivity': (lambda: ProductivityAssistant(TaskStore(self.storage, self.user_id), self.reminders),
+                             'handle_task'),
+            'support': (SupportChatbot, 'handle_support'),
+            'finance': (lambda: FinanceAssistant(ExpenseLedger(self.storage, self.user_id)), 'handle_finance'),
+            'meal': (lambda: MealPlanner(MealLog(self.storage, self.user_id)), 'handle_meal_request'),
+            'tech': (TechTroubleshooter, 'handle_tech_issue'),
+            'language': (lambda: LanguageBuddy(ReviewScheduler(self.storage, self.user_id)), 'handle_language_request'),
+        }
+    
+    study_assistant = property(lambda self: self.modules.get('study'))
+    wellness_assistant = property(lambda self: self.modules.get('wellness'))
+    productivity_assistant = property(lambda self: self.modules.get('productivity'))
+    support_chatbot = property(lambda self: self.modules.get('support'))
+    finance_assistant = property(lambda self: self.modules.get('finance'))
+    meal_planner = property(lambda self: self.modules.get('meal'))
+    tech_troubleshooter = property(lambda self: self.modules.get('tech'))
+    language_buddy = property(lambda self: self.modules.get('language'))
+        
+    def init_database(self):
+        """Open the SQLite storage layer and bring the schema up to date"""
+        self.storage = Storage(self.db_path)
     
     def speak(self, text):
-        """Convert text to speech"""
-        print(f"Assistant: {text}")
-        self.tts_engine.say(text)
-        self.tts_engine.runAndWait()
+        """Send a response to the output adapter"""
+        with tracer.stage('speak'):
+            self.output.say(text)
     
     def listen(self):
-        """Listen for voice input"""
-        try:
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source)
-                print("Listening...")
-                audio = self.recognizer.listen(source, timeout=5)
-                
-            command = self.recognizer.recognize_google(audio).lower()
-            print(f"You said: {command}")
-            return command
-            
-        except sr.UnknownValueError:
-            return "Sorry, I didn't understand that."
-        except sr.RequestError:
-            return "Sorry, there was an error with the speech recognition service."
-        except sr.WaitTimeoutError:
-            return "timeout"
+        """Read the next command from the input adapter (None once input is exhausted)"""
+        return self.input.listen()
+    
+    def remind(self, reminder):
+        """Called on the scheduler thread when a reminder comes due"""
+        self.announce(f"Reminder: {reminder.message}", reminder)
+    
+    def announce(self, text, reminder=None):
+        """Queue something to say that the user did not ask for"""
+        self.announcements.put((text, reminder))
+        hook = self.announce_hook
+        if hook is not None:
+            hook()
+    
+    def drain_announcements(self):
+        """Queued (text, reminder or None) announcements, oldest first"""
+        announcements = []
+        while True:
+            try:
+                announcements.append(self.announcements.get_nowait())
+            except queue.Empty:
+                return announcements
+    
+    def announced(self, reminder):
+        """Mark a reminder fired once its announcement has been spoken"""
+        if reminder is not None:
+            self.reminders.delivered([reminder])
+    
+    @classmethod
+    def build_router(cls):
+        """Compile the keyword tables into an IntentRouter"""
+        router = IntentRouter()
+        for name, (keywords, weak_keywords) in cls.INTENT_KEYWORDS.items():
+            router.add_intent(name, keywords, weak_keywords)
+        router.add_fallback('stop', cls.STOP_WORDS)
+        return router
     
     def process_command(self, command):
         """Process voice commands and route to appropriate module"""
-        if any(word in command for word in ['math', 'science', 'history', 'study', 'homework']):
-            return self.study_assistant.handle_query(command)
-            
-        elif any(word in command for word in ['mindfulness', 'meditation', 'stress', 'wellness', 'relax']):
-            return self.wellness_assistant.handle_request(command)
-            
-        elif any(word in command for word in ['task', 'reminder', 'todo', 'schedule', 'productivity']):
-            return self.productivity_assistant.handle_task(command)
-            
-        elif any(word in command for word in ['support', 'help', 'problem', 'issue']):
-            return self.support_chatbot.handle_support(command)
-            
-        elif any(word in command for word in ['money', 'budget', 'expense', 'finance', 'spend']):
-            return self.finance_assistant.handle_finance(command)
-            
-        elif any(word in command for word in ['meal', 'food', 'nutrition', 'recipe', 'diet']):
-            return self.meal_planner.handle_meal_request(command)
-            
-        elif any(word in command for word in ['tech', 'computer', 'wifi', 'troubleshoot', 'fix']):
-            return self.tech_troubleshooter.handle_tech_issue(command)
-            
-        elif any(word in command for word in ['language', 'translate', 'learn', 'practice']):
-            return self.language_buddy.handle_language_request(command)
-            
-        elif 'stop' in command or 'quit' in command or 'exit' in command:
+        # An answer to a question we just asked goes straight to the action waiting for it
+        if self.dialogue.pending is not None:
+            with tracer.stage('dialogue'):
+                response = self.dialogue.follow_up(command)
+            if response is not None:
+                return response
+        
+        with tracer.stage('route'):
+            intent = self.router.route(command)
+        
+        if intent is None:
+            return self.FALLBACK_RESPONSE
+        
+        if intent.name == 'stop':
             return "stop"
-            
-        else:
-            return "I'm not sure how to help with that. Try asking about studies, wellness, tasks, support, finance, meals, tech issues, or language learning."
+        
+        with tracer.span('assistant_module_seconds', intent.name):
+            result = self.modules.handle(intent.name, command)
+        return self.dialogue.start(result)
+    
+    @classmethod
+    def core_phrases(cls):
+        """Fixed responses of the assistant itself, cheap enough to pre-render at start-up"""
+        return [cls.GREETING, cls.GOODBYE, cls.FALLBACK_RESPONSE,
+                SpeechInput.NOT_UNDERSTOOD, SpeechInput.SERVICE_ERROR]
+    
+    def static_phrases(self):
+        """Every fixed response the assistant can speak, for pre-rendering speech (builds every module)"""
+        phrases = self.core_phrases()
+        for module in self.modules.all():
+            phrases.extend(module.static_responses())
+        return list(dict.fromkeys(phrases))
     
     def run(self):
         """Main loop for the voice assistant"""
-        self.speak("Hello! I'm your personal AI assistant. I can help you with studies, wellness, productivity, support, finance, meals, tech issues, and language learning. How can I assist you today?")
+        self.speak(self.GREETING)
         
         self.is_listening = True
         
         while self.is_listening:
+            for text, reminder in self.drain_announcements():
+                self.speak(text)
+                self.announced(reminder)
+            # A turn nobody spoke in is never ended; the next begin_turn() drops it
+            tracer.begin_turn()
             command = self.listen()
             
-            if command == "timeout":
+            if command is None:
+                break
+            elif not command or command == "timeout":
                 continue
             elif "Sorry" in command:
                 self.speak(command)
+                tracer.end_turn(outcome='not_recognized')
                 continue
                 
             response = self.process_command(command)
             
             if response == "stop":
-                self.speak("Goodbye! Have a great day!")
+                self.speak(self.GOODBYE)
                 self.is_listening = False
             else:
                 self.speak(response)
+            tracer.end_turn(outcome='ok')
+    
+    def run_pipelined(self, queue_size=4):
+        """Run the assistant as a concurrent asyncio pipeline; returns the pipeline for its metrics"""
+        pipeline = AsyncPipeline(self, queue_size)
+        self.is_listening = True
+        try:
+            asyncio.run(pipeline.run(self.GREETING))
+        finally:
+            self.is_listening = False
+        return pipeline
+    
+    def run_batch(self, commands, output=None):
+        """Stream commands through process_command and return throughput/latency stats"""
+        latencies = []
+        start = time.perf_counter()
+        for command in commands:
+            t0 = time.perf_counter()
+            response = self.process_command(command)
+            latencies.append(time.perf_counter() - t0)
+            if output is not None:
+                output.say(response)
+        elapsed = time.perf_counter() - start
+        
+        latencies.sort()
+        return BatchStats(
+            count=len(latencies),
+            elapsed=elapsed,
+            requests_per_sec=len(latencies) / elapsed if elapsed else 0.0,
+            p50_ms=percentile(latencies, 50) * 1000,
+            p99_ms=percentile(latencies, 99) * 1000,
+        )
+    
+    def close(self):
+        self.reminders.close()
+        self.reports.close()
+        self.input.close()
+        if self.output is not self.input:
+            self.output.close()
+        self.storage.close()
 
-# Study Assistant Module
-class StudyAssistant:
-    def __init__(self):
-        self.math_topics = {
-            'algebra': 'Algebra involves working with variables and equations. Key concepts include solving for x, factoring, and working with polynomials.',
-            'geometry': 'Geometry deals with shapes, angles, and spatial relationships. Important concepts include area, perimeter, and the Pythagorean theorem.',
-            'calculus': 'Calculus involves derivatives and integrals. It helps us understand rates of change and areas under curves.'
-        }
+# Session Server
+class AssistantSession(VoiceAssistant):
+    """One user's conversation on a SessionServer.
+    
+    Storage, the router, the reminder scheduler and the stateless modules belong to the
+    server; a session only builds the modules that hold this user's data.
+    """
+    def __init__(self, server, user_id):
+        self.user_id = user_id
+        self.storage = server.storage
+        self.reminders = server.reminders
+        self.router = server.router
+        self.dialogue = DialogueManager(self.STOP_WORDS, self.router)
+        self.announcements = queue.SimpleQueue()
+        self.announce_hook = None
+        self.lock = asyncio.Lock()  # one request at a time per user, so their commands apply in order
+        self.last_active = time.monotonic()
         
-        self.science_topics = {
-            'physics': 'Physics studies matter, energy, and their interactions. Key areas include mechanics, thermodynamics, and electromagnetism.',
-            'chemistry': 'Chemistry focuses on atoms, molecules, and chemical reactions. Important concepts include the periodic table and chemical bonding.',
-            'biology': 'Biology is the study of living organisms. It covers topics like cells, genetics, evolution, and ecosystems.'
-        }
+        self.modules = ModuleRegistry()
+        for name, (factory, handler) in self.module_factories().items():
+            if name not in self.PER_USER_MODULES:
+                if name not in server.shared.factories:
+                    server.shared.register(name, factory, handler)
+                factory = lambda name=name: server.shared.get(name)
+            self.modules.register(name, factory, handler)
+    
+    def close(self):
+        """Nothing to release: storage and the scheduler belong to the server"""
+
+class SessionServer:
+    """Serves many text users from one process over newline-delimited JSON (TCP or Unix socket).
+    
+    A request is {"user": id, "command": text} and the reply is {"user", "response",
+    "announcements"}, where announcements are reminders that fired for that user since
+    their last request. {"stats": true} returns the server counters and {"metrics": true}
+    the tracer's Prometheus text.
+    
+    Sessions are kept in LRU order, capped at max_sessions and dropped after idle_timeout
+    seconds; an evicted user just gets a fresh session, since everything durable is in the
+    database. That includes fired reminders, which wait in the `announcements` table until
+    their user's next request. Commands block on SQLite, so they run on a thread pool.
+    """
+    def __init__(self, db_path='assistant_data.db', max_sessions=10000, idle_timeout=900.0, workers=8):
+        self.storage = Storage(db_path)
+        self.router = VoiceAssistant.build_router()
+        self.shared = ModuleRegistry()
+        self.sessions = OrderedDict()  # user id -> AssistantSession, least recently active first
+        self.lock = threading.Lock()  # sessions and undelivered; remind() runs on the reminder thread
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session")
+        self.stats = {'requests': 0, 'errors': 0, 'sessions_created': 0, 'evicted': 0}
+        self.undelivered = {user_id for (user_id,) in self.storage.query('SELECT DISTINCT user_id FROM announcements')}
+        self.reminders = ReminderScheduler(self.storage, on_fire=self.remind, user_id=None)
+        self.reports = Reports(self.storage, interval=Reports.REFRESH_SECONDS)
+    
+    def session(self, user_id):
+        with self.lock:
+            session = self.sessions.get(user_id)
+            if session is None:
+                session = self.sessions[user_id] = AssistantSession(self, user_id)
+                self.stats['sessions_created'] += 1
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+                    self.stats['evicted'] += 1
+            else:
+                self.sessions.move_to_end(user_id)
+            session.last_active = time.monotonic()
+        return session
+    
+    def end_session(self, user_id):
+        with self.lock:
+            self.sessions.pop(user_id, None)
+    
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self.lock:
+            # LRU order is last-active order, so idle sessions are all at the front
+            while self.sessions:
+                user_id, session = next(iter(self.sessions.items()))
+                if session.last_active > cutoff:
+                    break
+                del self.sessions[user_id]
+                self.stats['evicted'] += 1
+    
+    def remind(self, reminder):
+        """Store a fired reminder to go out with its user's next reply, whether or not they have a session"""
+        self.storage.write('INSERT INTO announcements (user_id, text) VALUES (?, ?)',
+                           (reminder.user_id, f"Reminder: {reminder.message}"))
+        with self.lock:
+            self.undelivered.add(reminder.user_id)
+    
+    def deliver(self, user_id):
+        """Stored announcements for a user, oldest first, removed as they are handed out"""
+        with self.lock:
+            if user_id not in self.undelivered:
+                return []
+            self.undelivered.discard(user_id)
+        # Queued behind any INSERT a reminder made before the discard, so none is skipped
+        rows = self.storage.submit(lambda conn: conn.execute(
+            'DELETE FROM announcements WHERE user_id = ? RETURNING id, text', (user_id,)).fetchall()).result()
+        return [text for _, text in sorted(rows)]
+    
+    async def handle(self, request):
+        if request.get('stats'):
+            return {**self.stats, 'sessions': len(self.sessions)}
+        if request.get('metrics'):
+            return {'metrics': tracer.export()}
         
-        self.history_topics = {
-            'world war': 'World War 1 occurred from 1914-1918, and World War 2 from 1939-1945. These conflicts reshaped global politics and society.',
-            'ancient rome': 'Ancient Rome was a powerful civilization that lasted from 753 BC to 476 AD, known for its military, law, and engineering.',
-            'renaissance': 'The Renaissance was a period of cultural rebirth in Europe from the 14th to 17th centuries, marked by advances in art and science.'
-        }
+        user_id, command = str(request['user']), str(request['command'])
+        session = self.session(user_id)
+        loop = asyncio.get_running_loop()
+        async with session.lock:
+            response = await loop.run_in_executor(self.executor, session.process_command, command)
+        self.stats['requests'] += 1
+        if response == "stop":
+            self.end_session(user_id)
+            response = VoiceAssistant.GOODBYE
+        return {'user': user_id, 'response': response,
+                'announcements': [text for text, _ in session.drain_announcements()] + self.deliver(user_id)}
+    
+    async def serve_client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = await self.handle(json.loads(line))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self.stats['errors'] += 1
+                    reply = {'error': f"bad request: {e}"}
+                writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def sweep(self):
+        while True:
+            await asyncio.sleep(self.idle_timeout / 4)
+            self.evict_idle()
+    
+    async def serve(self, host='127.0.0.1', port=8765, unix_socket=None):
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.serve_client, unix_socket)
+            print(f"Serving sessions on {unix_socket}", flush=True)
+        else:
+            server = await asyncio.start_server(self.serve_client, host, port, backlog=1024)
+            print(f"Serving sessions on {host}:{port}", flush=True)
+        sweeper = asyncio.create_task(self.sweep())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+    
+    def close(self):
+        self.reminders.close()
+        self.reports.close()
+        self.executor.shutdown()
+        self.storage.close()
+
+# Knowledge Retrieval
+@dataclass(slots=True)
+class KnowledgeHit:
+    topic: str
+    text: str
+    score: float
+
+def pack_strings(strings):
+    """Concatenate strings into one UTF-8 byte array plus offsets, so they can live in an .npz"""
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+class KnowledgeIndex:
+    """BM25 index over knowledge entries loaded from a JSON data file.
+    
+    Each entry is {"topic", "aliases", "text"} (or "texts" for several answers on one
+    topic). An entry only matches a query that names its topic or one of its aliases;
+    words in the answer text then help rank it. Topic and alias terms count TOPIC_BOOST
+    times, so naming the topic outweighs incidental words in an answer.
+    
+    Postings are CSR-style NumPy arrays, sorted by entry within each term, with the
+    full BM25 weight precomputed per (term, entry). A query takes its candidates from
+    the small topic/alias postings and scores them with one searchsorted per query term,
+    so common words cost O(candidates * log n) instead of a pass over their postings.
+    
+    load() keeps the built index in cache_dir and reuses it until the data file changes.
+    """
+    K1 = 1.2
+    B = 0.75
+    TOPIC_BOOST = 3
+    FORMAT_VERSION = 1
+    SUFFIXES = ('ing', 'ed', 's')
+    STOP_WORDS = frozenset("a an and are as at be by can could do does for from have how i i'm in is it "
+                           "its me my of on or please should so that the there this to was what when where "
+                           "which why will with would you your".split())
+    ARRAYS = ('indptr', 'doc_ids', 'weights', 'key_indptr', 'key_doc_ids',
+              'topics', 'topic_offsets', 'texts', 'text_offsets')
+    
+    def __init__(self, terms, indptr, doc_ids, weights, key_indptr, key_doc_ids,
+                 topics, topic_offsets, texts, text_offsets):
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.key_indptr = key_indptr  # the same layout, restricted to topic/alias terms
+        self.key_doc_ids = key_doc_ids
+        self.topics = topics
+        self.topic_offsets = topic_offsets
+        self.texts = texts
+        self.text_offsets = text_offsets
+    
+    @classmethod
+    def analyze(cls, text):
+        """Lowercased, stop-word-free, suffix-stripped terms"""
+        terms = []
+        for token in IntentRouter.TOKEN_PATTERN.findall(text.lower()):
+            if token in cls.STOP_WORDS:
+                continue
+            if not token.endswith('ss'):
+                for suffix in cls.SUFFIXES:
+                    if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                        token = token[:-len(suffix)]
+                        break
+            terms.append(token)
+        return terms
+    
+    @classmethod
+    def expand(cls, entries):
+        """(topic, key text, answer) per answer; an entry with "texts" yields one per answer"""
+        for entry in entries:
+            key_text = ' '.join([entry['topic'], *entry.get('aliases', ())])
+            for text in entry.get('texts') or [entry['text']]:
+                yield entry['topic'], key_text, text
+    
+    @staticmethod
+    def csr(term_ids, n_terms):
+        """Stable grouping of postings by term: (order, indptr)"""
+        order = np.argsort(term_ids, kind='stable')
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=n_terms), out=indptr[1:])
+        return order, indptr
+    
+    @classmethod
+    def build(cls, entries):
+        topics, texts = [], []
+        vocab = {}
+        term_ids, doc_ids, tfs, is_key = array('i'), array('i'), array('f'), array('b')
+        for doc_id, (topic, key_text, text) in enumerate(cls.expand(entries)):
+            topics.append(topic)
+            texts.append(text)
+            counts = {}
+            key_terms = cls.analyze(key_text)
+            for term in key_terms:
+                counts[term] = counts.get(term, 0) + cls.TOPIC_BOOST
+            for term in cls.analyze(text):
+                counts[term] = counts.get(term, 0) + 1
+            key_terms = set(key_terms)
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+                is_key.append(term in key_terms)
+        
+        n_docs = len(texts)
+        term_ids = np.frombuffer(term_ids, dtype=np.int32)
+        doc_ids = np.frombuffer(doc_ids, dtype=np.int32)
+        tfs = np.frombuffer(tfs, dtype=np.float32)
+        is_key = np.frombuffer(is_key, dtype=np.int8).astype(np.bool_)
+        
+        doc_len = np.bincount(doc_ids, weights=tfs, minlength=n_docs)
+        avg_len = doc_len.mean() if n_docs else 1.0
+        df = np.bincount(term_ids, minlength=len(vocab))
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = cls.K1 * (1 - cls.B + cls.B * doc_len[doc_ids] / avg_len)
+        weights = (idf[term_ids] * tfs * (cls.K1 + 1) / (tfs + norm)).astype(np.float32)
+        
+        # Postings were appended in entry order, so a stable sort keeps each term's entries sorted
+        order, indptr = cls.csr(term_ids, len(vocab))
+        key_order, key_indptr = cls.csr(term_ids[is_key], len(vocab))
+        return cls(list(vocab), indptr, doc_ids[order], weights[order], key_indptr, doc_ids[is_key][key_order],
+                   *pack_strings(topics), *pack_strings(texts))
+    
+    @classmethod
+    def source_key(cls, path):
+        stat = os.stat(path)
+        params = f"{cls.FORMAT_VERSION}:{cls.K1}:{cls.B}:{cls.TOPIC_BOOST}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.sha1(params.encode()).hexdigest()
+    
+    @classmethod
+    def load(cls, path, cache_dir=KNOWLEDGE_CACHE_DIR):
+        """Index for a JSON data file, reusing the cached build while the file is unchanged"""
+        key = cls.source_key(path)
+        cache_path = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + '.npz')
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                if str(cached['key']) == key:
+                    terms = bytes(cached['terms']).decode('utf-8')
+                    return cls(terms.split('\n') if terms else [], *(cached[name] for name in cls.ARRAYS))
+        
+        with open(path, encoding='utf-8') as f:
+            index = cls.build(json.load(f))
+        try:
+            index.save(cache_path, key)
+        except OSError:
+            pass  # an unwritable cache only costs a rebuild next time
+        return index
+    
+    def save(self, cache_path, key):
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        terms = np.frombuffer('\n'.join(self.vocab).encode('utf-8'), dtype=np.uint8)
+        tmp_path = cache_path + '.tmp.npz'
+        np.savez(tmp_path, key=np.array(key), terms=terms, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, cache_path)
+    
+    @staticmethod
+    def unpack(data, offsets, i):
+        return bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8')
+    
+    def __len__(self):
+        return len(self.text_offsets) - 1
+    
+    def entry(self, i):
+        return self.unpack(self.topics, self.topic_offsets, i), self.unpack(self.texts, self.text_offsets, i)
+    
+    def entries(self):
+        """Every (topic, text) pair in index order"""
+        for i in range(len(self)):
+            yield self.entry(i)
+    
+    def search(self, query, k=3, min_score=0.0):
+        """Top-k KnowledgeHits for a free-text query, best first"""
+        term_ids = {self.vocab[term] for term in self.analyze(query) if term in self.vocab}
+        key_slices = [self.key_doc_ids[self.key_indptr[t]:self.key_indptr[t + 1]] for t in term_ids]
+        candidates = np.unique(np.concatenate(key_slices)) if key_slices else key_slices
+        if not len(candidates):
+            return []
+        
+        scores = np.zeros(len(candidates))
+        for term_id in term_ids:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.doc_ids[start:end]
+            positions = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            found = docs[positions] == candidates
+            scores[found] += self.weights[start:end][positions[found]]
+        
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return [KnowledgeHit(*self.entry(candidates[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+# Study Assistant Module
+class StudyAssistant:
+    MIN_SCORE = 1.0
+    
+    def __init__(self, knowledge=None):
+        self.knowledge = knowledge or KnowledgeIndex.load(os.path.join(KNOWLEDGE_DIR, 'study.json'))
     
     def handle_query(self, query):
         """Handle study-related queries"""
         query = query.lower()
         
-        # Check for math topics
-        for topic, explanation in self.math_topics.items():
-            if topic in query:
-                return f"Here's what I know about {topic}: {explanation}"
-        
-        # Check for science topics
-        for topic, explanation in self.science_topics.items():
-            if topic in query:
-                return f"Here's what I know about {topic}: {explanation}"
-        
-        # Check for history topics
-        for topic, explanation in self.history_topics.items():
-            if topic in query:
-                return f"Here's what I know about {topic}: {explanation}"
+        hits = self.knowledge.search(query, k=1, min_score=self.MIN_SCORE)
+        if hits:
+            return self.explain(hits[0].topic, hits[0].text)
         
         # Math problem solving
         if 'solve' in query and any(op in query for op in ['+', '-', '*', '/', 'plus', 'minus', 'times', 'divided']):
             return "I can help with basic math problems. For complex calculations, I recommend breaking them down into smaller steps."
         
         return "I can help with math, science, and history topics. What specific subject would you like to learn about?"
+    
+    def explain(self, topic, explanation):
+        return f"Here's what I know about {topic}: {explanation}"
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        responses = [self.explain(topic, text) for topic, text in self.knowledge.entries()]
+        return responses + [self.handle_query(query) for query in ('solve 2 plus 2', '')]
 
 # Mental Wellness Assistant Module
 class WellnessAssistant:
-    def __init__(self):
-        self.breathing_exercises = [
-            "Let's do a 4-7-8 breathing exercise. Breathe in for 4 counts, hold for 7, then exhale for 8. Ready? Breathe in... 1, 2, 3, 4. Hold... 1, 2, 3, 4, 5, 6, 7. Exhale... 1, 2, 3, 4, 5, 6, 7, 8.",
-            "Try box breathing. Breathe in for 4, hold for 4, exhale for 4, hold for 4. Let's begin: In... 1, 2, 3, 4. Hold... 1, 2, 3, 4. Out... 1, 2, 3, 4. Hold... 1, 2, 3, 4."
-        ]
-        
-        self.meditation_guides = [
-            "Find a comfortable position. Close your eyes and focus on your breath. Notice the air entering and leaving your nostrils. When your mind wanders, gently bring attention back to your breath.",
-            "Let's do a body scan meditation. Start by relaxing your toes, then your feet, ankles, calves. Work your way up through your entire body, releasing tension as you go."
-        ]
-        
-        self.affirmations = [
-            "You are capable of handling whatever comes your way today.",
-            "You deserve peace, happiness, and success.",
-            "Every challenge is an opportunity to grow stronger.",
-            "You are worthy of love and respect, especially from yourself."
-        ]
+    BREATHING_EXERCISES = (
+        "Let's do a 4-7-8 breathing exercise. Breathe in for 4 counts, hold for 7, then exhale for 8. Ready? Breathe in... 1, 2, 3, 4. Hold... 1, 2, 3, 4, 5, 6, 7. Exhale... 1, 2, 3, 4, 5, 6, 7, 8.",
+        "Try box breathing. Breathe in for 4, hold for 4, exhale for 4, hold for 4. Let's begin: In... 1, 2, 3, 4. Hold... 1, 2, 3, 4. Out... 1, 2, 3, 4. Hold... 1, 2, 3, 4."
+    )
+    MEDITATION_GUIDES = (
+        "Find a comfortable position. Close your eyes and focus on your breath. Notice the air entering and leaving your nostrils. When your mind wanders, gently bring attention back to your breath.",
+        "Let's do a body scan meditation. Start by relaxing your toes, then your feet, ankles, calves. Work your way up through your entire body, releasing tension as you go."
+    )
+    # Spoken as-is, so the lead-in is joined on once here rather than on every request
+    AFFIRMATIONS = tuple(f"Here's a positive affirmation for you: {text}" for text in (
+        "You are capable of handling whatever comes your way today.",
+        "You deserve peace, happiness, and success.",
+        "Every challenge is an opportunity to grow stronger.",
+        "You are worthy of love and respect, especially from yourself."
+    ))
     
     def handle_request(self, request):
         """Handle wellness-related requests"""
         request = request.lower()
         
         if 'breathing' in request or 'breathe' in request:
-            return random.choice(self.breathing_exercises)
+            return random.choice(self.BREATHING_EXERCISES)
         
         elif 'meditation' in request or 'meditate' in request:
-            return random.choice(self.meditation_guides)
+            return random.choice(self.MEDITATION_GUIDES)
         
         elif 'affirmation' in request or 'positive' in request:
-            return f"Here's a positive affirmation for you: {random.choice(self.affirmations)}"
+            return random.choice(self.AFFIRMATIONS)
         
         elif 'stress' in request:
             return "When feeling stressed, try the 5-4-3-2-1 grounding technique: Name 5 things you can see, 4 you can touch, 3 you can hear, 2 you can smell, and 1 you can taste."
@@ -245,290 +3418,1228 @@ class WellnessAssistant:
             return "For anxiety, try progressive muscle relaxation. Tense and then relax each muscle group, starting with your toes and working up to your head."
         
         return "I can guide you through breathing exercises, meditation, provide affirmations, or help with stress and anxiety techniques. What would you like to try?"
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        responses = [*self.BREATHING_EXERCISES, *self.MEDITATION_GUIDES, *self.AFFIRMATIONS]
+        responses += [self.handle_request(query) for query in ('stress', 'anxiety', '')]
+        return responses
 
 # Productivity Assistant Module
+class TaskStore:
+    """Tasks kept in the SQLite `tasks` table.
+    
+    Queries page with keyset pagination (id > last seen id) and stream rows from the
+    cursor, so listing stays cheap no matter how many tasks have piled up. Each index
+    (see Storage.MIGRATIONS) ends in the column its query orders by, so a page is an
+    index range scan rather than a sort over every matching task.
+    """
+    def __init__(self, storage, user_id='local'):
+        self.storage = storage
+        self.user_id = user_id
+    
+    def add(self, task, priority='medium', due_date=None):
+        return self.storage.write('INSERT INTO tasks (task, priority, due_date, user_id) VALUES (?, ?, ?, ?)',
+                                  (task, priority, due_date, self.user_id)).result().lastrowid
+    
+    def add_many(self, tasks):
+        """Bulk insert (task, priority, due_date) tuples in one transaction"""
+        self.storage.write_many('INSERT INTO tasks (task, priority, due_date, user_id) VALUES (?, ?, ?, ?)',
+                                [(*task, self.user_id) for task in tasks]).result()
+    
+    def complete(self, task_id):
+        cursor = self.storage.write('UPDATE tasks SET completed = 1 WHERE id = ? AND user_id = ? AND completed = 0',
+                                    (task_id, self.user_id)).result()
+        return cursor.rowcount > 0
+    
+    def complete_many(self, task_ids):
+        self.storage.write_many('UPDATE tasks SET completed = 1 WHERE id = ? AND user_id = ? AND completed = 0',
+                                [(task_id, self.user_id) for task_id in task_ids]).result()
+    
+    def filters(self, completed=False, priority=None, due_before=None):
+        clauses, params = ['user_id = ?', 'completed = ?'], [self.user_id, int(completed)]
+        if priority is not None:
+            clauses.append('priority = ?')
+            params.append(priority)
+        if due_before is not None:
+            clauses.append('due_date IS NOT NULL AND due_date <= ?')
+            params.append(due_before)
+        return clauses, params
+    
+    def page(self, after_id=0, size=20, **filters):
+        """One page of matching tasks as (id, task, priority, due_date) rows, ordered by id"""
+        clauses, params = self.filters(**filters)
+        sql = f"SELECT id, task, priority, due_date FROM tasks WHERE {' AND '.join(clauses)} AND id > ? ORDER BY id LIMIT ?"
+        return self.storage.query(sql, params + [after_id, size])
+    
+    def iter_tasks(self, batch_size=500, **filters):
+        """Stream every matching task, one page at a time"""
+        after_id = 0
+        while True:
+            rows = self.page(after_id, batch_size, **filters)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1][0]
+    
+    def due_soon(self, days=3, limit=20):
+        """Open tasks due within `days`, soonest first"""
+        cutoff = (datetime.date.today() + datetime.timedelta(days=days)).isoformat()
+        return self.storage.query(
+            'SELECT id, task, priority, due_date FROM tasks '
+            'WHERE user_id = ? AND completed = 0 AND due_date IS NOT NULL AND due_date <= ? ORDER BY due_date LIMIT ?',
+            (self.user_id, cutoff, limit))
+    
+    def count(self, **filters):
+        clauses, params = self.filters(**filters)
+        return self.storage.query(f"SELECT COUNT(*) FROM tasks WHERE {' AND '.join(clauses)}", params)[0][0]
+
 class ProductivityAssistant:
-    def __init__(self):
-        self.tasks = []
+    LIST_PAGE_SIZE = 10
+    # Everything up to the task or reminder itself: "add a new task to ...", "set a reminder to ..."
+    ADD_TASK_PREFIX = re.compile(r"^.*?\b(?:(?:add|create)\s+(?:a\s+)?(?:new\s+)?|new\s+)task\b")
+    COMPLETE_TASK_PREFIX = re.compile(r"^.*?\bcomplete\s+task\b")
+    REMINDER_PREFIX = re.compile(r"^.*?\b(?:remind\s+me|(?:set|add|create|new)\s+(?:a\s+)?reminder)\b")
+    CANCEL_PATTERN = re.compile(r"cancel reminder (?:number )?#?(\d+)")
+    # Slots are immutable, so each frame shares one tuple of them instead of rebuilding it per request
+    TASK_SLOTS = (
+        Slot('due_date', parse_date),
+        Slot('priority', parse_priority, default='medium'),
+        Slot('description', parse_free_text, "What task would you like to add? Please tell me the task description."),
+    )
+    COMPLETE_SLOTS = (Slot('number', parse_task_number, "Which task number would you like to mark as complete?"),)
+    
+    def __init__(self, store, reminders=None):
+        self.store = store
+        self.reminders = reminders
+        self.user_id = store.user_id
+        self.last_listed = []  # rows as last read out, so "complete task 2" means what the user heard
+        self.reminder_slots = None  # built on first use: they close over this session's reminder clock
     
     def handle_task(self, command):
         """Handle productivity and task management"""
         command = command.lower()
         
-        if 'add task' in command or 'new task' in command:
-            return "What task would you like to add? Please tell me the task description."
+        if self.REMINDER_PREFIX.search(command) and self.reminders is not None:
+            return self.reminder_frame().step(self.REMINDER_PREFIX.sub('', command, count=1))
+        
+        if self.ADD_TASK_PREFIX.search(command):
+            return self.task_frame().step(self.ADD_TASK_PREFIX.sub('', command, count=1))
+        
+        elif 'due' in command and 'task' in command:
+            return self.describe_tasks(self.store.due_soon(limit=self.LIST_PAGE_SIZE), None, "upcoming ")
+        
+        elif 'high priority' in command and 'task' in command:
+            return self.describe_tasks(self.store.page(size=self.LIST_PAGE_SIZE, priority='high'),
+                                       self.store.count(priority='high'), "high priority ")
         
         elif 'list tasks' in command or 'show tasks' in command:
-            if not self.tasks:
-                return "You have no tasks scheduled."
-            
-            task_list = "Here are your current tasks: "
-            for i, task in enumerate(self.tasks, 1):
-                task_list += f"{i}. {task['description']} - Priority: {task['priority']}. "
-            return task_list
+            return self.describe_tasks(self.store.page(size=self.LIST_PAGE_SIZE), self.store.count())
         
         elif 'complete task' in command:
-            return "Which task number would you like to mark as complete?"
+            return self.complete_frame().step(self.COMPLETE_TASK_PREFIX.sub('', command, count=1))
         
-        elif 'reminder' in command:
-            return "I can set reminders for you. What would you like to be reminded about and when?"
+        elif 'remind' in command:
+            cancel = self.CANCEL_PATTERN.search(command)
+            if cancel and self.reminders is not None:
+                if self.reminders.cancel(int(cancel.group(1)), self.user_id):
+                    return f"Reminder {cancel.group(1)} cancelled."
+                return f"I couldn't find reminder {cancel.group(1)}."
+            if self.reminders is None:
+                return "I can set reminders for you. What would you like to be reminded about and when?"
+            if 'list' in command or 'show' in command or 'my reminders' in command:
+                return self.describe_reminders(self.reminders.upcoming(self.LIST_PAGE_SIZE, self.user_id))
+            return self.reminder_frame().step('')
         
         elif 'schedule' in command:
             return "I can help you manage your schedule. Would you like to add an appointment or view your calendar?"
         
         return "I can help you add tasks, set reminders, manage your schedule, and boost productivity. What would you like to do?"
     
-    def add_task(self, description, priority="medium"):
+    def task_frame(self):
+        return DialogueFrame(self.TASK_SLOTS, self.add_task, intent='productivity', restart=self.ADD_TASK_PREFIX)
+    
+    def complete_frame(self):
+        return DialogueFrame(self.COMPLETE_SLOTS, self.complete_numbered, intent='productivity',
+                             restart=self.COMPLETE_TASK_PREFIX)
+    
+    def reminder_frame(self):
+        if self.reminder_slots is None:
+            self.reminder_slots = (
+                Slot('due_at', lambda text: parse_when(text, self.reminders.clock()), "When should I remind you?"),
+                Slot('message', parse_free_text, "What should I remind you about?"),
+            )
+        return DialogueFrame(self.reminder_slots, self.set_reminder,
+                             opening="I can set reminders for you. What would you like to be reminded about and when?",
+                             intent='productivity', restart=self.REMINDER_PREFIX)
+    
+    def describe_tasks(self, rows, total=None, kind=""):
+        """Speakable list of task rows, mentioning how many more there are beyond this page"""
+        self.last_listed = rows
+        if not rows:
+            return f"You have no {kind}tasks scheduled."
+        
+        parts = [f"Here are your {kind}tasks:"]
+        for i, (_, task, priority, due_date) in enumerate(rows, 1):
+            due = f", due {due_date}" if due_date else ""
+            parts.append(f"{i}. {task} - Priority: {priority}{due}.")
+        if total is not None and total > len(rows):
+            parts.append(f"And {total - len(rows)} more.")
+        return " ".join(parts)
+    
+    def set_reminder(self, message, due_at):
+        reminder = self.reminders.add(message, due_at, self.user_id)
+        return f"Okay, I'll remind you to {message} at {self.format_time(reminder.due_at)}."
+    
+    def describe_reminders(self, reminders):
+        if not reminders:
+            return "You have no reminders set."
+        parts = ["Here are your reminders:"]
+        for reminder in reminders:
+            parts.append(f"{reminder.id}. {reminder.message} at {self.format_time(reminder.due_at)}.")
+        return " ".join(parts)
+    
+    def format_time(self, due_at):
+        due = datetime.datetime.fromtimestamp(due_at)
+        if due.date() == datetime.datetime.fromtimestamp(self.reminders.clock()).date():
+            return due.strftime('%H:%M')
+        return due.strftime('%a %d %b %H:%M')
+    
+    def add_task(self, description, priority="medium", due_date=None):
         """Add a new task"""
-        task = {
-            'description': description,
-            'priority': priority,
-            'completed': False,
-            'created_at': datetime.datetime.now()
-        }
-        self.tasks.append(task)
-        return f"Task added: {description} with {priority} priority."
+        self.store.add(description, priority, due_date)
+        due = f", due {due_date}" if due_date else ""
+        return f"Task added: {description} with {priority} priority{due}."
+    
+    def complete_numbered(self, number):
+        """Complete the task at this position in the list the user last heard (or the open tasks)"""
+        rows = self.last_listed or self.store.page(size=number)
+        if not 1 <= number <= len(rows):
+            return f"I don't see a task number {number}."
+        task_id, task = rows[number - 1][:2]
+        if not self.store.complete(task_id):
+            return f"Task {number}, {task}, is already complete."
+        self.last_listed = []  # numbering has shifted
+        return f"Marked task {number}, {task}, as complete."
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        return [str(self.handle_task(query)) for query in ('add task', 'complete task', 'reminder', 'schedule', '')]
 
 # Customer Support Chatbot Module
 class SupportChatbot:
-    def __init__(self):
-        self.faq = {
-            'account': 'For account issues, please check your login credentials and ensure your internet connection is stable.',
-            'password': 'To reset your password, go to the login page and click "Forgot Password". Follow the instructions sent to your email.',
-            'billing': 'For billing questions, please check your account dashboard or contact our billing department.',
-            'technical': 'For technical issues, try restarting the application or clearing your browser cache.',
-            'refund': 'Refund requests can be processed within 30 days of purchase. Please provide your order number.'
-        }
+    MIN_SCORE = 1.0
+    
+    def __init__(self, knowledge=None):
+        self.knowledge = knowledge or KnowledgeIndex.load(os.path.join(KNOWLEDGE_DIR, 'support.json'))
     
     def handle_support(self, query):
         """Handle customer support queries"""
         query = query.lower()
         
-        for keyword, response in self.faq.items():
-            if keyword in query:
-                return response
+        hits = self.knowledge.search(query, k=1, min_score=self.MIN_SCORE)
+        if hits:
+            return hits[0].text
         
         if 'help' in query:
             return "I can help with account issues, password resets, billing questions, technical problems, and refund requests. What specific issue are you experiencing?"
         
         return "I understand you need support. Can you please describe your specific issue? I can help with accounts, passwords, billing, technical issues, or refunds."
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        return [text for _, text in self.knowledge.entries()] + [self.handle_support(query) for query in ('help', '')]
 
 # Finance & Budget Assistant Module
+class ExpenseLedger:
+    """Expenses in the SQLite `expenses` table with running per-category, per-month totals.
+    
+    The expense_totals rollup is maintained by triggers inside the same transaction as
+    each insert, update and delete, and mirrored in memory, so budget questions never
+    rescan expenses. Expenses recorded without a category count as DEFAULT_CATEGORY.
+    """
+    INSERT = 'INSERT INTO expenses (amount, category, description, date, user_id) VALUES (?, ?, ?, ?, ?)'
+    DEFAULT_CATEGORY = 'other'
+    
+    def __init__(self, storage, user_id='local', import_batch_size=5000):
+        self.storage = storage
+        self.user_id = user_id
+        self.import_batch_size = import_batch_size
+        self.totals = {}  # (category, month) -> total
+        self.grand_total = 0.0
+        self.count = 0
+        self.reload()
+    
+    def reload(self):
+        """Rebuild the in-memory totals from the rollup table"""
+        self.totals = {}
+        self.grand_total = 0.0
+        self.count = 0
+        for category, month, total, count in self.storage.query(
+                'SELECT category, month, total, count FROM expense_totals WHERE user_id = ?', (self.user_id,)):
+            self.totals[(category, month)] = total
+            self.grand_total += total
+            self.count += count
+    
+    @classmethod
+    def normalize(cls, amount, category=None, description='', date=None):
+        date = date or datetime.date.today().isoformat()
+        return (float(amount), (category or '').strip().lower() or cls.DEFAULT_CATEGORY, description, date)
+    
+    def apply(self, rows):
+        for amount, category, _, date in rows:
+            key = (category, date[:7])
+            self.totals[key] = self.totals.get(key, 0.0) + amount
+            self.grand_total += amount
+            self.count += 1
+    
+    def add(self, amount, category, description='', date=None):
+        row = self.normalize(amount, category, description, date)
+        self.storage.write(self.INSERT, (*row, self.user_id)).result()
+        self.apply([row])
+        return row
+    
+    def add_many(self, rows):
+        """Bulk insert (amount, category, description, date) rows, streamed in batches"""
+        imported = 0
+        batch = []
+        for row in rows:
+            batch.append(self.normalize(*row))
+            if len(batch) >= self.import_batch_size:
+                imported += self.flush(batch)
+                batch = []
+        if batch:
+            imported += self.flush(batch)
+        return imported
+    
+    def flush(self, batch):
+        self.storage.write_many(self.INSERT, [(*row, self.user_id) for row in batch]).result()
+        self.apply(batch)
+        return len(batch)
+    
+    def import_csv(self, path):
+        """Stream a CSV with amount, category, description and date columns"""
+        with open(path, newline='', encoding='utf-8') as f:
+            return self.add_many((row['amount'], row.get('category'), row.get('description', ''), row.get('date'))
+                                 for row in csv.DictReader(f))
+    
+    def import_jsonl(self, path):
+        """Stream JSONL records with amount, category, description and date fields"""
+        with open(path, encoding='utf-8') as f:
+            records = (json.loads(line) for line in f if line.strip())
+            return self.add_many((r['amount'], r.get('category'), r.get('description', ''), r.get('date')) for r in records)
+    
+    def month_total(self, category, month=None):
+        month = month or datetime.date.today().isoformat()[:7]
+        return self.totals.get((category, month), 0.0)
+
+@dataclass(frozen=True, slots=True)
+class Budget:
+    category: str
+    limit: int
+    label: str  # category as read out, e.g. "Food"
+
 class FinanceAssistant:
-    def __init__(self):
-        self.expenses = []
-        self.budget_categories = {
-            'food': 500,
-            'transportation': 200,
-            'entertainment': 150,
-            'utilities': 300,
-            'shopping': 200
-        }
+    EXPENSE_PREFIX = re.compile(r"^.*?\b(?:add(?:\s+an?)?(?:\s+new)?\s+expense|i\s+spent|spent)\b")
+    CATEGORY_WORDS = {
+        'food': ['food', 'lunch', 'dinner', 'breakfast', 'groceries', 'grocery', 'restaurant', 'coffee', 'snacks'],
+        'transportation': ['transportation', 'transport', 'gas', 'fuel', 'bus', 'taxi', 'uber', 'train', 'parking'],
+        'entertainment': ['entertainment', 'movie', 'movies', 'concert', 'games', 'tickets', 'streaming'],
+        'utilities': ['utilities', 'electricity', 'electric', 'water', 'internet', 'heating'],
+        'shopping': ['shopping', 'clothes', 'shoes', 'amazon', 'gifts'],
+    }
+    
+    # Monthly limits; every session shares these records and the strings built from them
+    BUDGETS = {category: Budget(category, limit, category.title()) for category, limit in (
+        ('food', 500),
+        ('transportation', 200),
+        ('entertainment', 150),
+        ('utilities', 300),
+        ('shopping', 200),
+    )}
+    BUDGET_TEXT = "Here's your monthly budget: " + " ".join(
+        f"{budget.label}: ${budget.limit}." for budget in BUDGETS.values())
+    CATEGORY_PROMPT = f"What was it for? For example {', '.join(BUDGETS)}."
+    SAVING_TIPS = (
+        "Try the 50-30-20 rule: 50% needs, 30% wants, 20% savings.",
+        "Track your daily expenses to identify spending patterns.",
+        "Consider cooking at home more often to save on food costs.",
+        "Look for subscription services you're not using and cancel them."
+    )
+    
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.expense_slots = None  # built on first use
     
     def handle_finance(self, command):
         """Handle finance and budget queries"""
         command = command.lower()
         
         if 'add expense' in command or 'spent' in command:
-            return "I can help you track that expense. What did you spend money on and how much?"
+            return self.expense_frame().step(self.EXPENSE_PREFIX.sub('', command, count=1))
+        
+        elif 'over budget' in command or 'budget status' in command:
+            return self.budget_status()
         
         elif 'budget' in command:
-            budget_info = "Here's your monthly budget: "
-            for category, amount in self.budget_categories.items():
-                budget_info += f"{category.title()}: ${amount}. "
-            return budget_info
+            return self.BUDGET_TEXT
         
         elif 'expenses' in command or 'spending' in command:
-            if not self.expenses:
+            if not self.ledger.count:
                 return "You haven't recorded any expenses yet."
             
-            total = sum(expense['amount'] for expense in self.expenses)
-            return f"Your total recorded expenses are ${total:.2f}."
+            return f"Your total recorded expenses are ${self.ledger.grand_total:.2f}."
         
         elif 'save money' in command or 'saving tips' in command:
-            tips = [
-                "Try the 50-30-20 rule: 50% needs, 30% wants, 20% savings.",
-                "Track your daily expenses to identify spending patterns.",
-                "Consider cooking at home more often to save on food costs.",
-                "Look for subscription services you're not using and cancel them."
-            ]
-            return random.choice(tips)
+            return random.choice(self.SAVING_TIPS)
         
         return "I can help you track expenses, manage your budget, and provide money-saving tips. What would you like to know about your finances?"
+    
+    def expense_frame(self):
+        if self.expense_slots is None:
+            self.expense_slots = (
+                Slot('date', parse_date),
+                Slot('amount', parse_amount, "How much did you spend?"),
+                Slot('category', self.parse_category, self.CATEGORY_PROMPT),
+                Slot('description', parse_free_text, default=''),
+            )
+        return DialogueFrame(self.expense_slots, self.add_expense, opening="I can help you track that expense. What did you spend money on and how much?",
+                             intent='finance', restart=self.EXPENSE_PREFIX)
+    
+    def parse_category(self, text):
+        """Budget category named or implied by the text ("lunch" -> food), else the word after on/for.
+        
+        The text is left intact so the words can still become the description.
+        """
+        words = set(re.findall(r"[a-z]+", text))
+        for category, synonyms in self.CATEGORY_WORDS.items():
+            if words.intersection(synonyms):
+                return category, text
+        match = re.search(r"\b(?:on|for)\s+(?:(?:a|an|the|some|my)\s+)?([a-z]+)", text)
+        if match:
+            return match.group(1), text
+        return None
+    
+    def budget_status(self, month=None):
+        """Compare this month's running totals against the budget"""
+        month = month or datetime.date.today().isoformat()[:7]
+        over = []
+        for budget in self.BUDGETS.values():
+            spent = self.ledger.month_total(budget.category, month)
+            if spent > budget.limit:
+                over.append(f"{budget.label}: ${spent:.2f} of ${budget.limit}")
+        if not over:
+            return "You're within budget in every category this month."
+        return "You're over budget in " + "; ".join(over) + "."
+    
+    def add_expense(self, amount, category, description='', date=None):
+        """Record an expense and warn if it pushes its category over budget"""
+        amount, category, _, date = self.ledger.add(amount, category, description, date)
+        response = f"Recorded ${amount:.2f} for {category}."
+        budget = self.BUDGETS.get(category)
+        if budget is not None:
+            spent = self.ledger.month_total(category, date[:7])
+            if spent > budget.limit:
+                response += f" That puts {category} at ${spent:.2f}, over your ${budget.limit} budget."
+        return response
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        return [*self.SAVING_TIPS] + [str(self.handle_finance(query)) for query in ('add expense', 'budget', '')]
 
 # Meal Planner & Nutrition Assistant Module
+class RecipeTable:
+    """Recipe catalog as NumPy columns, loaded from a CSV with one recipe per row.
+    
+    `nutrients` holds calories, protein, carbs and fat grams with one row per recipe, so a
+    whole meal type can be scored against a target in one array expression.
+    """
+    MEAL_TYPES = ('breakfast', 'lunch', 'dinner')
+    NUTRIENTS = ('calories', 'protein_g', 'carbs_g', 'fat_g')
+    loaded = {}  # path -> (file size and mtime, table): every session shares one copy of a catalog
+    
+    def __init__(self, rows):
+        self.names = [row['name'] for row in rows]
+        self.meal_types = [row['meal_type'] for row in rows]
+        self.nutrients = np.array([[float(row[name]) for name in self.NUTRIENTS] for row in rows],
+                                  dtype=np.float64).reshape(-1, len(self.NUTRIENTS))
+        self.prep_minutes = [int(row['prep_minutes']) for row in rows]
+        self.tags = [frozenset(filter(None, (row.get('tags') or '').split(';'))) for row in rows]
+        self.ingredients = [row['ingredients'] for row in rows]
+        meal_types = np.array(self.meal_types)
+        self.by_type = {meal_type: np.flatnonzero(meal_types == meal_type) for meal_type in self.MEAL_TYPES}
+    
+    @classmethod
+    def load(cls, path=RECIPES_PATH):
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = cls.loaded.get(path)
+        if cached is None or cached[0] != key:
+            with open(path, newline='', encoding='utf-8') as f:
+                cached = cls.loaded[path] = (key, cls(list(csv.DictReader(f))))
+        return cached[1]
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def recipe(self, i):
+        calories, protein, carbs, fat = self.nutrients[i]
+        return {'name': self.names[i], 'calories': int(calories), 'protein': int(protein), 'carbs': int(carbs),
+                'fat': int(fat), 'prep_time': f"{self.prep_minutes[i]} minutes"}
+    
+    def tagged(self, tag):
+        """Boolean mask of the recipes carrying this tag"""
+        return np.fromiter((tag in tags for tags in self.tags), dtype=bool, count=len(self))
+
+@dataclass
+class NutritionTarget:
+    """Daily calories plus the share of them coming from protein, carbs and fat"""
+    calories: float = 2000.0
+    protein_share: float = 0.20
+    carbs_share: float = 0.50
+    fat_share: float = 0.30
+    
+    def vector(self, fraction=1.0):
+        """Calories and macro grams for this fraction of the day, in RecipeTable.NUTRIENTS order"""
+        calories = self.calories * fraction
+        return np.array([calories, calories * self.protein_share / 4, calories * self.carbs_share / 4,
+                         calories * self.fat_share / 9])
+
+class MealPlanOptimizer:
+    """Picks breakfast, lunch and dinner together so the day lands on calorie and macro targets.
+    
+    Every recipe may also be served as a larger portion. Each meal type is first cut to the
+    `candidates` (recipe, portion) pairs closest to its share of the day; every breakfast x
+    lunch x dinner combination of those is then scored in one broadcast, the error being
+    the weighted squared relative miss on calories and each macro. One of the `variety`
+    best days is picked at random, so asking twice gives a different menu.
+    """
+    SHARES = (0.25, 0.35, 0.40)  # of the day's target, for breakfast, lunch and dinner
+    WEIGHTS = (4.0, 1.0, 1.0, 1.0)  # calories matter most, then each macro equally
+    PORTIONS = (1.0, 1.5)
+    
+    def __init__(self, table, candidates=40, variety=5, rng=None):
+        self.table = table
+        self.candidates = candidates
+        self.variety = variety
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.weights = np.array(self.WEIGHTS)
+        self.portions = np.array(self.PORTIONS)
+    
+    def error(self, nutrients, target):
+        return (((nutrients - target) / target) ** 2) @ self.weights
+    
+    def shortlist(self, meal_type, target, available):
+        """(recipe indices, portions, nutrient rows) of the candidates for one meal"""
+        indices = self.table.by_type[meal_type]
+        indices = indices[available[indices]]
+        indices = np.repeat(indices, len(self.portions))
+        portions = np.tile(self.portions, len(indices) // len(self.portions))
+        nutrients = self.table.nutrients[indices] * portions[:, None]
+        if len(indices) > self.candidates:
+            keep = np.argpartition(self.error(nutrients, target), self.candidates)[:self.candidates]
+            indices, portions, nutrients = indices[keep], portions[keep], nutrients[keep]
+        return indices, portions, nutrients
+    
+    def plan_day(self, target, available=None):
+        """[(recipe index, portion)] for breakfast, lunch and dinner, or None when a meal type has nothing available"""
+        if available is None:
+            available = np.ones(len(self.table), dtype=bool)
+        picks = [self.shortlist(meal_type, target.vector(share), available)
+                 for meal_type, share in zip(RecipeTable.MEAL_TYPES, self.SHARES)]
+        if any(len(indices) == 0 for indices, _, _ in picks):
+            return None
+        breakfast, lunch, dinner = (nutrients for _, _, nutrients in picks)
+        totals = breakfast[:, None, None, :] + lunch[None, :, None, :] + dinner[None, None, :, :]
+        errors = self.error(totals, target.vector()).ravel()
+        k = min(self.variety, errors.size)
+        best = np.argpartition(errors, k - 1)[:k]
+        combo = np.unravel_index(self.rng.choice(best), (len(breakfast), len(lunch), len(dinner)))
+        return [(int(indices[i]), float(portions[i])) for (indices, portions, _), i in zip(picks, combo)]
+    
+    def plan_week(self, target, days=7, available=None):
+        """One day plan per day, without repeating a recipe in the week while the catalog allows"""
+        allowed = np.ones(len(self.table), dtype=bool) if available is None else available
+        unused = allowed.copy()
+        plan = []
+        for _ in range(days):
+            day = self.plan_day(target, unused)
+            if day is None:
+                unused = allowed.copy()  # every allowed recipe has been used once: start over
+                day = self.plan_day(target, unused)
+                if day is None:
+                    return None
+            unused[[i for i, _ in day]] = False
+            plan.append(day)
+        return plan
+
+class MealLog:
+    """Planned meals in the SQLite `meals` table"""
+    INSERT = 'INSERT INTO meals (meal_name, meal_type, calories, ingredients, date, user_id) VALUES (?, ?, ?, ?, ?, ?)'
+    
+    def __init__(self, storage, user_id='local'):
+        self.storage = storage
+        self.user_id = user_id
+    
+    def log_days(self, days):
+        """Store {date: [(name, meal_type, calories, ingredients), ...]}, replacing what was planned for those dates"""
+        dates = [(self.user_id, date) for date in days]
+        rows = [(*meal, date, self.user_id) for date, meals in days.items() for meal in meals]
+        
+        def replace(conn):
+            conn.executemany('DELETE FROM meals WHERE user_id = ? AND date = ?', dates)
+            conn.executemany(self.INSERT, rows)
+        self.storage.submit(replace).result()
+    
+    def calories_on(self, date):
+        """(total calories, number of meals) logged for a date"""
+        return tuple(self.storage.query('SELECT COALESCE(SUM(calories), 0), COUNT(*) FROM meals '
+                                        'WHERE user_id = ? AND date = ?', (self.user_id, date))[0])
+
 class MealPlanner:
-    def __init__(self):
-        self.recipes = {
-            'breakfast': [
-                {'name': 'Oatmeal with berries', 'calories': 300, 'prep_time': '5 minutes'},
-                {'name': 'Greek yogurt parfait', 'calories': 250, 'prep_time': '3 minutes'},
-                {'name': 'Avocado toast', 'calories': 350, 'prep_time': '5 minutes'}
-            ],
-            'lunch': [
-                {'name': 'Grilled chicken salad', 'calories': 400, 'prep_time': '15 minutes'},
-                {'name': 'Quinoa bowl', 'calories': 450, 'prep_time': '20 minutes'},
-                {'name': 'Turkey sandwich', 'calories': 380, 'prep_time': '5 minutes'}
-            ],
-            'dinner': [
-                {'name': 'Baked salmon with vegetables', 'calories': 500, 'prep_time': '25 minutes'},
-                {'name': 'Chicken stir-fry', 'calories': 450, 'prep_time': '20 minutes'},
-                {'name': 'Vegetarian pasta', 'calories': 400, 'prep_time': '15 minutes'}
-            ]
-        }
+    CALORIE_PATTERN = re.compile(r"(\d{3,4})\s*(?:k?cal|calorie)")
+    # (protein, carbs, fat) shares of the day's calories
+    DIETS = {'high protein': (0.30, 0.40, 0.30), 'low carb': (0.30, 0.20, 0.50)}
+    DIET_TAGS = ('vegan', 'vegetarian')
+    NUTRITION_TIPS = (
+        "Aim for 5 servings of fruits and vegetables daily.",
+        "Include lean proteins in every meal.",
+        "Choose whole grains over refined grains.",
+        "Stay hydrated with 8 glasses of water daily."
+    )
+    SUGGESTION_TEMPLATES = {
+        'breakfast': "For breakfast, I suggest {name}. It has {calories} calories and takes {prep_time} to prepare.",
+        'lunch': "For lunch, try {name}. It has {calories} calories and takes {prep_time} to prepare.",
+        'dinner': "For dinner, I recommend {name}. It has {calories} calories and takes {prep_time} to prepare."
+    }
+    
+    def __init__(self, log=None, recipes=None, rng=None):
+        self.log = log
+        self.recipes = recipes if recipes is not None else RecipeTable.load()
+        self.optimizer = MealPlanOptimizer(self.recipes, rng=rng)
     
     def handle_meal_request(self, request):
         """Handle meal planning and nutrition requests"""
         request = request.lower()
         
-        if 'breakfast' in request:
-            meal = random.choice(self.recipes['breakfast'])
-            return f"For breakfast, I suggest {meal['name']}. It has {meal['calories']} calories and takes {meal['prep_time']} to prepare."
-        
-        elif 'lunch' in request:
-            meal = random.choice(self.recipes['lunch'])
-            return f"For lunch, try {meal['name']}. It has {meal['calories']} calories and takes {meal['prep_time']} to prepare."
+        if 'meal plan' in request or 'menu' in request:
+            return self.plan(request)
         
-        elif 'dinner' in request:
-            meal = random.choice(self.recipes['dinner'])
-            return f"For dinner, I recommend {meal['name']}. It has {meal['calories']} calories and takes {meal['prep_time']} to prepare."
+        for meal_type in RecipeTable.MEAL_TYPES:
+            if meal_type in request:
+                return self.suggest(meal_type, self.pick(meal_type, request))
         
-        elif 'meal plan' in request:
-            breakfast = random.choice(self.recipes['breakfast'])
-            lunch = random.choice(self.recipes['lunch'])
-            dinner = random.choice(self.recipes['dinner'])
-            
-            return f"Here's your daily meal plan: Breakfast - {breakfast['name']}, Lunch - {lunch['name']}, Dinner - {dinner['name']}. Total calories: approximately {breakfast['calories'] + lunch['calories'] + dinner['calories']}."
+        if 'calories' in request and 'today' in request and self.log is not None:
+            calories, meals = self.log.calories_on(datetime.date.today().isoformat())
+            if not meals:
+                return "You haven't planned any meals for today. Ask me for a meal plan to get started."
+            return f"Today's {meals} planned meals add up to {calories} calories."
         
         elif 'calories' in request:
             return "The average daily calorie needs are about 2000 for women and 2500 for men, but this varies based on age, activity level, and other factors."
         
         elif 'nutrition' in request:
-            tips = [
-                "Aim for 5 servings of fruits and vegetables daily.",
-                "Include lean proteins in every meal.",
-                "Choose whole grains over refined grains.",
-                "Stay hydrated with 8 glasses of water daily."
-            ]
-            return random.choice(tips)
+            return random.choice(self.NUTRITION_TIPS)
         
         return "I can help you plan meals, suggest recipes, provide nutrition information, and give healthy eating tips. What would you like to know?"
+    
+    def target(self, request):
+        """Calorie and macro target a request asks for, e.g. "high protein meal plan for 1800 calories"."""
+        target = NutritionTarget()
+        match = self.CALORIE_PATTERN.search(request)
+        if match:
+            target.calories = float(match.group(1))
+        for diet, shares in self.DIETS.items():
+            if diet in request:
+                target.protein_share, target.carbs_share, target.fat_share = shares
+        return target
+    
+    def available(self, request):
+        """Mask of recipes fitting a vegan/vegetarian request, or None for every recipe"""
+        for tag in self.DIET_TAGS:
+            if tag in request:
+                return self.recipes.tagged(tag)
+        return None
+    
+    def pick(self, meal_type, request):
+        indices = self.recipes.by_type[meal_type]
+        available = self.available(request)
+        if available is not None and available[indices].any():
+            indices = indices[available[indices]]
+        return self.recipes.recipe(indices[self.optimizer.rng.integers(len(indices))])  # Generator.choice costs ~4x more
+    
+    def plan(self, request):
+        """Plan today, or the next 7 days for a weekly request, and log the meals"""
+        target = self.target(request)
+        available = self.available(request)
+        weekly = 'week' in request or '7 day' in request or 'seven day' in request
+        if weekly:
+            days = self.optimizer.plan_week(target, 7, available)
+        else:
+            day = self.optimizer.plan_day(target, available)
+            days = None if day is None else [day]
+        if days is None:
+            return "I don't have enough recipes to plan meals like that. Try a plan without the restriction."
+        
+        today = datetime.date.today()
+        dated = {(today + datetime.timedelta(days=i)).isoformat(): day for i, day in enumerate(days)}
+        if self.log is not None:
+            self.log.log_days({date: [(self.serving(i, portion), self.recipes.meal_types[i],
+                                       int(round(self.recipes.nutrients[i, 0] * portion)), self.recipes.ingredients[i])
+                                      for i, portion in day]
+                               for date, day in dated.items()})
+        return self.describe_week(target, dated) if weekly else self.describe_day(target, days[0])
+    
+    def serving(self, i, portion):
+        name = self.recipes.names[i]
+        return name if portion == 1.0 else f"{name} ({portion:g} servings)"
+    
+    def totals(self, day):
+        """Calories, protein, carbs and fat of a day plan, rounded"""
+        return [int(round(value)) for value in sum(self.recipes.nutrients[i] * portion for i, portion in day)]
+    
+    def describe_day(self, target, day):
+        breakfast, lunch, dinner = (self.serving(i, portion) for i, portion in day)
+        calories, protein, carbs, fat = self.totals(day)
+        return (f"Here's your daily meal plan for about {target.calories:.0f} calories: Breakfast - {breakfast}, "
+                f"Lunch - {lunch}, Dinner - {dinner}. Total calories: {calories}, with {protein} grams of protein, "
+                f"{carbs} of carbs and {fat} of fat.")
+    
+    def describe_week(self, target, dated):
+        days = []
+        for date, day in dated.items():
+            weekday = datetime.date.fromisoformat(date).strftime('%A')
+            breakfast, lunch, dinner = (self.serving(i, portion) for i, portion in day)
+            days.append(f"{weekday}: {breakfast}, {lunch} and {dinner}, {self.totals(day)[0]} calories.")
+        return f"Here's your 7-day meal plan for about {target.calories:.0f} calories a day. " + ' '.join(days)
+    
+    def suggest(self, meal_type, meal):
+        return self.SUGGESTION_TEMPLATES[meal_type].format(**meal)
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        responses = [self.suggest(meal_type, self.recipes.recipe(i)) for i, meal_type in enumerate(self.recipes.meal_types)]
+        responses += self.NUTRITION_TIPS
+        responses += [self.handle_meal_request(query) for query in ('calories', '')]
+        return responses
 
 # DIY Tech Troubleshooter Module
 class TechTroubleshooter:
-    def __init__(self):
-        self.solutions = {
-            'wifi': [
-                "Try restarting your router by unplugging it for 30 seconds, then plugging it back in.",
-                "Check if other devices can connect to the same network.",
-                "Move closer to the router to improve signal strength.",
-                "Forget and reconnect to the WiFi network in your device settings."
-            ],
-            'computer slow': [
-                "Restart your computer to clear temporary files and refresh memory.",
-                "Check for running programs in Task Manager and close unnecessary ones.",
-                "Run a disk cleanup to free up storage space.",
-                "Check for malware using your antivirus software."
-            ],
-            'phone': [
-                "Try restarting your phone by holding the power button.",
-                "Check if you have enough storage space available.",
-                "Update your apps and operating system.",
-                "Clear the cache for problematic apps."
-            ],
-            'printer': [
-                "Check that the printer is connected and powered on.",
-                "Ensure there's paper in the tray and ink in the cartridges.",
-                "Try printing a test page from the printer's menu.",
-                "Restart both your computer and printer."
-            ]
-        }
+    MIN_SCORE = 1.0
+    
+    def __init__(self, knowledge=None):
+        self.knowledge = knowledge or KnowledgeIndex.load(os.path.join(KNOWLEDGE_DIR, 'tech.json'))
     
     def handle_tech_issue(self, issue):
         """Handle tech troubleshooting requests"""
         issue = issue.lower()
         
-        for problem, solutions in self.solutions.items():
-            if problem in issue:
-                return f"Here's how to fix your {problem} issue: {random.choice(solutions)}"
-        
-        if 'internet' in issue or 'connection' in issue:
-            return random.choice(self.solutions['wifi'])
-        
-        elif 'slow' in issue:
-            return random.choice(self.solutions['computer slow'])
-        
-        elif any(device in issue for device in ['laptop', 'computer', 'pc']):
-            return random.choice(self.solutions['computer slow'])
+        # Each topic has several solutions; pick among the best-matching topic's
+        hits = self.knowledge.search(issue, k=4, min_score=self.MIN_SCORE)
+        if hits:
+            problem = hits[0].topic
+            return self.fix(problem, random.choice([hit.text for hit in hits if hit.topic == problem]))
         
         return "I can help troubleshoot WiFi, slow computers, phone issues, printer problems, and internet connectivity. What specific tech issue are you experiencing?"
+    
+    def fix(self, problem, solution):
+        return f"Here's how to fix your {problem} issue: {solution}"
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        responses = [self.fix(problem, solution) for problem, solution in self.knowledge.entries()]
+        responses.append(self.handle_tech_issue(''))
+        return responses
 
 # Language Learning Buddy Module
+def fold(text):
+    """Lowercase with accents stripped, so "adios" finds "adiós"."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+class Vocabulary:
+    """One language's bilingual word list with exact and prefix lookup in both directions.
+    
+    Exact lookups are dict hits on accent-folded keys. Prefix lookups bisect a sorted list
+    of those keys, which answers the same questions as a trie in O(log n) without a node
+    object per character.
+    """
+    loaded = {}  # path -> (file size and mtime, vocabulary): every session shares one copy
+    
+    def __init__(self, language, rows):
+        self.language = language
+        self.to_foreign = {}  # folded english -> [foreign]
+        self.to_english = {}  # folded foreign -> [english]
+        self.categories = {}  # category -> [(english, foreign)]
+        self.order = []  # (english, foreign) in file order, which is the order to teach them
+        for english, foreign, category in rows:
+            self.to_foreign.setdefault(fold(english), []).append(foreign)
+            self.to_english.setdefault(fold(foreign), []).append(english)
+            self.categories.setdefault(category, []).append((english, foreign))
+            self.order.append((english, foreign))
+        self.english_keys = sorted(self.to_foreign)
+        self.foreign_keys = sorted(self.to_english)
+        self.category_words = [(category.rstrip('s'), category) for category in self.categories]  # "greeting" matches too
+        self.category_text = {}  # category -> spoken list, built on first request
+    
+    @classmethod
+    def load(cls, language, vocab_dir=VOCAB_DIR):
+        """Word list from <vocab_dir>/<language>.tsv: english, translation, category per line after a header"""
+        path = os.path.join(vocab_dir, f"{language}.tsv")
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = cls.loaded.get(path)
+        if cached is None or cached[0] != key:
+            with open(path, encoding='utf-8') as f:
+                next(f)
+                rows = [line.rstrip('\n').split('\t') for line in f if line.strip()]
+            cached = cls.loaded[path] = (key, cls(language, rows))
+        return cached[1]
+    
+    def __len__(self):
+        return len(self.order)
+    
+    def translate(self, english):
+        return self.to_foreign.get(fold(english), [])
+    
+    def reverse(self, foreign):
+        return self.to_english.get(fold(foreign), [])
+    
+    @staticmethod
+    def complete(keys, prefix, limit=5):
+        """Up to `limit` sorted keys starting with prefix"""
+        prefix = fold(prefix)
+        i = bisect.bisect_left(keys, prefix)
+        matches = []
+        while i < len(keys) and len(matches) < limit and keys[i].startswith(prefix):
+            matches.append(keys[i])
+            i += 1
+        return matches
+    
+    def describe(self, category):
+        text = self.category_text.get(category)
+        if text is None:
+            words = ", ".join(f"{english} is {foreign}" for english, foreign in self.categories[category])
+            text = self.category_text[category] = f"Here are some {self.language} {category}: {words}"
+        return text
+
+@dataclass(slots=True)
+class Card:
+    id: int
+    language: str
+    term: str
+    translation: str
+    easiness: float = 2.5
+    interval_days: float = 0.0
+    repetitions: int = 0
+    due_at: float = 0.0
+
+class ReviewScheduler:
+    """SM-2 spaced repetition over one user's vocabulary cards, kept in the `vocab_cards` table.
+    
+    Each language has a min-heap of (due_at, card id). A review pushes the card's new due
+    time and leaves its old entry to be skipped when it reaches the top (as
+    ReminderScheduler does for cancels), so both the next due card and a reschedule are
+    O(log n). New words come from a per-language cursor into the word list, kept in
+    `vocab_progress`, so introducing them never rescans the words already taught. Writes
+    go through Storage without waiting; new cards wait for their ids.
+    """
+    MIN_EASINESS = 1.3
+    RELEARN_SECONDS = 60  # a missed card comes back within the same practice session
+    DAY = 86400
+    
+    def __init__(self, storage=None, user_id='local', clock=time.time):
+        self.storage = storage
+        self.user_id = user_id
+        self.clock = clock
+        self.cards = {}  # id -> Card
+        self.heaps = {}  # language -> [(due_at, id)], possibly with stale entries
+        self.known = {}  # language -> set of terms with a card
+        self.cursors = {}  # language -> index of the next word list entry to introduce
+        self.next_id = 1  # only used without storage
+        self.load()
+    
+    def load(self):
+        if self.storage is None:
+            return
+        for row in self.storage.query('SELECT id, language, term, translation, easiness, interval_days, repetitions, '
+                                      'due_at FROM vocab_cards WHERE user_id = ?', (self.user_id,)):
+            card = Card(*row)
+            self.cards[card.id] = card
+            self.heaps.setdefault(card.language, []).append((card.due_at, card.id))
+            self.known.setdefault(card.language, set()).add(card.term)
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+        self.cursors = dict(self.storage.query('SELECT language, position FROM vocab_progress WHERE user_id = ?',
+                                               (self.user_id,)))
+    
+    def introduce(self, language, order, count):
+        """Enroll the next `count` pairs of a word list that have no card yet; returns the new cards"""
+        known = self.known.get(language, ())
+        position = self.cursors.get(language, 0)
+        pairs = []
+        while position < len(order) and len(pairs) < count:
+            if order[position][0] not in known:
+                pairs.append(order[position])
+            position += 1
+        self.cursors[language] = position
+        if self.storage is not None:
+            self.storage.write('INSERT INTO vocab_progress (user_id, language, position) VALUES (?, ?, ?) '
+                               'ON CONFLICT (user_id, language) DO UPDATE SET position = excluded.position',
+                               (self.user_id, language, position))
+        return self.enroll(language, pairs)
+    
+    def enroll(self, language, pairs):
+        """Start learning (term, translation) pairs that have no card yet; returns the new cards"""
+        known = self.known.setdefault(language, set())
+        now = self.clock()
+        rows = []
+        for term, translation in pairs:
+            if term not in known:
+                known.add(term)
+                rows.append((self.user_id, language, term, translation, now))
+        if not rows:
+            return []
+        if self.storage is None:
+            ids = list(range(self.next_id, self.next_id + len(rows)))
+            self.next_id += len(rows)
+        else:
+            ids = self.storage.submit(lambda conn: [conn.execute(
+                'INSERT INTO vocab_cards (user_id, language, term, translation, due_at) VALUES (?, ?, ?, ?, ?)',
+                row).lastrowid for row in rows]).result()
+        heap = self.heaps.setdefault(language, [])
+        cards = []
+        for card_id, (_, _, term, translation, due_at) in zip(ids, rows):
+            card = self.cards[card_id] = Card(card_id, language, term, translation, due_at=due_at)
+            heapq.heappush(heap, (due_at, card_id))
+            cards.append(card)
+        return cards
+    
+    def peek(self, language):
+        """The card in this language that is due soonest, due or not (None without cards)"""
+        heap = self.heaps.get(language)
+        while heap:
+            due_at, card_id = heap[0]
+            if self.cards[card_id].due_at == due_at:
+                return self.cards[card_id]
+            heapq.heappop(heap)  # superseded by a later review
+        return None
+    
+    def next_due(self, language):
+        card = self.peek(language)
+        return card if card is not None and card.due_at <= self.clock() else None
+    
+    def review(self, card, quality):
+        """Grade a recall from 0 (blank) to 5 (perfect) and reschedule the card, as SM-2 does"""
+        now = self.clock()
+        if quality < 3:
+            card.repetitions = 0
+            card.interval_days = 1.0
+            card.due_at = now + self.RELEARN_SECONDS
+        else:
+            card.repetitions += 1
+            if card.repetitions == 1:
+                card.interval_days = 1.0
+            elif card.repetitions == 2:
+                card.interval_days = 6.0
+            else:
+                card.interval_days = round(card.interval_days * card.easiness, 2)
+            card.due_at = now + card.interval_days * self.DAY
+        card.easiness = max(self.MIN_EASINESS, card.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        heapq.heappush(self.heaps[card.language], (card.due_at, card.id))
+        if self.storage is not None:
+            self.storage.write('UPDATE vocab_cards SET easiness = ?, interval_days = ?, repetitions = ?, due_at = ?, '
+                               'reviewed_at = ? WHERE id = ?',
+                               (card.easiness, card.interval_days, card.repetitions, card.due_at, now, card.id))
+        return card
+
 class LanguageBuddy:
-    def __init__(self):
-        self.languages = {
-            'spanish': {
-                'greetings': {'hello': 'hola', 'goodbye': 'adiós', 'thank you': 'gracias'},
-                'numbers': {'one': 'uno', 'two': 'dos', 'three': 'tres'},
-                'colors': {'red': 'rojo', 'blue': 'azul', 'green': 'verde'}
-            },
-            'french': {
-                'greetings': {'hello': 'bonjour', 'goodbye': 'au revoir', 'thank you': 'merci'},
-                'numbers': {'one': 'un', 'two': 'deux', 'three': 'trois'},
-                'colors': {'red': 'rouge', 'blue': 'bleu', 'green': 'vert'}
-            },
-            'german': {
-                'greetings': {'hello': 'hallo', 'goodbye': 'auf wiedersehen', 'thank you': 'danke'},
-                'numbers': {'one': 'eins', 'two': 'zwei', 'three': 'drei'},
-                'colors': {'red': 'rot', 'blue': 'blau', 'green': 'grün'}
-            }
-        }
-        
-        self.learning_tips = [
-            "Practice speaking out loud, even if you're alone.",
-            "Try to think in the language you're learning.",
-            "Watch movies or TV shows with subtitles in your target language.",
-            "Use flashcards for vocabulary building.",
-            "Practice a little bit every day rather than long sessions occasionally."
-        ]
+    LANGUAGES = ('spanish', 'french', 'german')
+    NEW_CARDS = 10  # words introduced when a practice session finds nothing due
+    QUIZ_LENGTH = 5  # cards asked before a quiz hands the conversation back
+    # "how do I say thank you in spanish", "translate good night to french", "what is red in german"
+    TO_FOREIGN = re.compile(r"(?:how (?:do|would|can) (?:i|you) say|translate|what(?:'s| is))\s+(?:the word\s+)?"
+                            r"['\"]?(?P<phrase>.+?)['\"]?\s+(?:in|into|to)\s+(?P<language>spanish|french|german)\b")
+    # "what does gracias mean", "translate danke from german", "what is merci in english"
+    TO_ENGLISH = re.compile(r"what does ['\"]?(?P<phrase>.+?)['\"]? mean"
+                            r"|translate ['\"]?(?P<phrase2>.+?)['\"]?\s+from\s+(?P<language>spanish|french|german)"
+                            r"|what(?:'s| is) ['\"]?(?P<phrase3>.+?)['\"]? in english")
+    QUIZ_WORDS = ('quiz', 'flashcard', 'review', 'practice')
+    
+    LEARNING_TIPS = tuple(f"Here's a language learning tip: {text}" for text in (
+        "Practice speaking out loud, even if you're alone.",
+        "Try to think in the language you're learning.",
+        "Watch movies or TV shows with subtitles in your target language.",
+        "Use flashcards for vocabulary building.",
+        "Practice a little bit every day rather than long sessions occasionally."
+    ))
+    
+    def __init__(self, reviews=None):
+        self.reviews = reviews if reviews is not None else ReviewScheduler()
+        self.vocabularies = {}
+    
+    def vocabulary(self, language):
+        vocabulary = self.vocabularies.get(language)
+        if vocabulary is None:
+            vocabulary = self.vocabularies[language] = Vocabulary.load(language)
+        return vocabulary
     
     def handle_language_request(self, request):
         """Handle language learning requests"""
         request = request.lower()
         
+        match = self.TO_ENGLISH.search(request)
+        if match:
+            phrase = match.group('phrase') or match.group('phrase2') or match.group('phrase3')
+            return self.to_english(phrase, match.group('language'))
+        
+        match = self.TO_FOREIGN.search(request)
+        if match:
+            return self.to_foreign(match.group('phrase'), match.group('language'))
+        
         # Check for specific languages
-        for lang in self.languages.keys():
+        for lang in self.LANGUAGES:
             if lang in request:
-                if 'greeting' in request:
-                    greetings = self.languages[lang]['greetings']
-                    greeting_list = ", ".join([f"{eng} is {foreign}" for eng, foreign in greetings.items()])
-                    return f"Here are some {lang} greetings: {greeting_list}"
-                
-                elif 'number' in request:
-                    numbers = self.languages[lang]['numbers']
-                    number_list = ", ".join([f"{eng} is {foreign}" for eng, foreign in numbers.items()])
-                    return f"Here are some {lang} numbers: {number_list}"
+                if any(word in request for word in self.QUIZ_WORDS):
+                    return self.quiz(lang)
                 
-                elif 'color' in request:
-                    colors = self.languages[lang]['colors']
-                    color_list = ", ".join([f"{eng} is {foreign}" for eng, foreign in colors.items()])
-                    return f"Here are some {lang} colors: {color_list}"
+                vocabulary = self.vocabulary(lang)
+                for word, category in vocabulary.category_words:
+                    if word in request:
+                        return vocabulary.describe(category)
         
         if 'translate' in request:
-            return "I can help with basic translations for Spanish, French, and German. What would you like to translate?"
+            return "I can translate words and phrases between English and Spanish, French, or German. Try: how do I say thank you in Spanish?"
         
-        elif 'practice' in request:
-            return "Let's practice! I can help you with greetings, numbers, and colors in Spanish, French, or German. Which language interests you?"
+        elif any(word in request for word in self.QUIZ_WORDS):
+            return "Let's practice! I can quiz you on vocabulary in Spanish, French, or German, and bring each word back just before you'd forget it. Which language interests you?"
         
         elif 'tip' in request or 'advice' in request:
-            return f"Here's a language learning tip: {random.choice(self.learning_tips)}"
+            return random.choice(self.LEARNING_TIPS)
         
-        return "I can help you learn Spanish, French, or German. I can teach greetings, numbers, colors, provide translations, and give learning tips. What would you like to learn?"
+        return "I can help you learn Spanish, French, or German. I can teach greetings, numbers, colors, provide translations, quiz you with flashcards, and give learning tips. What would you like to learn?"
+    
+    def to_foreign(self, phrase, language):
+        vocabulary = self.vocabulary(language)
+        translations = vocabulary.translate(phrase)
+        if translations:
+            return f"{phrase.capitalize()} in {language.capitalize()} is {' or '.join(translations)}."
+        return self.unknown(phrase, language, vocabulary.complete(vocabulary.english_keys, phrase[:3]))
+    
+    def to_english(self, phrase, language=None):
+        for lang in ([language] if language else self.LANGUAGES):
+            meanings = self.vocabulary(lang).reverse(phrase)
+            if meanings:
+                return f"{phrase.capitalize()} is {lang.capitalize()} for {' or '.join(meanings)}."
+        language = language or 'Spanish, French, or German'
+        return self.unknown(phrase, language, [])
+    
+    def unknown(self, phrase, language, suggestions):
+        hint = f" Did you mean {', '.join(suggestions)}?" if suggestions else ""
+        return f"I don't know how to translate {phrase} in {language.capitalize()} yet.{hint}"
+    
+    def quiz(self, language, feedback="", asked=0):
+        """Ask for the next due card, introducing new words when nothing is due"""
+        if asked >= self.QUIZ_LENGTH:
+            return f"{feedback} That's {asked} cards for now. Say {language} quiz to keep going.".strip()
+        card = self.reviews.next_due(language)
+        if card is None:
+            self.reviews.introduce(language, self.vocabulary(language).order, self.NEW_CARDS)
+            card = self.reviews.next_due(language)
+        if card is None:
+            upcoming = self.reviews.peek(language)
+            later = f" Your next review is {self.until(upcoming.due_at)}." if upcoming else ""
+            return f"{feedback} That's every {language.capitalize()} word due for now.{later}".strip()
+        question = f"What is {card.term} in {language.capitalize()}?"
+        return DialogueFrame([Slot('answer', parse_free_text, question)], lambda answer: self.grade(card, answer, asked + 1),
+                             opening=f"{feedback} {question}".strip(), intent='language').step('')
+    
+    def grade(self, card, answer, asked=1):
+        answer = fold(answer)
+        correct = any(re.search(rf"\b{re.escape(fold(option))}\b", answer)
+                      for option in self.vocabulary(card.language).translate(card.term))
+        self.reviews.review(card, 4 if correct else 1)
+        feedback = (f"Correct, {card.translation}!" if correct
+                    else f"Not quite: {card.term} is {card.translation}. I'll ask again in a minute.")
+        return self.quiz(card.language, feedback, asked)
+    
+    def until(self, due_at):
+        seconds = max(0.0, due_at - self.reviews.clock())
+        if seconds < 3600:
+            return f"in {max(1, round(seconds / 60))} minutes"
+        if seconds < 2 * 86400:
+            return f"in {round(seconds / 3600)} hours"
+        return f"in {round(seconds / 86400)} days"
+    
+    def static_responses(self):
+        """Fixed responses this module can give"""
+        responses = [self.handle_language_request(f"{lang} {category}")
+                     for lang in self.LANGUAGES for category in self.vocabulary(lang).categories]
+        responses += self.LEARNING_TIPS
+        responses += [self.handle_language_request(query) for query in ('translate', 'practice', '')]
+        return responses
 
 # Main execution
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Personal AI voice assistant")
+    parser.add_argument('--input', choices=['speech', 'stdin', 'jsonl', 'socket'], default='speech',
+                        help="where commands come from (default: microphone)")
+    parser.add_argument('--output', choices=['speech', 'stdout', 'jsonl', 'socket'], default=None,
+                        help="where responses go (default: speech, or stdout for text input)")
+    parser.add_argument('--input-file', help="JSONL command file for --input jsonl")
+    parser.add_argument('--output-file', help="JSONL response file for --output jsonl")
+    parser.add_argument('--port', type=int, default=8765, help="port for socket I/O")
+    parser.add_argument('--recognizer', default='google,offline',
+                        help=f"comma-separated recognizer fallback chain from: {', '.join(RECOGNIZER_BACKENDS)}")
+    parser.add_argument('--recognizer-timeout', type=float, default=3.0, help="seconds before falling back to the next recognizer")
+    parser.add_argument('--vad-silence', type=float, metavar='SECONDS',
+                        help="end utterances after this much quiet (e.g. 0.35) and send only the detected speech to the recognizer")
+    parser.add_argument('--wake-word', metavar='DIR',
+                        help="only recognize speech after the wake word, spotted against the WAV recordings of it in DIR")
+    parser.add_argument('--wake-margin', type=float,
+                        help=f"wake word threshold as a multiple of the spread between its recordings "
+                             f"(default {WakeWordDetector.THRESHOLD_MARGIN}; higher accepts more)")
+    parser.add_argument('--wake-cpu-budget', type=float, metavar='PERCENT',
+                        help="cap wake word spotting at this percentage of one core by checking less often")
+    parser.add_argument('--fixture-transcripts', help="JSON map of audio hash -> transcript for the fixture recognizer")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="run every command in FILE (.jsonl or plain text) through the assistant and report throughput")
+    parser.add_argument('--db', default='assistant_data.db', help="SQLite database path")
+    parser.add_argument('--report', choices=['week', 'month'],
+                        help="print recent spending, task completion and calorie trends from the database and exit")
+    parser.add_argument('--export-reports', metavar='DIR', help="write the reporting rollups to DIR and exit")
+    parser.add_argument('--export-format', choices=['parquet', 'arrow', 'csv'], default='parquet',
+                        help="file format for --export-reports; parquet and arrow need pyarrow, else CSV is written")
+    parser.add_argument('--tts-cache', metavar='DIR', help="play repeated responses from pre-rendered audio in DIR")
+    parser.add_argument('--tts-cache-mb', type=int, default=32, help="in-memory size bound for the TTS cache")
+    parser.add_argument('--stream-tts', action='store_true',
+                        help="speak long responses sentence by sentence (implies a TTS cache) and allow barge-in")
+    parser.add_argument('--prewarm-tts', action='store_true',
+                        help="render every static response into the TTS cache and exit")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="overlap capture, recognition, processing and speech, and print per-stage latency on exit")
+    parser.add_argument('--serve', action='store_true',
+                        help="serve many text users at once over newline-delimited JSON on --port or --unix-socket")
+    parser.add_argument('--unix-socket', metavar='PATH', help="listen on a Unix socket instead of TCP for --serve")
+    parser.add_argument('--max-sessions', type=int, default=10000, help="sessions kept in memory by --serve")
+    parser.add_argument('--idle-timeout', type=float, default=900.0, help="seconds before an idle session is dropped")
+    parser.add_argument('--workers', type=int, default=8, help="threads running commands for --serve")
+    parser.add_argument('--metrics-port', type=int, help="time every turn and serve /metrics, /traces and /profile on this port")
+    parser.add_argument('--metrics-file', metavar='PATH', help="time every turn and keep Prometheus metrics in PATH")
+    parser.add_argument('--metrics-interval', type=float, default=15.0, help="seconds between --metrics-file rewrites")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="sample stacks from startup and write them to PATH on exit (SIGUSR2 toggles sampling at any time)")
+    return parser.parse_args(argv)
+
+def start_instrumentation(args):
+    """Turn on tracing and profiling outputs asked for on the command line"""
+    if args.metrics_port or args.metrics_file:
+        tracer.enabled = True
+    if args.metrics_port:
+        host, port = tracer.serve(args.metrics_port)
+        print(f"Metrics on http://{host}:{port}/metrics")
+    if args.metrics_file:
+        tracer.dump_every(args.metrics_file, args.metrics_interval)
+        atexit.register(tracer.dump, args.metrics_file)
+    if args.profile:
+        tracer.profiler.start()
+        atexit.register(lambda: tracer.profiler.running and tracer.toggle_profiler(args.profile))
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, lambda *_: tracer.toggle_profiler(f"profile-{int(time.time())}.folded"))
+
+def build_adapters(args):
+    """Create input/output adapters from command line options"""
+    socket_io = SocketIO(port=args.port) if 'socket' in (args.input, args.output) else None
+    
+    if args.input == 'speech':
+        wake_cpu_budget = args.wake_cpu_budget / 100 if args.wake_cpu_budget is not None else None
+        input_adapter = BackgroundAdapter(lambda: SpeechInput(args.recognizer.split(','), args.recognizer_timeout,
+                                                              args.vad_silence, args.wake_word, args.wake_margin,
+                                                              wake_cpu_budget, fixture_path=args.fixture_transcripts))
+    elif args.input == 'stdin':
+        input_adapter = StreamInput()
+    elif args.input == 'jsonl':
+        input_adapter = JsonlInput(args.input_file)
+    else:
+        input_adapter = socket_io
+    
+    output = args.output or ('speech' if args.input == 'speech' else 'stdout')
+    # Only the assistant's own phrases: module responses would build every lazy module.
+    # --prewarm-tts renders those ahead of time instead.
+    if output == 'speech' and args.stream_tts:
+        output_adapter = BackgroundAdapter(lambda: StreamingSpeechOutput(args.tts_cache or TTS_CACHE_DIR,
+                                                                         args.tts_cache_mb * 1024 * 1024),
+                                           prewarm=VoiceAssistant.core_phrases())
+    elif output == 'speech' and args.tts_cache:
+        output_adapter = BackgroundAdapter(lambda: CachedSpeechOutput(args.tts_cache, args.tts_cache_mb * 1024 * 1024),
+                                           prewarm=VoiceAssistant.core_phrases())
+    elif output == 'speech':
+        output_adapter = BackgroundAdapter(SpeechOutput)
+    elif output == 'stdout':
+        output_adapter = StreamOutput()
+    elif output == 'jsonl':
+        output_adapter = JsonlOutput(args.output_file)
+    else:
+        output_adapter = socket_io
+    
+    return input_adapter, output_adapter
+
 if __name__ == "__main__":
+    args = parse_args()
+    start_instrumentation(args)
+    
+    if args.batch:
+        # Headless batch mode: no audio hardware involved
+        assistant = VoiceAssistant(StreamInput(), StreamOutput(), db_path=args.db)
+        output = JsonlOutput(args.output_file) if args.output_file else None
+        try:
+            print(assistant.run_batch(read_commands(args.batch), output))
+        finally:
+            if output is not None:
+                output.close()
+            assistant.reminders.close()
+            assistant.reports.close()
+            assistant.storage.close()
+        sys.exit(0)
+    
+    if args.serve:
+        server = SessionServer(args.db, args.max_sessions, args.idle_timeout, args.workers)
+        try:
+            asyncio.run(server.serve(port=args.port, unix_socket=args.unix_socket))
+        except KeyboardInterrupt:
+            print("\nServer stopped.")
+        finally:
+            server.close()
+        sys.exit(0)
+    
+    if args.report or args.export_reports:
+        storage = Storage(args.db)
+        reports = Reports(storage)
+        try:
+            if args.report:
+                print("\n".join(reports.summary('local', args.report)))
+            if args.export_reports:
+                for path in reports.export(args.export_reports, args.export_format):
+                    print(f"Wrote {path}")
+        finally:
+            storage.close()
+        sys.exit(0)
+    
+    if args.prewarm_tts:
+        output_type = StreamingSpeechOutput if args.stream_tts else CachedSpeechOutput
+        output = output_type(args.tts_cache or TTS_CACHE_DIR, args.tts_cache_mb * 1024 * 1024)
+        assistant = VoiceAssistant(StreamInput(), output, db_path=args.db)
+        phrases = assistant.static_phrases()
+        start = time.perf_counter()
+        rendered = output.prewarm(phrases)
+        print(f"Rendered {rendered} clips for {len(phrases)} static phrases in {time.perf_counter() - start:.1f}s")
+        assistant.close()
+        sys.exit(0)
+    
     # Create and run the voice assistant
-    assistant = VoiceAssistant()
+    assistant = VoiceAssistant(*build_adapters(args), db_path=args.db)
     
     print("Starting Voice Assistant...")
     print("Available modules:")
@@ -543,10 +4654,16 @@ if __name__ == "__main__":
     print("\nSay 'stop', 'quit', or 'exit' to end the session.\n")
     
     try:
-        assistant.run()
+        if args.pipeline:
+            pipeline = assistant.run_pipelined()
+            print(pipeline.report())
+        else:
+            assistant.run()
     except KeyboardInterrupt:
         print("\nAssistant stopped by user.")
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
-        assistant.conn.close()
+        if hasattr(assistant.output, 'report'):
+            print(assistant.output.report())
+        assistant.close()
@@ -0,0 +1,79 @@
+"""Multi-turn dialogue benchmark: scripted conversations replayed through the assistant,
+counting turns per completed action and comparing follow-up turns with routed ones.
+
+Every script ends with the action stored in the database; the benchmark checks the rows
+so a conversation that silently lost a slot fails instead of looking fast.
+
+Usage: python benchmarks/bench_dialogue.py [--rounds 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import StreamInput, StreamOutput, VoiceAssistant, percentile
+
+# (name, turns, table the completed action writes to)
+SCRIPTS = [
+    ("task, one shot", ["add task buy milk tomorrow with high priority"], 'tasks'),
+    ("task, two turns", ["add a new task", "renew passport by friday"], 'tasks'),
+    ("expense, one shot", ["I spent 12 dollars on lunch"], 'expenses'),
+    ("expense, three turns", ["add expense", "twenty five dollars", "gas for the car"], 'expenses'),
+    ("reminder, one shot", ["remind me to stretch in 30 minutes"], 'reminders'),
+    ("reminder, three turns", ["set a reminder", "at 5 pm", "call the dentist"], 'reminders'),
+    ("cancelled midway", ["add expense", "never mind"], None),
+]
+
+
+def count_rows(assistant, table):
+    assistant.storage.flush()
+    return assistant.storage.query(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assistant = VoiceAssistant(StreamInput(), StreamOutput(), db_path=os.path.join(tmp, 'dialogue.db'))
+        routed, follow_ups = [], []
+        per_script = {name: [] for name, _, _ in SCRIPTS}
+        try:
+            for _ in range(args.rounds):
+                for name, turns, table in SCRIPTS:
+                    before = count_rows(assistant, table) if table else 0
+                    start = time.perf_counter()
+                    for turn in turns:
+                        pending = assistant.dialogue.pending is not None
+                        turn_start = time.perf_counter()
+                        assistant.process_command(turn)
+                        (follow_ups if pending else routed).append(time.perf_counter() - turn_start)
+                    per_script[name].append(time.perf_counter() - start)
+                    assert assistant.dialogue.pending is None, f"{name}: conversation left open"
+                    if table:
+                        assert count_rows(assistant, table) == before + 1, f"{name}: nothing stored"
+            stats = dict(assistant.dialogue.stats)
+        finally:
+            assistant.close()
+
+    print(f"{args.rounds} rounds of {len(SCRIPTS)} scripted conversations")
+    for name, turns, table in SCRIPTS:
+        times = sorted(per_script[name])
+        outcome = "completed" if table else "abandoned"
+        print(f"  {name:24} {len(turns)} turn(s), {outcome}, p50 {percentile(times, 50) * 1e3:.3f} ms per conversation")
+    completed = sum(len(turns) for _, turns, table in SCRIPTS if table) / sum(1 for *_, table in SCRIPTS if table)
+    print(f"  average turns per completed action: {completed:.2f}")
+    print(f"dialogue: {stats['started']:,} started, {stats['completed']:,} completed, "
+          f"{stats['abandoned']:,} abandoned, {stats['follow_ups']:,} follow-ups answered without routing")
+    for label, times in (("routed turn", routed), ("follow-up turn", follow_ups)):
+        times.sort()
+        print(f"  {label:15} p50 {percentile(times, 50) * 1e6:7.1f} us, p99 {percentile(times, 99) * 1e6:7.1f} us "
+              f"({len(times):,} turns)")
+
+
+if __name__ == '__main__':
+    main()
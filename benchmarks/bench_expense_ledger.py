@@ -0,0 +1,83 @@
+"""ExpenseLedger at scale: streaming CSV import, then budget queries against running totals.
+
+Compares FinanceAssistant.budget_status() (incremental totals) with rescanning: the old
+in-memory sum() over every expense, and a per-category SUM() over the indexed table.
+
+Usage: python benchmarks/bench_expense_ledger.py [--rows 1000000] [--queries 10000]
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import ExpenseLedger, FinanceAssistant, Storage
+
+CATEGORIES = ['food', 'transportation', 'entertainment', 'utilities', 'shopping', 'health', 'travel']
+
+
+def write_csv(path, rows, seed=9):
+    rng = random.Random(seed)
+    start = datetime.date.today() - datetime.timedelta(days=3 * 365)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['amount', 'category', 'description', 'date'])
+        for i in range(rows):
+            date = start + datetime.timedelta(days=rng.randrange(3 * 365 + 1))
+            writer.writerow([f"{rng.uniform(1, 120):.2f}", rng.choice(CATEGORIES), f"expense {i}", date.isoformat()])
+
+
+def per_query(label, fn, queries):
+    start = time.perf_counter()
+    for _ in range(queries):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed / queries * 1e6:12.1f} us/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'expenses.csv')
+        write_csv(csv_path, args.rows)
+
+        storage = Storage(os.path.join(tmp, 'ledger.db'))
+        ledger = ExpenseLedger(storage)
+        finance = FinanceAssistant(ledger)
+
+        start = time.perf_counter()
+        imported = ledger.import_csv(csv_path)
+        elapsed = time.perf_counter() - start
+        print(f"imported {imported:,} expenses in {elapsed:.2f}s ({imported / elapsed:,.0f} rows/s)")
+
+        start = time.perf_counter()
+        ledger.reload()
+        print(f"startup reload of running totals      {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+        per_query("budget_status() (running totals)", finance.budget_status, args.queries)
+
+        month = datetime.date.today().isoformat()[:7]
+
+        def indexed_sum():
+            for category in finance.BUDGETS:
+                storage.query('SELECT SUM(amount) FROM expenses '
+                              'WHERE user_id = ? AND category = ? AND date >= ? AND date < ?',
+                              (ledger.user_id, category, f"{month}-01", f"{month}-99"))
+        per_query("indexed SUM() per category", indexed_sum, max(1, args.queries // 100))
+
+        amounts = [row[0] for row in storage.query('SELECT amount FROM expenses')]
+        per_query("legacy sum() over every expense", lambda: sum(amounts), max(1, args.queries // 1000))
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""KnowledgeIndex at scale: build, cached reload and query latency on a synthetic knowledge base,
+against the old `topic in query` scan over a dict.
+
+Usage: python benchmarks/bench_knowledge.py [--entries 100000] [--queries 2000]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import KnowledgeIndex, percentile
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vo', 'zi', 'pe', 'so', 'da', 'fu', 'gri', 'bel', 'tor', 'wen']
+
+
+def synthetic_entries(count, rng, vocabulary=20000):
+    words = dict.fromkeys(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                          for _ in range(vocabulary * 2))
+    words = list(words)[:vocabulary]
+    # Zipf-ish: a few words are everywhere, most are rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    entries = []
+    for i in range(count):
+        topic = f"{rng.choice(words)} {rng.choice(words)} {i}"
+        aliases = [' '.join(rng.choices(words, k=2)) for _ in range(2)]
+        text = ' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(15, 40))) + '.'
+        entries.append({'topic': topic, 'aliases': aliases, 'text': text})
+    return entries
+
+
+def paraphrase(entry, rng):
+    """A query naming one alias and a couple of words from the answer, in a sentence"""
+    words = entry['text'].rstrip('.').split()
+    return f"can you tell me about {rng.choice(entry['aliases'])} and {' '.join(rng.sample(words, 2))}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    entries = synthetic_entries(args.entries, rng)
+    samples = rng.sample(range(len(entries)), min(args.queries, len(entries)))
+    queries = [(paraphrase(entries[i], rng), i) for i in samples]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'knowledge.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        cache_dir = os.path.join(tmp, 'cache')
+
+        start = time.perf_counter()
+        index = KnowledgeIndex.load(path, cache_dir)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        index = KnowledgeIndex.load(path, cache_dir)
+        load_s = time.perf_counter() - start
+        size_mb = os.path.getsize(os.path.join(cache_dir, 'knowledge.npz')) / 1e6
+
+    print(f"{len(index):,} entries, {len(index.vocab):,} terms, {len(index.doc_ids):,} postings")
+    print(f"  build + save       {build_s * 1000:9.1f} ms")
+    print(f"  cached reload      {load_s * 1000:9.1f} ms ({size_mb:.1f} MB)")
+
+    latencies, found = [], 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k=3)
+        latencies.append(time.perf_counter() - start)
+        found += any(hit.topic == entries[expected]['topic'] for hit in hits)
+    latencies.sort()
+    print(f"  search top-3       p50 {percentile(latencies, 50) * 1e3:.3f} ms, "
+          f"p99 {percentile(latencies, 99) * 1e3:.3f} ms, recall@3 {found / len(queries):.1%}")
+
+    # The old approach: substring-test every topic against the query
+    table = {entry['topic']: entry['text'] for entry in entries}
+    scan_queries = [query for query, _ in queries[:50]]
+    start = time.perf_counter()
+    for query in scan_queries:
+        next((text for topic, text in table.items() if topic in query), None)
+    scan_ms = (time.perf_counter() - start) / len(scan_queries) * 1000
+    print(f"  `topic in query`   {scan_ms:9.3f} ms per query (misses every paraphrase)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Meal plan optimizer on a synthetic 10k-recipe catalog: load time, day and week planning
+time, and how close plans land to their targets compared with three random.choice picks.
+
+Usage: python benchmarks/bench_meal_plan.py [--recipes 10000] [--weeks 20]
+"""
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import MealLog, MealPlanner, MealPlanOptimizer, NutritionTarget, RecipeTable, Storage, percentile
+
+# Typical calories per meal type, and (protein, carbs, fat) calorie shares a recipe varies around
+MEAL_CALORIES = {'breakfast': (200, 550), 'lunch': (300, 750), 'dinner': (350, 900)}
+MACRO_SHARES = (0.22, 0.48, 0.30)
+
+
+def synthetic_catalog(path, count, rng):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'meal_type', 'calories', 'protein_g', 'carbs_g', 'fat_g', 'prep_minutes', 'tags',
+                         'ingredients'])
+        for i in range(count):
+            meal_type = rng.choice(list(MEAL_CALORIES))
+            calories = rng.uniform(*MEAL_CALORIES[meal_type])
+            shares = [rng.uniform(0.5, 1.5) * share for share in MACRO_SHARES]
+            protein, carbs, fat = (calories * share / sum(shares) for share in shares)
+            tags = 'vegetarian' if rng.random() < 0.3 else ''
+            writer.writerow([f"{meal_type} recipe {i}", meal_type, round(calories), round(protein / 4, 1),
+                             round(carbs / 4, 1), round(fat / 9, 1), rng.randint(5, 60), tags, 'a;b;c'])
+
+
+def miss(table, day, target):
+    """Relative calorie miss and mean relative macro miss of a [(index, portion)] day"""
+    totals = sum(table.nutrients[i] * portion for i, portion in day)
+    relative = np.abs(totals - target.vector()) / target.vector()
+    return relative[0], relative[1:].mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipes', type=int, default=10_000)
+    parser.add_argument('--weeks', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(17)
+    target = NutritionTarget(calories=2000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'recipes.csv')
+        synthetic_catalog(path, args.recipes, rng)
+        start = time.perf_counter()
+        table = RecipeTable.load(path)
+        load_s = time.perf_counter() - start
+
+        optimizer = MealPlanOptimizer(table, rng=np.random.default_rng(17))
+        optimizer.plan_day(target)  # warm up
+        day_times, week_times, misses = [], [], []
+        for _ in range(args.weeks):
+            start = time.perf_counter()
+            optimizer.plan_day(target)
+            day_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            week = optimizer.plan_week(target, 7)
+            week_times.append(time.perf_counter() - start)
+            misses.extend(miss(table, day, target) for day in week)
+            assert len({i for day in week for i, _ in day}) == 21, "a recipe repeated within the week"
+
+        # The old planner: one random recipe per meal type
+        random_misses = [miss(table, [(rng.choice(table.by_type[meal_type]), 1.0) for meal_type in RecipeTable.MEAL_TYPES],
+                              target) for _ in range(len(misses))]
+
+        storage = Storage(os.path.join(tmp, 'meals.db'))
+        planner = MealPlanner(MealLog(storage), table)
+        start = time.perf_counter()
+        planner.handle_meal_request("weekly meal plan")
+        request_s = time.perf_counter() - start
+        logged = storage.query('SELECT COUNT(*) FROM meals')[0][0]
+        storage.close()
+
+    day_times.sort()
+    week_times.sort()
+    print(f"{len(table):,} recipes loaded in {load_s * 1000:.0f} ms")
+    print(f"  plan a day        p50 {percentile(day_times, 50) * 1000:7.2f} ms")
+    print(f"  plan a week       p50 {percentile(week_times, 50) * 1000:7.2f} ms, max {week_times[-1] * 1000:.2f} ms")
+    print(f"  weekly request    {request_s * 1000:7.2f} ms including logging {logged} meals to SQLite")
+    for label, results in (("optimizer", misses), ("random.choice", random_misses)):
+        calories = [calorie_miss for calorie_miss, _ in results]
+        macros = [macro_miss for _, macro_miss in results]
+        print(f"  {label:15} calorie miss mean {statistics.mean(calories):6.1%} max {max(calories):6.1%}, "
+              f"macro miss mean {statistics.mean(macros):6.1%}")
+
+
+if __name__ == '__main__':
+    main()
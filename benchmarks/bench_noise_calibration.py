@@ -0,0 +1,102 @@
+"""Timing harness: per-turn calibration vs NoiseCalibrator, replayed from WAV fixtures.
+
+Each fixture is treated as one turn. The legacy path runs adjust_for_ambient_noise()
+before every listen(), which blocks for ~1s of live audio; NoiseCalibrator calibrates
+once and only again when the rolling noise estimate drifts.
+
+Usage: python benchmarks/bench_noise_calibration.py [--fixtures DIR] [--turns 50]
+Without --fixtures a synthetic corpus (noise / tone burst / noise) is generated.
+"""
+import argparse
+import glob
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+from Ai import NoiseCalibrator
+
+SAMPLE_RATE = 16000
+
+
+def write_fixture(path, noise_level, rng, lead=1.5, speech=1.0, tail=1.0):
+    """Write a mono 16-bit WAV: ambient noise, a voiced tone burst, ambient noise"""
+    frames = bytearray()
+    total = int((lead + speech + tail) * SAMPLE_RATE)
+    speech_start, speech_end = int(lead * SAMPLE_RATE), int((lead + speech) * SAMPLE_RATE)
+    for i in range(total):
+        sample = rng.gauss(0, noise_level)
+        if speech_start <= i < speech_end:
+            sample += 6000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE) * math.sin(math.pi * (i - speech_start) / (speech_end - speech_start))
+        frames += struct.pack('<h', max(-32768, min(32767, int(sample))))
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(bytes(frames))
+
+
+def synthetic_corpus(directory, turns, seed=3):
+    rng = random.Random(seed)
+    paths = []
+    for turn in range(turns):
+        # The room gets noisier halfway through, which should trigger one recalibration
+        noise = 150 if turn < turns // 2 else 400
+        path = os.path.join(directory, f"turn_{turn:03d}.wav")
+        write_fixture(path, noise * rng.uniform(0.9, 1.1), rng)
+        paths.append(path)
+    return paths
+
+
+def replay_legacy(paths):
+    recognizer = sr.Recognizer()
+    dead_audio = 0.0
+    start = time.perf_counter()
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            recognizer.adjust_for_ambient_noise(source)
+            dead_audio += 1.0
+            recognizer.listen(source, timeout=5)
+    return time.perf_counter() - start, dead_audio, len(paths)
+
+
+def replay_calibrator(paths):
+    recognizer = sr.Recognizer()
+    calibrator = NoiseCalibrator(recognizer)
+    start = time.perf_counter()
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            calibrator.ensure_calibrated(source)
+            audio = recognizer.listen(source, timeout=5)
+        calibrator.observe(audio)
+    return time.perf_counter() - start, calibrator.calibrations * calibrator.duration, calibrator.calibrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help="directory of WAV fixtures, one utterance per file")
+    parser.add_argument('--turns', type=int, default=50, help="synthetic turns when no fixtures are given")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = sorted(glob.glob(os.path.join(args.fixtures, '*.wav'))) if args.fixtures else synthetic_corpus(tmp, args.turns)
+        turns = len(paths)
+        print(f"Replaying {turns} turns")
+        for label, replay in (('per-turn adjust', replay_legacy), ('NoiseCalibrator', replay_calibrator)):
+            cpu, dead_audio, calibrations = replay(paths)
+            # With a live microphone the calibration audio is wall-clock time the user waits through
+            per_turn_ms = (cpu + dead_audio) / turns * 1000
+            print(f"{label:<16} calibrations {calibrations:4d}  dead audio {dead_audio:6.1f}s  "
+                  f"processing {cpu * 1000:8.1f} ms  latency/turn {per_turn_ms:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
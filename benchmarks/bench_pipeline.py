@@ -0,0 +1,105 @@
+"""Pipeline benchmark: VoiceAssistant.run() against run_pipelined() with simulated capture,
+recognition and playback latencies, plus the pipeline's per-stage metrics.
+
+Capture, recognition and speech sleep for fixed times, as a microphone, a network
+recognizer and a TTS engine would block. Run serially every turn pays for all of them;
+in the pipeline capturing the next utterance overlaps with recognizing and speaking
+the previous ones, so a turn should cost about as much as the slowest stage.
+
+Usage: python benchmarks/bench_pipeline.py [--turns 40] [--capture-ms 30] [--recognize-ms 20] [--speak-ms 25]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import StreamInput, StreamOutput, VoiceAssistant
+
+COMMANDS = [
+    "list tasks",
+    "what's the weather",
+    "budget status",
+    "give me a breathing exercise",
+    "my wifi keeps dropping",
+]
+
+
+class SimulatedInput:
+    """Capture and recognition that block like a microphone and a recognizer service"""
+    def __init__(self, turns, capture_s, recognize_s):
+        self.commands = iter(COMMANDS[i % len(COMMANDS)] for i in range(turns))
+        self.capture_s = capture_s
+        self.recognize_s = recognize_s
+
+    def capture(self):
+        time.sleep(self.capture_s)
+        return next(self.commands, None)
+
+    def recognize(self, command):
+        time.sleep(self.recognize_s)
+        return command
+
+    def listen(self):
+        command = self.capture()
+        return None if command is None else self.recognize(command)
+
+    def close(self):
+        pass
+
+
+class SimulatedOutput:
+    """Playback that blocks for a fixed time per response"""
+    def __init__(self, speak_s):
+        self.speak_s = speak_s
+        self.spoken = []
+
+    def say(self, text):
+        time.sleep(self.speak_s)
+        self.spoken.append(text)
+
+    def close(self):
+        pass
+
+
+def timed_run(assistant, args, pipelined):
+    assistant.input = SimulatedInput(args.turns, args.capture_ms / 1000, args.recognize_ms / 1000)
+    assistant.output = SimulatedOutput(args.speak_ms / 1000)
+    start = time.perf_counter()
+    pipeline = assistant.run_pipelined() if pipelined else assistant.run()
+    return time.perf_counter() - start, assistant.output.spoken, pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--capture-ms', type=float, default=30.0)
+    parser.add_argument('--recognize-ms', type=float, default=20.0)
+    parser.add_argument('--speak-ms', type=float, default=25.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assistant = VoiceAssistant(StreamInput(io.StringIO()), StreamOutput(io.StringIO()),
+                                   db_path=os.path.join(tmp, 'pipeline.db'))
+        try:
+            serial, serial_spoken, _ = timed_run(assistant, args, pipelined=False)
+            pipelined, pipelined_spoken, pipeline = timed_run(assistant, args, pipelined=True)
+        finally:
+            assistant.close()
+
+    # Some modules pick a random tip, so compare how many responses came back
+    assert len(pipelined_spoken) == len(serial_spoken) == args.turns + 1, "a turn went unanswered"
+    slowest = max(args.capture_ms, args.recognize_ms, args.speak_ms)
+    print(f"{args.turns} turns: capture {args.capture_ms:g} ms, recognize {args.recognize_ms:g} ms, "
+          f"speak {args.speak_ms:g} ms")
+    print(f"  serial      {serial * 1e3:8.1f} ms  {serial / args.turns * 1e3:6.1f} ms/turn")
+    print(f"  pipelined   {pipelined * 1e3:8.1f} ms  {pipelined / args.turns * 1e3:6.1f} ms/turn  "
+          f"(slowest stage {slowest:g} ms)  speed-up x{serial / pipelined:.2f}")
+    print(pipeline.report())
+
+
+if __name__ == '__main__':
+    main()
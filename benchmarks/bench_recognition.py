@@ -0,0 +1,82 @@
+"""Offline end-to-end benchmark: WAV capture -> recognizer chain -> process_command.
+
+Uses FixtureBackend, so no network or microphone is needed. The second run puts a
+backend that hangs in front of the fixture backend to show the fallback timeout
+bounding per-turn latency.
+
+Usage: python benchmarks/bench_recognition.py [--turns 40] [--timeout 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+from Ai import FallbackRecognizer, FixtureBackend, StreamOutput, StreamInput, VoiceAssistant, percentile
+from bench_noise_calibration import synthetic_corpus
+
+COMMANDS = ['tell me about algebra', 'show my budget', 'list tasks', 'i need a breathing exercise',
+            'suggest a dinner recipe', 'my wifi keeps dropping', 'spanish greetings', 'reset my password']
+
+
+class StalledBackend:
+    """Stand-in for a network recognizer that never answers in time"""
+    name = 'stalled'
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def recognize(self, audio):
+        time.sleep(self.delay)
+        raise sr.RequestError("stalled")
+
+
+def capture_all(paths):
+    recognizer = sr.Recognizer()
+    clips = []
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            clips.append(recognizer.record(source))
+    return clips
+
+
+def run(label, assistant, recognizer, clips):
+    latencies = []
+    for clip in clips:
+        start = time.perf_counter()
+        command = recognizer.recognize(clip).lower()
+        assistant.process_command(command)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{label:<22} turns {len(latencies):4d}  p50 {percentile(latencies, 50) * 1000:8.2f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:8.2f} ms  stats {recognizer.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--timeout', type=float, default=0.2, help="fallback timeout per backend")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        clips = capture_all(synthetic_corpus(tmp, args.turns))
+        fixtures = FixtureBackend()
+        for clip in clips:
+            fixtures.add(clip, rng.choice(COMMANDS))
+
+        with open(os.devnull, 'w') as devnull:
+            assistant = VoiceAssistant(StreamInput(), StreamOutput(devnull), db_path=os.path.join(tmp, 'bench.db'))
+            run('fixture only', assistant, FallbackRecognizer([fixtures], args.timeout), clips)
+            run('stalled -> fixture', assistant, FallbackRecognizer([StalledBackend(5.0), fixtures], args.timeout), clips)
+            assistant.storage.close()
+    os._exit(0)  # don't wait for the stalled backend threads to finish sleeping
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Reminder scheduler benchmark: heap operations at 100k pending, firing order, thread wakeups
+and reload time from SQLite.
+
+A fake clock drives run_pending() so firing is deterministic; a short real-clock run checks
+that the scheduler thread wakes roughly once per distinct due time instead of polling.
+
+Usage: python benchmarks/bench_reminders.py [--reminders 100000] [--cancel 0.5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import ManualClock, ReminderScheduler, Storage
+
+
+def heap_ops(count, cancel_fraction, rng):
+    clock = ManualClock()
+    fired = []
+    scheduler = ReminderScheduler(clock=clock, start=False, on_fire=fired.append)
+    offsets = [rng.uniform(0, 86400) for _ in range(count)]
+
+    start = time.perf_counter()
+    reminders = [scheduler.add_in(f"reminder {i}", offset) for i, offset in enumerate(offsets)]
+    add_s = time.perf_counter() - start
+
+    cancelled = rng.sample(reminders, int(count * cancel_fraction))
+    start = time.perf_counter()
+    for reminder in cancelled:
+        scheduler.cancel(reminder.id)
+    cancel_s = time.perf_counter() - start
+
+    # Walk the fake day forward a minute at a time
+    start = time.perf_counter()
+    for _ in range(24 * 60 + 1):
+        clock.advance(60)
+        scheduler.run_pending()
+    fire_s = time.perf_counter() - start
+
+    expected = count - len(cancelled)
+    assert len(fired) == expected, (len(fired), expected)
+    assert all(a.due_at <= b.due_at for a, b in zip(fired, fired[1:])), "fired out of order"
+    cancelled_ids = {reminder.id for reminder in cancelled}
+    assert not any(reminder.id in cancelled_ids for reminder in fired), "a cancelled reminder fired"
+
+    print(f"{count:,} reminders, {len(cancelled):,} cancelled")
+    print(f"  add      {add_s / count * 1e6:7.2f} us/op")
+    print(f"  cancel   {cancel_s / len(cancelled) * 1e6:7.2f} us/op")
+    print(f"  fire     {fire_s / expected * 1e6:7.2f} us/reminder ({expected:,} fired in due order)")
+
+
+def thread_wakeups(rng, count=200, span=1.0):
+    """Real clock: the thread should sleep between due times, not spin"""
+    fired = []
+    scheduler = ReminderScheduler(on_fire=lambda reminder: fired.append((reminder, time.time())))
+    for i in range(count):
+        scheduler.add_in(f"reminder {i}", rng.uniform(0, span))
+    time.sleep(span + 0.2)
+    scheduler.close()
+
+    lateness = sorted((fired_at - reminder.due_at) * 1000 for reminder, fired_at in fired)
+    print(f"thread: {len(fired)}/{count} fired over {span:.1f}s with {scheduler.stats['wakeups']} wakeups, "
+          f"lateness p50 {lateness[len(lateness) // 2]:.2f} ms, max {lateness[-1]:.2f} ms")
+
+
+def persistence(count, rng):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'reminders.db')
+        clock = ManualClock()
+        storage = Storage(path)
+        scheduler = ReminderScheduler(storage, clock=clock, start=False)
+        start = time.perf_counter()
+        for i in range(count):
+            scheduler.add_in(f"reminder {i}", rng.uniform(0, 86400))
+        storage.flush()
+        write_s = time.perf_counter() - start
+        commits = storage.stats['commits']
+        storage.close()
+
+        storage = Storage(path)
+        start = time.perf_counter()
+        reloaded = ReminderScheduler(storage, clock=clock, start=False)
+        load_s = time.perf_counter() - start
+        assert len(reloaded.pending) == count
+        storage.close()
+
+    print(f"sqlite: {count:,} persisted in {write_s:.2f}s ({commits} commits), "
+          f"reloaded in {load_s * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reminders', type=int, default=100000)
+    parser.add_argument('--cancel', type=float, default=0.5, help="fraction of reminders to cancel")
+    args = parser.parse_args()
+
+    rng = random.Random(12)
+    heap_ops(args.reminders, args.cancel, rng)
+    thread_wakeups(rng)
+    persistence(args.reminders, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Reporting rollups over a year of multi-user data: what the change-log triggers add to
+writes, folding the log into the rollups (the first backlog, then one day of new
+activity), report latency against aggregating the base tables directly, and export.
+
+Usage: python benchmarks/bench_reports.py [--users 100] [--days 365] [--db PATH]
+Without --db the generated data goes to a temporary database. Data is generated per
+user and day: a few expenses across categories, three meals, and new tasks, most of
+which are completed later by an UPDATE, as TaskStore.complete() does.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import CHANGE_SOURCES, Reports, Storage, percentile
+
+CATEGORIES = ('food', 'transport', 'entertainment', 'utilities', 'shopping', 'health')
+MEALS = ('breakfast', 'lunch', 'dinner')
+PRIORITIES = ('high', 'medium', 'low')
+
+
+def generate(storage, users, days, start, seed=22):
+    """Write `days` of activity for each user; returns rows written"""
+    rng = random.Random(seed)
+    written = 0
+    for n in range(users):
+        user = f"user{n:03d}"
+        expenses, meals, tasks = [], [], []
+        for offset in range(days):
+            date = (start + datetime.timedelta(days=offset)).isoformat()
+            for _ in range(rng.randint(0, 4)):
+                expenses.append((round(rng.lognormvariate(2.5, 0.8), 2), rng.choice(CATEGORIES), '', date, user))
+            for meal in MEALS:
+                meals.append((f"{meal} {rng.randint(1, 40)}", meal, rng.randint(250, 900), '', date, user))
+            for _ in range(rng.randint(0, 3)):
+                tasks.append(('task', rng.choice(PRIORITIES), None, f"{date} 09:00:00", user))
+        storage.write_many('INSERT INTO expenses (amount, category, description, date, user_id) VALUES (?, ?, ?, ?, ?)',
+                           expenses)
+        storage.write_many('INSERT INTO meals (meal_name, meal_type, calories, ingredients, date, user_id) '
+                           'VALUES (?, ?, ?, ?, ?, ?)', meals)
+        storage.write_many('INSERT INTO tasks (task, priority, due_date, created_at, user_id) VALUES (?, ?, ?, ?, ?)',
+                           tasks)
+        storage.flush()
+        done = [(task_id,) for (task_id,) in storage.query('SELECT id FROM tasks WHERE user_id = ? AND created_at >= ?',
+                                                           (user, start.isoformat()))
+                if rng.random() < 0.7]
+        storage.write_many('UPDATE tasks SET completed = 1 WHERE id = ?', done).result()
+        written += len(expenses) + len(meals) + len(tasks) + len(done)
+    return written
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def direct_reports(storage, user):
+    """The same three reports aggregated from the base tables"""
+    spending = storage.query('SELECT substr(date, 1, 7), category, SUM(amount) FROM expenses WHERE user_id = ? '
+                             'GROUP BY 1, 2', (user,))
+    completion = storage.query("SELECT date(created_at, 'localtime', 'weekday 0', '-6 days'), COUNT(*), SUM(completed) FROM tasks "
+                               "WHERE user_id = ? GROUP BY 1", (user,))
+    calories = storage.query("SELECT date(date, 'weekday 0', '-6 days'), SUM(calories), COUNT(DISTINCT date) FROM meals "
+                             "WHERE user_id = ? GROUP BY 1", (user,))
+    return spending, completion, calories
+
+
+def rollup_reports(reports, user):
+    return reports.spending(user, 'month'), reports.completion(user, 'week'), reports.calories(user, 'week')
+
+
+def latencies(fn, users):
+    samples = []
+    for user in users:
+        start = time.perf_counter()
+        fn(user)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--db', help="database to generate into (default: a temporary file)")
+    args = parser.parse_args()
+
+    start = datetime.date.today() - datetime.timedelta(days=args.days)
+    with tempfile.TemporaryDirectory() as tmp:
+        # The same data without the change-log triggers, for the write overhead
+        plain = Storage(os.path.join(tmp, 'plain.db'))
+        for table in CHANGE_SOURCES:
+            for event in ('insert', 'delete', 'update'):
+                plain.write(f'DROP TRIGGER {table}_log_{event}').result()
+        _, plain_s = timed(generate, plain, args.users, args.days, start)
+        plain.close()
+
+        storage = Storage(args.db or os.path.join(tmp, 'reports.db'))
+        reports = Reports(storage)
+        written, load_s = timed(generate, storage, args.users, args.days, start)
+        print(f"{args.users} users x {args.days} days: {written:,} row writes in {load_s:.1f} s "
+              f"({plain_s:.1f} s without the change log, +{load_s / plain_s - 1:.0%})")
+
+        changes, backlog_s = timed(reports.refresh)
+        rollup_rows = storage.query('SELECT COUNT(*) FROM rollups')[0][0]
+        print(f"first refresh: {changes:,} logged changes into {rollup_rows:,} rollup rows in {backlog_s:.2f} s "
+              f"({changes / backlog_s:,.0f} changes/s)")
+
+        # One more day for everyone, then an incremental refresh
+        generate(storage, args.users, 1, start + datetime.timedelta(days=args.days), seed=23)
+        changes, refresh_s = timed(reports.refresh)
+        _, idle_s = timed(reports.refresh)
+        print(f"next day: {changes:,} changes folded in {refresh_s * 1000:.1f} ms; refresh with nothing logged "
+              f"{idle_s * 1e6:.0f} us")
+
+        users = [f"user{n:03d}" for n in range(args.users)]
+        direct_reports(storage, users[0])  # warm the page cache for both
+        rollup_reports(reports, users[0])
+        direct = latencies(lambda user: direct_reports(storage, user), users)
+        rollup = latencies(lambda user: rollup_reports(reports, user), users)
+        summary = latencies(lambda user: reports.summary(user, 'month'), users)
+        print("a year of monthly spending + weekly completion + weekly calories, per user:")
+        for label, samples in (("from rollups", rollup), ("base tables", direct), ("summary()", summary)):
+            print(f"  {label:13} p50 {percentile(samples, 50) * 1000:6.2f} ms  p95 {percentile(samples, 95) * 1000:6.2f} ms  "
+                  f"mean {statistics.mean(samples) * 1000:6.2f} ms")
+
+        for format in ('csv', 'parquet', 'arrow'):
+            directory = os.path.join(tmp, f"export_{format}")
+            paths, export_s = timed(reports.export, directory, format)
+            size = sum(os.path.getsize(path) for path in paths)
+            written_as = os.path.splitext(paths[0])[1][1:]
+            note = "" if written_as == format else f" (pyarrow not installed: wrote {written_as})"
+            print(f"export {format:8} {export_s * 1000:7.0f} ms, {size / 1024:8.0f} KiB{note}")
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
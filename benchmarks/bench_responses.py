@@ -0,0 +1,110 @@
+"""Response building cost: every module handler called in a tight loop, reporting time per
+call and the bytes it allocates (tracemalloc peak above the starting point), plus what
+building each module costs a new session.
+
+Queries are picked to leave the database unchanged, so the loop measures response
+building rather than a growing task or expense table.
+
+Usage: python benchmarks/bench_responses.py [--calls 20000]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import StreamInput, StreamOutput, VoiceAssistant
+
+QUERIES = [
+    ('study', "tell me about photosynthesis"),
+    ('wellness', "give me a breathing exercise"),
+    ('wellness', "I need a positive affirmation"),
+    ('wellness', "help me with anxiety"),
+    ('productivity', "add a new task"),
+    ('productivity', "set a reminder"),
+    ('productivity', "help with my schedule"),
+    ('support', "I forgot my password"),
+    ('finance', "what's my budget"),
+    ('finance', "budget status"),
+    ('finance', "add expense"),
+    ('finance', "give me saving tips"),
+    ('meal', "suggest a healthy breakfast"),
+    ('meal', "nutrition advice"),
+    ('meal', "how many calories should I eat"),
+    ('tech', "my wifi keeps dropping"),
+    ('language', "spanish greetings"),
+    ('language', "how do I say thank you in french"),
+    ('language', "give me a language tip"),
+]
+
+
+def time_calls(handler, query, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        handler(query)
+    return (time.perf_counter() - start) / calls
+
+
+def allocated(fn, repeats=50):
+    """Mean tracemalloc peak above the starting point while fn runs"""
+    total = 0
+    for _ in range(repeats):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        total += tracemalloc.get_traced_memory()[1] - before
+    return total / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20_000)
+    args = parser.parse_args()
+
+    random.seed(19)
+    with tempfile.TemporaryDirectory() as tmp:
+        assistant = VoiceAssistant(StreamInput(io.StringIO()), StreamOutput(io.StringIO()),
+                                   db_path=os.path.join(tmp, 'responses.db'))
+        try:
+            modules = assistant.modules
+            handlers = {name: getattr(modules.get(name), modules.factories[name][1]) for name, _ in QUERIES}
+            for name, query in QUERIES:
+                handlers[name](query)  # warm up: data files, caches
+
+            rows = [(name, query, time_calls(handlers[name], query, args.calls)) for name, query in QUERIES]
+            tracemalloc.start()
+            rows = [(name, query, seconds, allocated(lambda: handlers[name](query))) for name, query, seconds in rows]
+            # What a new session pays per module, and keeps for as long as it is alive
+            builds = []
+            for name, (factory, _) in modules.factories.items():
+                kept = []
+                start = time.perf_counter()
+                for _ in range(200):
+                    kept.append(factory())
+                seconds = (time.perf_counter() - start) / 200
+                before = tracemalloc.get_traced_memory()[0]
+                kept.append(factory())
+                builds.append((name, seconds, tracemalloc.get_traced_memory()[0] - before))
+                del kept
+            tracemalloc.stop()
+        finally:
+            assistant.close()
+
+    print(f"{args.calls:,} calls per handler")
+    for name, query, seconds, size in rows:
+        print(f"  {name:12} {query:36} {seconds * 1e9:9,.0f} ns/op {size:9,.0f} B allocated")
+    total_ns = sum(seconds for *_, seconds, _ in rows) * 1e9
+    total_bytes = sum(size for *_, size in rows)
+    print(f"  {'all':12} {'':36} {total_ns:9,.0f} ns   {total_bytes:9,.0f} B")
+    print("module construction")
+    for name, seconds, size in builds:
+        print(f"  {name:12} {seconds * 1e6:9.1f} us {size:9,} B kept")
+
+
+if __name__ == '__main__':
+    main()
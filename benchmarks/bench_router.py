@@ -0,0 +1,82 @@
+"""Microbenchmark: IntentRouter vs the original any()-chain in process_command.
+
+Usage: python benchmarks/bench_router.py [--count 1000000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import VoiceAssistant
+
+LEGACY_CHAIN = [
+    ('study', ['math', 'science', 'history', 'study', 'homework']),
+    ('wellness', ['mindfulness', 'meditation', 'stress', 'wellness', 'relax']),
+    ('productivity', ['task', 'reminder', 'todo', 'schedule', 'productivity']),
+    ('support', ['support', 'help', 'problem', 'issue']),
+    ('finance', ['money', 'budget', 'expense', 'finance', 'spend']),
+    ('meal', ['meal', 'food', 'nutrition', 'recipe', 'diet']),
+    ('tech', ['tech', 'computer', 'wifi', 'troubleshoot', 'fix']),
+    ('language', ['language', 'translate', 'learn', 'practice']),
+]
+
+FILLER = ['please', 'can', 'you', 'tell', 'me', 'about', 'my', 'the', 'a', 'today', 'now', 'what', 'is',
+          'how', 'do', 'i', 'with', 'some', 'quick', 'again', 'for', 'this', 'week', 'really']
+
+
+def legacy_route(command):
+    """The routing chain process_command used before IntentRouter"""
+    for name, words in LEGACY_CHAIN:
+        if any(word in command for word in words):
+            return name
+    if 'stop' in command or 'quit' in command or 'exit' in command:
+        return 'stop'
+    return None
+
+
+def make_commands(count, seed):
+    rng = random.Random(seed)
+    keywords = [word for words, _ in VoiceAssistant.INTENT_KEYWORDS.values() for word in words]
+    keywords += VoiceAssistant.STOP_WORDS
+    commands = []
+    for _ in range(count):
+        words = rng.choices(FILLER, k=rng.randint(3, 10))
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        commands.append(' '.join(words))
+    return commands
+
+
+def time_it(label, fn, commands):
+    start = time.perf_counter()
+    for command in commands:
+        fn(command)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {elapsed:8.3f}s  {len(commands) / elapsed:12,.0f} cmd/s  "
+          f"{elapsed / len(commands) * 1e9:8.0f} ns/cmd")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    commands = make_commands(args.count, args.seed)
+    router = VoiceAssistant.build_router()
+
+    print(f"Routing {len(commands):,} synthetic commands")
+    legacy = time_it('legacy chain', legacy_route, commands)
+    new = time_it('IntentRouter', router.route, commands)
+    print(f"speedup        {legacy / new:8.2f}x")
+
+    changed = sum(1 for c in commands[:10000] if legacy_route(c) != getattr(router.route(c), 'name', None))
+    print(f"routing differs from legacy on {changed / min(len(commands), 10000):.1%} of sampled commands")
+
+
+if __name__ == '__main__':
+    main()
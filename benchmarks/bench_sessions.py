@@ -0,0 +1,144 @@
+"""Load generator for the session server (python Ai.py --serve): many users over many connections,
+reporting throughput, tail latency, session counts and server memory.
+
+Each connection owns a slice of the users and sends one request at a time, so every user's
+commands stay in order. Without --port or --unix-socket a server is started on a temporary
+database and stopped afterwards.
+
+Usage: python benchmarks/bench_sessions.py [--users 5000] [--connections 200] [--requests 50000]
+                                           [--max-sessions 2000] [--port PORT | --unix-socket PATH]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Ai import percentile
+
+COMMANDS = [
+    "list tasks",
+    "show high priority tasks",
+    "what tasks are due",
+    "tell me about the periodic table",
+    "I forgot my password",
+    "my wifi keeps dropping",
+    "give me a breathing exercise",
+    "budget status",
+    "show my expenses",
+    "suggest a healthy breakfast",
+    "how do I say hello in spanish",
+    "remind me to stretch in 30 minutes",
+    "list reminders",
+]
+
+
+async def open_connection(args):
+    if args.unix_socket:
+        return await asyncio.open_unix_connection(args.unix_socket)
+    return await asyncio.open_connection('127.0.0.1', args.port)
+
+
+async def request(reader, writer, message):
+    writer.write(json.dumps(message).encode('utf-8') + b'\n')
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def client(args, users, count, rng, latencies, failures):
+    reader, writer = await open_connection(args)
+    try:
+        for _ in range(count):
+            message = {'user': rng.choice(users), 'command': rng.choice(COMMANDS)}
+            start = time.perf_counter()
+            reply = await request(reader, writer, message)
+            latencies.append(time.perf_counter() - start)
+            if 'response' not in reply:
+                failures.append(reply)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    rng = random.Random(14)
+    users = [f"user-{i}" for i in range(args.users)]
+    per_connection = args.requests // args.connections
+    latencies, failures = [], []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, users[i::args.connections], per_connection, random.Random(rng.random()),
+                                  latencies, failures)
+                           for i in range(args.connections)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await open_connection(args)
+    stats = await request(reader, writer, {'stats': True})
+    writer.close()
+    return latencies, failures, elapsed, stats
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, tmp):
+    args.port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'Ai.py'), '--serve', '--port', str(args.port),
+                               '--db', os.path.join(tmp, 'sessions.db'), '--max-sessions', str(args.max_sessions)],
+                              cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()  # "Serving sessions on ..."
+    return server
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--max-sessions', type=int, default=2000, help="passed to a server started by this script")
+    parser.add_argument('--port', type=int, help="load an already running server")
+    parser.add_argument('--unix-socket', help="load an already running server on a Unix socket")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None if args.port or args.unix_socket else start_server(args, tmp)
+        try:
+            latencies, failures, elapsed, stats = asyncio.run(run(args))
+            memory = f", server RSS {rss_mb(server.pid):.0f} MB" if server and os.path.exists('/proc') else ""
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    latencies.sort()
+    print(f"{len(latencies):,} requests from {args.users:,} users over {args.connections} connections "
+          f"in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} req/s")
+    print(f"  latency p50 {percentile(latencies, 50) * 1000:.2f} ms, p99 {percentile(latencies, 99) * 1000:.2f} ms, "
+          f"p99.9 {percentile(latencies, 99.9) * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print(f"  sessions live {stats['sessions']:,}, created {stats['sessions_created']:,}, "
+          f"evicted {stats['evicted']:,}{memory}")
+    if failures:
+        print(f"  {len(failures)} failed requests, e.g. {failures[0]}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
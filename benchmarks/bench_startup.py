@@ -0,0 +1,82 @@
+"""Cold-start benchmark: fresh interpreter -> import Ai -> build the assistant -> first response.
+
+Each run is a separate subprocess so import caches never carry over; a warm-up run leaves
+Ai's bytecode cached, as an installed copy has it. The default commands are one that no
+module answers and one that builds the study module with its knowledge index, which is
+the most expensive to construct. Reports the median time to first response and which
+assistant modules and third-party packages got loaded. Exits 1 when a median exceeds
+--threshold-ms or a command builds more than the one module answering it, so it guards
+against startup regressions.
+
+Usage: python benchmarks/bench_startup.py [--runs 15] [--command "what's the weather" ...] [--threshold-ms 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS = ["what's the weather", "help me study algebra"]
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+from Ai import VoiceAssistant, StreamInput, StreamOutput
+imported = time.perf_counter()
+assistant = VoiceAssistant(StreamInput(), StreamOutput(), db_path=sys.argv[2])
+response = assistant.process_command(sys.argv[1])
+done = time.perf_counter()
+heavy = [name for name in ('speech_recognition', 'pyttsx3', 'requests', 'schedule') if name in sys.modules]
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_response_ms': (done - start) * 1000,
+                  'modules_loaded': assistant.modules.loaded(), 'heavy_imports': heavy}))
+assistant.storage.close()
+'''
+
+
+def run_once(command, db_path):
+    """Time one cold start; interpreter start-up itself is excluded"""
+    env = {name: value for name, value in os.environ.items() if name != 'PYTHONDONTWRITEBYTECODE'}
+    out = subprocess.run([sys.executable, '-c', PROBE, command, db_path], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--command', action='append', help="command to time (repeatable)")
+    parser.add_argument('--threshold-ms', type=float, default=200.0,
+                        help="fail (exit 1) when a median time to first response exceeds this")
+    args = parser.parse_args()
+
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'startup.db')
+        for command in args.command or COMMANDS:
+            run_once(command, db_path)  # create the schema and caches so every timed run finds them
+            results = [run_once(command, db_path) for _ in range(args.runs)]
+
+            import_ms = statistics.median(r['import_ms'] for r in results)
+            first_ms = statistics.median(r['first_response_ms'] for r in results)
+            last = results[-1]
+            print(f"command: {command!r} ({args.runs} cold starts)")
+            print(f"  import Ai:          {import_ms:7.1f} ms median")
+            print(f"  first response:     {first_ms:7.1f} ms median")
+            print(f"  modules loaded:     {len(last['modules_loaded'])}/8 {last['modules_loaded']}")
+            print(f"  heavy imports:      {last['heavy_imports'] or 'none'}")
+            if first_ms > args.threshold_ms:
+                regressions.append(f"{command!r}: {first_ms:.1f} ms > {args.threshold_ms:.1f} ms threshold")
+            if len(last['modules_loaded']) > 1:
+                regressions.append(f"{command!r}: built {len(last['modules_loaded'])} modules to answer one command")
+
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Concurrent write/read stress test: Storage vs one shared connection committing per write.
+
+Writer threads insert tasks one at a time (as handlers do); reader threads page
+through open tasks at the same time.
+
+Usage: python benchmarks/bench_storage.py [--writers 1,4,8] [--writes 2000] [--readers 2]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import Storage, TaskStore
+
+
+class SharedConnection:
+    """The old setup: one check_same_thread=False connection, default journal, a commit per write"""
+
+    def __init__(self, path):
+        Storage(path).close()  # create the schema
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=DELETE')  # undo the WAL switch Storage made
+        self.lock = threading.Lock()
+
+    def insert(self, task):
+        with self.lock:
+            self.conn.execute('INSERT INTO tasks (task, priority) VALUES (?, ?)', (task, 'medium'))
+            self.conn.commit()
+
+    def read_page(self):
+        with self.lock:
+            return self.conn.execute('SELECT id, task FROM tasks WHERE completed = 0 AND id > 0 ORDER BY id LIMIT 20').fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class StorageLayer:
+    def __init__(self, path):
+        self.storage = Storage(path)
+        self.store = TaskStore(self.storage)
+
+    def insert(self, task):
+        self.store.add(task)
+
+    def read_page(self):
+        return self.store.page(size=20)
+
+    def close(self):
+        print(f"    writer commits: {self.storage.stats['commits']:,} for {self.storage.stats['writes']:,} writes")
+        self.storage.close()
+
+
+def stress(backend, writers, writes_per_thread, readers):
+    done = threading.Event()
+    reads = [0] * readers
+
+    def write(n):
+        for i in range(writes_per_thread):
+            backend.insert(f"writer {n} task {i}")
+
+    def read(n):
+        while not done.is_set():
+            backend.read_page()
+            reads[n] += 1
+
+    reader_threads = [threading.Thread(target=read, args=(n,)) for n in range(readers)]
+    writer_threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    for thread in reader_threads:
+        thread.start()
+    start = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+    return writers * writes_per_thread / elapsed, sum(reads) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', default='1,4,8')
+    parser.add_argument('--writes', type=int, default=2000, help="writes per writer thread")
+    parser.add_argument('--readers', type=int, default=2)
+    args = parser.parse_args()
+
+    for writers in map(int, args.writers.split(',')):
+        for label, backend_type in (('shared connection', SharedConnection), ('Storage', StorageLayer)):
+            with tempfile.TemporaryDirectory() as tmp:
+                backend = backend_type(os.path.join(tmp, 'stress.db'))
+                writes_per_sec, reads_per_sec = stress(backend, writers, args.writes, args.readers)
+                print(f"{writers} writers  {label:<18} {writes_per_sec:10,.0f} writes/s  {reads_per_sec:10,.0f} reads/s")
+                backend.close()
+
+
+if __name__ == '__main__':
+    main()
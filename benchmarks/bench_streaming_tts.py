@@ -0,0 +1,114 @@
+"""Time to first audio: whole-response synthesis vs sentence-chunked streaming.
+
+Runs the longest responses the modules produce through CachedSpeechOutput and
+StreamingSpeechOutput with a cold cache, and shows per response how many chunks
+streaming cut it into and how soon each output started speaking. By default the engine and player are
+simulated (synthesis and playback cost proportional to text length) so the numbers
+are reproducible without audio hardware; --engine pyttsx3 uses the real engine.
+
+Usage: python benchmarks/bench_streaming_tts.py [--engine simulated|pyttsx3] [--synth-ms-per-char 0.4]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import CachedSpeechOutput, StreamingSpeechOutput, StreamInput, StreamOutput, VoiceAssistant, percentile
+
+
+class SimulatedEngine:
+    """pyttsx3-shaped engine whose synthesis time grows with text length"""
+
+    def __init__(self, ms_per_char):
+        self.ms_per_char = ms_per_char
+        self.pending = []
+
+    def getProperty(self, name):
+        return [SimpleNamespace(id='voice-0'), SimpleNamespace(id='voice-1')]
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, text):
+        self.pending.append((text, None))
+
+    def save_to_file(self, text, path):
+        self.pending.append((text, path))
+
+    def runAndWait(self):
+        for text, path in self.pending:
+            time.sleep(len(text) * self.ms_per_char / 1000)
+            if path:
+                with open(path, 'wb') as f:
+                    f.write(b'\0' * len(text) * 100)
+        self.pending.clear()
+
+
+class SimulatedPlayer:
+    """Playback takes 2 ms per character of text, ~30x faster than real speech to keep runs short"""
+    available = True
+
+    def play(self, path, data):
+        time.sleep(len(data) / 100 * 0.002)
+
+    def stop(self):
+        pass
+
+
+def longest_responses(count):
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        assistant = VoiceAssistant(StreamInput(io.StringIO()), StreamOutput(devnull), db_path=os.path.join(tmp, 'bench.db'))
+        for i in range(15):
+            assistant.productivity_assistant.add_task(f"Follow up on project item number {i}", 'high')
+        responses = assistant.static_phrases()
+        responses += [assistant.process_command('list tasks'), assistant.process_command('give me a meal plan')]
+        assistant.storage.close()
+    return sorted(set(responses), key=len, reverse=True)[:count]
+
+
+def measure(output_type, responses, args):
+    with tempfile.TemporaryDirectory() as cache_dir, open(os.devnull, 'w') as devnull:
+        kwargs = {'cache_dir': cache_dir}
+        if args.engine == 'simulated':
+            kwargs.update(tts_engine=SimulatedEngine(args.synth_ms_per_char), player=SimulatedPlayer())
+        output = output_type(**kwargs)
+        stdout, sys.stdout = sys.stdout, devnull
+        start = time.perf_counter()
+        try:
+            for text in responses:
+                output.say(text)
+        finally:
+            sys.stdout = stdout
+        total = time.perf_counter() - start
+        output.close()
+    return [seconds * 1000 for seconds in output.first_audio.recent], total, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', choices=['simulated', 'pyttsx3'], default='simulated')
+    parser.add_argument('--synth-ms-per-char', type=float, default=0.4)
+    parser.add_argument('--responses', type=int, default=8)
+    args = parser.parse_args()
+
+    responses = longest_responses(args.responses)
+    print(f"{len(responses)} responses, {min(map(len, responses))}-{max(map(len, responses))} chars")
+    first_audio = {}
+    for label, output_type in (('whole response', CachedSpeechOutput), ('streaming', StreamingSpeechOutput)):
+        first_audio[label], total, output = measure(output_type, responses, args)
+        samples = sorted(first_audio[label])
+        print(f"{label:<15} time to first audio p50 {percentile(samples, 50):8.1f} ms  max {samples[-1]:8.1f} ms  "
+              f"total {total:6.2f}s")
+
+    print(f"{'chars':>6} {'chunks':>6} {'whole ms':>9} {'streamed ms':>12}  response")
+    for text, whole, streamed in zip(responses, first_audio['whole response'], first_audio['streaming']):
+        print(f"{len(text):6} {len(output.split(text)):6} {whole:9.1f} {streamed:12.1f}  {text[:40]}...")
+
+
+if __name__ == '__main__':
+    main()
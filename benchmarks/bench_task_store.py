@@ -0,0 +1,60 @@
+"""TaskStore at scale: bulk insert, paged/filtered queries and bulk completion.
+
+Usage: python benchmarks/bench_task_store.py [--tasks 100000] [--db PATH]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import ProductivityAssistant, Storage, TaskStore
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<34} {elapsed * 1000:10.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=100_000)
+    parser.add_argument('--db', help="database file (default: a temporary file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(args.db or os.path.join(tmp, 'tasks.db'))
+        store = TaskStore(storage)
+        assistant = ProductivityAssistant(store)
+
+        rng = random.Random(5)
+        today = datetime.date.today()
+        rows = [(f"task {i}", rng.choice(['high', 'medium', 'low']),
+                 (today + datetime.timedelta(days=rng.randint(-30, 365))).isoformat() if rng.random() < 0.7 else None)
+                for i in range(args.tasks)]
+
+        timed(f"bulk insert {args.tasks:,}", lambda: store.add_many(rows))
+        ids = [row[0] for row in storage.query('SELECT id FROM tasks ORDER BY random() LIMIT ?', (args.tasks // 2,))]
+        timed(f"bulk complete {len(ids):,}", lambda: store.complete_many(ids))
+
+        timed("first page of open tasks", lambda: store.page(size=10), repeat=200)
+        last_id = storage.query('SELECT MAX(id) FROM tasks')[0][0]
+        timed("deep page of open tasks", lambda: store.page(after_id=last_id - 500, size=10), repeat=200)
+        timed("open high-priority page", lambda: store.page(size=10, priority='high'), repeat=200)
+        timed("due soon", lambda: store.due_soon(days=7), repeat=200)
+        timed("count open", lambda: store.count(), repeat=20)
+        timed("'list tasks' response", lambda: assistant.handle_task('list tasks'), repeat=200)
+        streamed = timed("stream every open task", lambda: sum(1 for _ in store.iter_tasks()))
+        print(f"streamed {streamed:,} open tasks")
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Tracing overhead: VoiceAssistant.run() with the tracer off and on, plus the cost of one span,
+the sampling profiler's cost while running, and a check that the export is well formed.
+
+The requirement is under 1% overhead on spoken turns. Those are replayed from WAV files
+through SpeechInput's real calibrate, capture (voice activity detection) and recognize
+stages, with a canned recognizer backend. The files are read faster than real time, so
+each turn is charged the length of the speech it captured on top of the measured
+processing: a spoken turn cannot end before the user has finished talking, and leaving
+out network recognition and playback only overstates the overhead. The benchmark fails
+if the tracer adds more than that 1%.
+
+Text turns take tens of microseconds, so they are also reported as the worst case.
+
+Usage: python benchmarks/bench_tracing.py [--turns 2000] [--clips 12] [--repeats 7]
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+from Ai import FallbackRecognizer, NoiseCalibrator, SpeechInput, StreamInput, StreamOutput, Tracer, VoiceAssistant, tracer
+from bench_noise_calibration import synthetic_corpus
+
+COMMANDS = [
+    "list tasks",
+    "show high priority tasks",
+    "tell me about the periodic table",
+    "I forgot my password",
+    "my wifi keeps dropping",
+    "give me a breathing exercise",
+    "budget status",
+    "suggest a healthy breakfast",
+    "how do I say hello in spanish",
+    "what's the weather",
+]
+MAX_OVERHEAD = 0.01
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? [0-9.e+-]+$')
+
+
+class CannedBackend:
+    """Recognizer backend answering with the next command, as a fixture would"""
+    name = 'canned'
+
+    def __init__(self):
+        self.commands = itertools.cycle(COMMANDS)
+
+    def recognize(self, audio):
+        return next(self.commands)
+
+
+class ReplayInput(SpeechInput):
+    """SpeechInput reading each utterance from a WAV file instead of the microphone"""
+    def __init__(self, paths, backend):
+        self.recognizer = sr.Recognizer()
+        self.calibrator = NoiseCalibrator(self.recognizer)
+        self.backend = backend
+        self.vad_silence = 0.35
+        self.wake = None
+        self.source = None
+        self.paths = iter(paths)
+        self.spoken = 0.0  # seconds of speech captured
+
+    def listen(self):
+        path = next(self.paths, None)
+        if path is None:
+            return None
+        with sr.AudioFile(path) as self.source:
+            audio = self.capture()
+        self.source = None
+        self.spoken += len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        return self.recognize(audio)
+
+
+def run_turns(assistant, script):
+    assistant.input = StreamInput(io.StringIO(script))
+    assistant.output = StreamOutput(io.StringIO())
+    start = time.perf_counter()
+    assistant.run()
+    return time.perf_counter() - start
+
+
+def run_spoken(assistant, paths, backend):
+    """Seconds spent replaying the clips as spoken turns, and seconds of speech in them"""
+    assistant.input = ReplayInput(paths, backend)
+    assistant.output = StreamOutput(io.StringIO())
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        assistant.run()
+        elapsed = time.perf_counter() - start
+    return elapsed, assistant.input.spoken
+
+
+def compare(measure, repeats):
+    """Median of measure() with the tracer off, on, and on with the profiler running"""
+    timings = {False: [], True: [], 'profiled': []}
+    for _ in range(repeats):
+        # Interleave the modes so drift hits all of them alike
+        for mode in (False, True, 'profiled'):
+            tracer.enabled = bool(mode)
+            if mode == 'profiled':
+                tracer.profiler.start()
+            timings[mode].append(measure())
+            if mode == 'profiled':
+                tracer.profiler.stop()
+    tracer.enabled = False
+    return [statistics.median(timings[mode]) for mode in (False, True, 'profiled')]
+
+
+def span_cost(enabled, n=200_000):
+    local = Tracer(enabled=enabled)
+    start = time.perf_counter()
+    for _ in range(n):
+        with local.stage('route'):
+            pass
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=2000)
+    parser.add_argument('--clips', type=int, default=12, help="spoken turns replayed from WAV files per run")
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+
+    script = ''.join(f"{COMMANDS[i % len(COMMANDS)]}\n" for i in range(args.turns))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = synthetic_corpus(tmp, args.clips)
+        backend = FallbackRecognizer([CannedBackend()])
+        assistant = VoiceAssistant(StreamInput(io.StringIO()), StreamOutput(io.StringIO()),
+                                   db_path=os.path.join(tmp, 'tracing.db'))
+        try:
+            run_turns(assistant, script)  # warm up: build every module
+            spoken = run_spoken(assistant, paths, backend)[1] / args.clips
+            spoken_off, spoken_on, spoken_profiled = compare(lambda: run_spoken(assistant, paths, backend)[0],
+                                                             args.repeats)
+            off, on, profiled = compare(lambda: run_turns(assistant, script), args.repeats)
+        finally:
+            assistant.close()
+
+    turn = spoken + spoken_off / args.clips
+    spoken_added = (spoken_on - spoken_off) / args.clips  # can come out negative: the span cost is within the noise
+    overhead = spoken_added / turn
+    print(f"{args.clips} spoken turns replayed from WAV, median of {args.repeats} runs")
+    print(f"  tracer off        {spoken_off / args.clips * 1e3:8.2f} ms/turn processing + {spoken:.2f} s of speech")
+    print(f"  tracer on         {spoken_on / args.clips * 1e3:8.2f} ms/turn processing")
+    print(f"  on + profiler     {spoken_profiled / args.clips * 1e3:8.2f} ms/turn processing")
+    print(f"  added per turn    {spoken_added * 1e6:+8.1f} us, overhead {overhead:+.4%} of a spoken turn "
+          f"(limit {MAX_OVERHEAD:.0%})")
+
+    added = (on - off) / args.turns
+    print(f"{args.turns:,} text turns, median of {args.repeats} runs")
+    print(f"  tracer off        {off / args.turns * 1e6:8.1f} us/turn")
+    print(f"  tracer on         {on / args.turns * 1e6:8.1f} us/turn  overhead {(on - off) / off:+.2%}")
+    print(f"  on + profiler     {profiled / args.turns * 1e6:8.1f} us/turn  overhead {(profiled - off) / off:+.2%} "
+          f"({tracer.profiler.samples} samples, {len(tracer.profiler.stacks)} distinct stacks)")
+    print(f"  one span          {span_cost(False) * 1e9:8.0f} ns off, {span_cost(True) * 1e9:.0f} ns on")
+    print(f"  added per turn    {added * 1e6:8.1f} us")
+
+    exported = tracer.export()
+    samples = [line for line in exported.splitlines() if not line.startswith('#')]
+    malformed = [line for line in samples if not SAMPLE.match(line)]
+    print(f"  export            {len(exported):,} bytes, {len(samples)} samples, "
+          f"{len(tracer.traces)} turn traces kept")
+    if malformed:
+        print(f"  malformed export lines, e.g. {malformed[0]!r}")
+        sys.exit(1)
+    if overhead >= MAX_OVERHEAD:
+        print(f"FAIL: tracing adds {overhead:.2%} to a spoken turn")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
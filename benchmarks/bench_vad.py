@@ -0,0 +1,176 @@
+"""Voice activity detection vs recognizer.listen() endpointing, replayed from WAV fixtures.
+
+Each fixture is one utterance with labelled speech boundaries. Both paths calibrate on
+the first second, then capture one phrase from the rest of the file. Reported per
+path: bytes handed to the recognizer, how far past the end of speech the capture
+returned (end-of-utterance latency, in audio time, which is wall time on a live
+microphone), and any speech cut off. Noise-only fixtures should time out.
+
+Usage: python benchmarks/bench_vad.py [--fixtures DIR] [--count 60]
+A fixture directory holds *.wav files and labels.json mapping file name -> [start, end]
+seconds of speech (null for noise-only files). Without --fixtures a synthetic corpus is
+generated: voiced syllables with fricative onsets, short pauses between words, clicks in
+the lead-in, and background noise from quiet room to loud fan.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+from Ai import NoiseCalibrator, VoiceActivityDetector, percentile
+
+SAMPLE_RATE = 16000
+CALIBRATION_SECONDS = 1.0  # NoiseCalibrator default
+END_SILENCE = 0.35
+
+
+def syllable(rng, seconds):
+    """A voiced syllable: harmonics of a drifting pitch under a smooth envelope"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(1, 3) * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    return voiced * np.sin(np.pi * t / seconds) ** 0.5 * rng.uniform(2500, 6000)
+
+
+def fricative(rng, seconds, level):
+    """Hiss for "s"/"f": high-passed noise, much quieter than voiced speech"""
+    hiss = np.diff(rng.normal(0, 1, int(seconds * SAMPLE_RATE) + 1))
+    return hiss * level
+
+
+def write_wav(path, samples):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(np.clip(samples, -32768, 32767).astype('<i2').tobytes())
+
+
+def synthetic_corpus(directory, count, seed=20):
+    rng = np.random.default_rng(seed)
+    labels = {}
+    for n in range(count):
+        noise = rng.choice([60, 150, 300, 600])
+        lead = rng.uniform(1.3, 2.5)
+        parts, speech = [], n % 10 != 9  # every tenth fixture is only noise
+        if speech:
+            for word in range(rng.integers(2, 7)):
+                if word:
+                    parts.append(np.zeros(int(rng.uniform(0.04, 0.25) * SAMPLE_RATE)))  # pause between words
+                if rng.random() < 0.4:
+                    parts.append(fricative(rng, rng.uniform(0.06, 0.14), noise * 2.5 + 300))
+                for _ in range(rng.integers(1, 3)):
+                    parts.append(syllable(rng, rng.uniform(0.12, 0.3)))
+        body = np.concatenate(parts) if parts else np.zeros(0)
+        tail = 3.0
+        total = int((lead + tail) * SAMPLE_RATE) + len(body)
+        samples = rng.normal(0, noise, total)
+        start = int(lead * SAMPLE_RATE)
+        samples[start:start + len(body)] += body
+        for _ in range(rng.integers(0, 3)):  # clicks and taps before speech
+            at = int(rng.uniform(CALIBRATION_SECONDS + 0.05, lead - 0.1) * SAMPLE_RATE)
+            click = rng.normal(0, 8000, int(0.015 * SAMPLE_RATE)) * np.exp(-np.arange(int(0.015 * SAMPLE_RATE)) / 60)
+            samples[at:at + len(click)] += click
+        name = f"utterance_{n:03d}.wav"
+        write_wav(os.path.join(directory, name), samples)
+        labels[name] = [start / SAMPLE_RATE, (start + len(body)) / SAMPLE_RATE] if speech else None
+    with open(os.path.join(directory, 'labels.json'), 'w') as f:
+        json.dump(labels, f)
+
+
+def capture_listen(recognizer, source):
+    return recognizer.listen(source, timeout=5)
+
+
+def capture_vad(recognizer, source, calibrator):
+    detector = VoiceActivityDetector(source.SAMPLE_RATE, source.SAMPLE_WIDTH, calibrator.ambient, end_silence=END_SILENCE)
+    return detector.capture(source, timeout=5)
+
+
+def replay(directory, labels, mode):
+    results = {'bytes': 0, 'speech_bytes': 0, 'latency': [], 'clipped': [], 'timeouts': 0, 'false_starts': 0,
+               'cpu': 0.0, 'audio_seconds': 0.0}
+    for name, label in sorted(labels.items()):
+        path = os.path.join(directory, name)
+        with wave.open(path) as wav:
+            raw = wav.readframes(wav.getnframes())
+        recognizer = sr.Recognizer()
+        calibrator = NoiseCalibrator(recognizer, duration=CALIBRATION_SECONDS)
+        with sr.AudioFile(path) as source:
+            calibrator.calibrate(source)
+            start = time.process_time()
+            try:
+                if mode == 'listen':
+                    audio = capture_listen(recognizer, source)
+                else:
+                    audio = capture_vad(recognizer, source, calibrator)
+            except sr.WaitTimeoutError:
+                audio = None
+            results['cpu'] += time.process_time() - start
+            returned_at = source.audio_reader.tell() / SAMPLE_RATE
+        results['audio_seconds'] += returned_at - CALIBRATION_SECONDS
+        if audio is None or not audio.frame_data:
+            results['timeouts'] += 1
+            continue
+        if label is None:
+            results['false_starts'] += 1
+            results['bytes'] += len(audio.frame_data)
+            continue
+        offset = raw.find(audio.frame_data)
+        kept = (offset / 2 / SAMPLE_RATE, (offset + len(audio.frame_data)) / 2 / SAMPLE_RATE)
+        speech_start, speech_end = label
+        results['bytes'] += len(audio.frame_data)
+        results['speech_bytes'] += int((speech_end - speech_start) * SAMPLE_RATE) * 2
+        results['latency'].append(returned_at - speech_end)
+        results['clipped'].append(max(0.0, kept[0] - speech_start) + max(0.0, speech_end - kept[1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help="directory of WAV fixtures with labels.json")
+    parser.add_argument('--count', type=int, default=60, help="synthetic fixtures to generate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.fixtures
+        if directory is None:
+            directory = tmp
+            synthetic_corpus(directory, args.count)
+        with open(os.path.join(directory, 'labels.json')) as f:
+            labels = json.load(f)
+        runs = {mode: replay(directory, labels, mode) for mode in ('listen', 'vad')}
+
+    spoken = sum(1 for label in labels.values() if label)
+    print(f"{len(labels)} fixtures, {spoken} with speech, {len(labels) - spoken} noise only")
+    for mode, label in (('listen', "recognizer.listen()"), ('vad', f"VAD, {END_SILENCE:.2f} s end silence")):
+        r = runs[mode]
+        latency = sorted(r['latency'])
+        clipped = [c for c in r['clipped'] if c > 0.02]
+        print(f"  {label}")
+        print(f"    sent to recognizer    {r['bytes'] / 1024:8.0f} KiB, {r['bytes'] / max(r['speech_bytes'], 1):.2f}x "
+              f"the speech itself")
+        print(f"    end-of-speech latency p50 {percentile(latency, 50) * 1000:4.0f} ms, "
+              f"p95 {percentile(latency, 95) * 1000:4.0f} ms, mean {statistics.mean(latency) * 1000:4.0f} ms")
+        print(f"    speech clipped        {len(clipped)} of {len(r['clipped'])} utterances "
+              f"(max {max(r['clipped'], default=0) * 1000:.0f} ms)")
+        print(f"    noise-only captures   {r['timeouts']} timed out, {r['false_starts']} triggered")
+        print(f"    CPU                   {r['cpu'] / r['audio_seconds'] * 100:.2f}% of real time")
+    saved = 1 - runs['vad']['bytes'] / runs['listen']['bytes']
+    faster = statistics.mean(runs['listen']['latency']) - statistics.mean(runs['vad']['latency'])
+    print(f"VAD sends {saved:.0%} fewer bytes and ends utterances {faster * 1000:.0f} ms sooner on average")
+
+
+if __name__ == '__main__':
+    main()
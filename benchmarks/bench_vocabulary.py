@@ -0,0 +1,131 @@
+"""Vocabulary store and spaced-repetition scheduler at full dictionary size: load time,
+exact and prefix lookups in both directions, next-card selection and reviews against
+a linear scan, LanguageBuddy quizzes for a learner two thirds of the way through the
+word list, and reloading the review state from SQLite.
+
+Usage: python benchmarks/bench_vocabulary.py [--words 150000] [--ops 100000] [--quizzes 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import DialogueFrame, LanguageBuddy, ManualClock, ReviewScheduler, Storage, Vocabulary
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyzáéíóúñ'
+
+
+def synthetic_word_list(vocab_dir, language, count, rng):
+    """Distinct english words mapped to random foreign words, some sharing a translation"""
+    english = list(dict.fromkeys(''.join(rng.choices(LETTERS[:26], k=rng.randint(4, 10))) for _ in range(count * 2)))
+    with open(os.path.join(vocab_dir, f"{language}.tsv"), 'w', encoding='utf-8') as f:
+        f.write(f"english\t{language}\tcategory\n")
+        for word in english[:count]:
+            foreign = ''.join(rng.choices(LETTERS, k=rng.randint(4, 10)))
+            f.write(f"{word}\t{foreign}\twords\n")
+
+
+def per_op(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, default=150_000)
+    parser.add_argument('--ops', type=int, default=100_000)
+    parser.add_argument('--quizzes', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(18)
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic_word_list(tmp, 'synthetic', args.words, rng)
+        start = time.perf_counter()
+        vocabulary = Vocabulary.load('synthetic', tmp)
+        load_s = time.perf_counter() - start
+        Vocabulary.loaded.clear()
+        tracemalloc.start()  # a second load, since tracing allocations slows it down
+        vocabulary = Vocabulary.load('synthetic', tmp)
+        memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+
+        english = [rng.choice(vocabulary.order)[0] for _ in range(args.ops)]
+        foreign = [rng.choice(vocabulary.order)[1] for _ in range(args.ops)]
+        prefixes = [word[:3] for word in english]
+        print(f"{len(vocabulary):,} words loaded in {load_s * 1000:.0f} ms, {memory_mb:.0f} MB")
+        print(f"  english -> foreign  {per_op(vocabulary.translate, english) * 1e6:7.2f} us")
+        print(f"  foreign -> english  {per_op(vocabulary.reverse, foreign) * 1e6:7.2f} us")
+        print(f"  prefix, 5 matches   {per_op(lambda p: vocabulary.complete(vocabulary.english_keys, p), prefixes) * 1e6:7.2f} us")
+        scan = per_op(lambda word: [e for e, f in vocabulary.order if f == word], foreign[:20])
+        print(f"  reverse by scanning {scan * 1e6:7.0f} us (the nested-dict walk this replaces)")
+
+        # Every word becomes a card; review whatever is due while the clock moves on
+        clock = ManualClock()
+        scheduler = ReviewScheduler(clock=clock)
+        start = time.perf_counter()
+        scheduler.enroll('synthetic', vocabulary.order)
+        enroll_s = time.perf_counter() - start
+        qualities = [rng.choice((1, 3, 4, 4, 5, 5)) for _ in range(args.ops)]
+        start = time.perf_counter()
+        reviewed = 0
+        for quality in qualities:
+            card = scheduler.next_due('synthetic')
+            if card is None:
+                clock.now = scheduler.peek('synthetic').due_at
+                card = scheduler.next_due('synthetic')
+            scheduler.review(card, quality)
+            reviewed += 1
+            clock.now += 1
+        review_s = time.perf_counter() - start
+        cards = list(scheduler.cards.values())
+        scan = per_op(lambda _: min(cards, key=lambda card: card.due_at), range(20))
+        print(f"scheduler: {len(scheduler.cards):,} cards enrolled in {enroll_s * 1000:.0f} ms")
+        print(f"  next due + review   {review_s / reviewed * 1e6:7.2f} us ({reviewed:,} reviews, "
+              f"heap {len(scheduler.heaps['synthetic']):,} entries)")
+        print(f"  next due by scan    {scan * 1e6:7.0f} us")
+
+        # Nothing is due, so quizzes keep introducing new words from the cursor into the list
+        reviews = ReviewScheduler(clock=clock)
+        buddy = LanguageBuddy(reviews)
+        buddy.vocabularies['synthetic'] = vocabulary
+        learned = len(vocabulary) * 2 // 3
+        for card in reviews.introduce('synthetic', vocabulary.order, learned):
+            reviews.review(card, 5)
+        questions = 0
+        start = time.perf_counter()
+        for _ in range(args.quizzes):
+            result = buddy.quiz('synthetic')
+            while isinstance(result, DialogueFrame):
+                questions += 1
+                result = result.step("no idea")
+        quiz_s = time.perf_counter() - start
+        known = reviews.known['synthetic']
+        scan = per_op(lambda _: [pair for pair in vocabulary.order if pair[0] not in known][:LanguageBuddy.NEW_CARDS],
+                      range(5))
+        print(f"quiz: {learned:,} words learned, none due")
+        print(f"  question + answer   {quiz_s / questions * 1e6:7.2f} us ({questions:,} questions, "
+              f"{len(reviews.cards) - learned:,} new words introduced)")
+        print(f"  new words by scan   {scan * 1e6:7.0f} us (the word list walk the cursor replaces)")
+
+        storage = Storage(os.path.join(tmp, 'cards.db'))
+        start = time.perf_counter()
+        ReviewScheduler(storage, clock=clock).enroll('synthetic', vocabulary.order)
+        persist_s = time.perf_counter() - start
+        start = time.perf_counter()
+        reloaded = ReviewScheduler(storage, clock=clock)
+        reload_s = time.perf_counter() - start
+        assert len(reloaded.cards) == len(vocabulary.to_foreign)
+        storage.close()
+        print(f"sqlite: {len(reloaded.cards):,} cards written in {persist_s * 1000:.0f} ms, "
+              f"reloaded in {reload_s * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
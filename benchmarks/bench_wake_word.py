@@ -0,0 +1,261 @@
+"""Wake word gating: false accepts and rejects on fixture recordings, CPU per hour of ambient
+audio at each effort tier and under a CPU budget, and how much of the command after the
+wake word survives as pre-roll.
+
+Usage: python benchmarks/bench_wake_word.py [--fixtures DIR] [--hours 1.0] [--positives 120]
+A fixture directory holds templates/*.wav (enrolled recordings of the wake word),
+positive/*.wav (wake word followed by a command) with labels.json mapping each positive
+file to {"command_start": seconds, "enrolled_voice": whether the speaker recorded the
+templates}, and negative/*.wav (ambient audio: room noise and
+chatter without the wake word). Without --fixtures a synthetic corpus is generated: words
+are formant-synthesized from a small phone set, spoken by varied voices (pitch, vocal
+tract length, speaking rate) over background noise; the chatter includes near misses that
+share half of the wake word.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+from Ai import VoiceActivityDetector, WakeWordDetector
+
+SAMPLE_RATE = 16000
+# Vowels by (F1, F2, F3) in Hz; consonants by kind
+VOWELS = {'a': (730, 1090, 2440), 'i': (270, 2290, 3010), 'u': (300, 870, 2240), 'e': (530, 1840, 2480),
+          'o': (570, 840, 2410), 'ae': (660, 1720, 2410), 'er': (490, 1350, 1690)}
+FRICATIVES = {'s': (4000, 7500), 'sh': (2000, 4500), 'f': (1500, 7000), 'h': (500, 3500)}
+NASALS = {'m': (250, 1000, 2200), 'n': (250, 1400, 2500)}
+STOPS = ('k', 'p', 't')
+WAKE_WORD = ['h', 'e', 'i', 'k', 'o', 'm', 'p', 'u', 't', 'er']  # "hey computer"
+NEAR_MISSES = [['h', 'e', 'i', 's', 'a'], ['k', 'o', 'm', 'p', 'a', 's'], ['p', 'u', 't', 'er'],
+               ['h', 'e', 'i', 'k', 'o', 'n']]
+PHONES = list(VOWELS) + list(FRICATIVES) + list(NASALS) + list(STOPS)
+
+
+class Voice:
+    def __init__(self, rng):
+        self.pitch = rng.uniform(90, 240)
+        self.tract = rng.uniform(0.9, 1.15)  # formant scale: shorter vocal tracts resonate higher
+        self.rate = rng.uniform(0.8, 1.25)
+        self.level = rng.uniform(1500, 4000)
+
+
+def voiced(rng, voice, seconds, formants, weight=1.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = voice.pitch * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    signal = np.zeros_like(t)
+    for k in range(1, int(4000 / voice.pitch)):
+        frequency = k * voice.pitch
+        gain = sum(1 / (1 + ((frequency - f * voice.tract) / 80) ** 2) for f in formants) / k ** 0.3
+        signal += gain * np.sin(k * phase)
+    envelope = np.minimum(1, np.minimum(t, t[::-1]) / 0.015)
+    return signal / signal.std() * envelope * voice.level * weight
+
+
+def noise_band(rng, seconds, low, high, level):
+    n = int(seconds * SAMPLE_RATE)
+    spectrum = np.fft.rfft(rng.normal(0, 1, n))
+    freqs = np.fft.rfftfreq(n, 1 / SAMPLE_RATE)
+    spectrum[(freqs < low) | (freqs > high)] = 0
+    signal = np.fft.irfft(spectrum, n)
+    return signal / (signal.std() + 1e-9) * level
+
+
+def word(rng, voice, phones):
+    parts = []
+    for phone in phones:
+        seconds = {True: 0.11, False: 0.07}[phone in VOWELS] * voice.rate * rng.uniform(0.85, 1.15)
+        if phone in VOWELS:
+            parts.append(voiced(rng, voice, seconds, VOWELS[phone]))
+        elif phone in NASALS:
+            parts.append(voiced(rng, voice, seconds, NASALS[phone], weight=0.35))
+        elif phone in FRICATIVES:
+            parts.append(noise_band(rng, seconds, *FRICATIVES[phone], level=voice.level * 0.15))
+        else:  # stop: closure, then a short burst
+            parts.append(np.zeros(int(0.04 * SAMPLE_RATE)))
+            parts.append(noise_band(rng, 0.02, 1000, 6000, level=voice.level * 0.3))
+    return np.concatenate(parts)
+
+
+def random_word(rng):
+    if rng.random() < 0.15:
+        return NEAR_MISSES[rng.integers(len(NEAR_MISSES))]
+    phones = []
+    for _ in range(rng.integers(2, 4)):  # syllables: consonant + vowel (+ consonant)
+        phones.append(PHONES[rng.integers(len(VOWELS), len(PHONES))])
+        phones.append(list(VOWELS)[rng.integers(len(VOWELS))])
+        if rng.random() < 0.4:
+            phones.append(PHONES[rng.integers(len(VOWELS), len(PHONES))])
+    return phones
+
+
+def write_wav(path, samples):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(np.clip(samples, -32768, 32767).astype('<i2').tobytes())
+
+
+def pause(rng, low, high):
+    return np.zeros(int(rng.uniform(low, high) * SAMPLE_RATE))
+
+
+def synthetic_corpus(directory, positives, hours, seed=21):
+    rng = np.random.default_rng(seed)
+    for name in ('templates', 'positive', 'negative'):
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+    owner = Voice(rng)
+    for n in range(3):  # the owner enrolls by saying the wake word three times
+        clip = np.concatenate([pause(rng, 0.3, 0.5), word(rng, owner, WAKE_WORD), pause(rng, 0.3, 0.5)])
+        write_wav(os.path.join(directory, 'templates', f"wake_{n}.wav"), clip + rng.normal(0, 60, len(clip)))
+
+    labels = {}
+    for n in range(positives):
+        # Mostly the owner; a third of the time someone else in the household
+        voice = owner if n % 3 else Voice(rng)
+        noise = rng.choice([60, 150, 300])
+        parts = [pause(rng, 0.5, 1.5), word(rng, voice, WAKE_WORD),
+                 pause(rng, 0.0, 0.02) if n % 2 else pause(rng, 0.2, 0.6)]  # in one breath, or after a beat
+        command_start = sum(map(len, parts)) / SAMPLE_RATE
+        for _ in range(rng.integers(2, 5)):
+            parts += [word(rng, voice, random_word(rng)), pause(rng, 0.05, 0.2)]
+        parts.append(pause(rng, 1.0, 1.5))
+        clip = np.concatenate(parts)
+        name = f"positive_{n:03d}.wav"
+        write_wav(os.path.join(directory, 'positive', name), clip + rng.normal(0, noise, len(clip)))
+        labels[name] = {'command_start': command_start, 'enrolled_voice': voice is owner}
+    with open(os.path.join(directory, 'labels.json'), 'w') as f:
+        json.dump(labels, f)
+
+    # Ambient audio in ten-minute files: room noise, with people talking about a third of the time
+    voices = [Voice(rng) for _ in range(6)] + [owner]
+    for n in range(max(1, round(hours * 6))):
+        total = int(min(600, hours * 3600) * SAMPLE_RATE)
+        clip = rng.normal(0, rng.choice([60, 150, 300]), total)
+        at = int(rng.uniform(0, 5) * SAMPLE_RATE)
+        while at < total:
+            voice = voices[rng.integers(len(voices))]
+            for _ in range(rng.integers(3, 12)):  # one stretch of conversation
+                spoken = word(rng, voice, random_word(rng))[:max(0, total - at)]
+                clip[at:at + len(spoken)] += spoken
+                at += len(spoken) + int(rng.uniform(0.05, 0.3) * SAMPLE_RATE)
+            at += int(rng.uniform(2, 25) * SAMPLE_RATE)
+        write_wav(os.path.join(directory, 'negative', f"ambient_{n:02d}.wav"), clip)
+
+
+def stream_file(detector, path, stop_at_detection):
+    """Feed a WAV file through detector.listen(); returns (detections, seconds of audio, positions)"""
+    detections, positions = 0, []
+    with sr.AudioFile(path) as source:
+        while True:
+            after = detector.listen(source, timeout=None)
+            if after is None:
+                break
+            detections += 1
+            positions.append(source.audio_reader.tell() / SAMPLE_RATE - len(after) / 2 / SAMPLE_RATE)
+            if stop_at_detection:
+                break
+        seconds = source.audio_reader.getnframes() / SAMPLE_RATE
+    return detections, seconds, positions
+
+
+def legacy_recognizer_calls(path):
+    """Utterances the old loop would send to the recognizer: every VAD-detected segment"""
+    calls = 0
+    with sr.AudioFile(path) as source:
+        floor = None
+        while True:
+            detector = VoiceActivityDetector(SAMPLE_RATE, 2, floor)
+            try:
+                detector.capture(source, timeout=None)
+            except sr.WaitTimeoutError:
+                break
+            floor = detector.floor
+            calls += 1
+    return calls
+
+
+def evaluate(templates, negatives, positives, labels, tier=0, **options):
+    """Replay ambient audio then every positive clip through one detector"""
+    detector = WakeWordDetector(templates, **options)
+    detector.tier = tier
+    result = {'accepted': 0, 'audio': 0.0, 'cpu': 0.0, 'rejected': {True: 0, False: 0}, 'lost': []}
+    for path in negatives:
+        before = detector.stats['cpu_seconds']
+        found, seconds, _ = stream_file(detector, path, stop_at_detection=False)
+        result['cpu'] += detector.stats['cpu_seconds'] - before
+        result['accepted'] += found
+        result['audio'] += seconds
+    result['tier'] = detector.tier
+    for path in positives:
+        detector = WakeWordDetector(templates, **options)  # each clip is its own recording, in its own room
+        detector.tier = result['tier']
+        found, _, positions = stream_file(detector, path, stop_at_detection=True)
+        label = labels[os.path.basename(path)]
+        if found:
+            result['lost'].append(max(0.0, positions[0] - label['command_start']))
+        else:
+            result['rejected'][label['enrolled_voice']] += 1
+    result['hours'] = result['audio'] / 3600
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help="fixture directory (templates/, positive/, negative/, labels.json)")
+    parser.add_argument('--hours', type=float, default=1.0, help="hours of synthetic ambient audio")
+    parser.add_argument('--positives', type=int, default=120, help="synthetic wake word utterances")
+    parser.add_argument('--budget', type=float, default=0.005, help="CPU budget (fraction of a core) for the budget run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.fixtures
+        if directory is None:
+            directory = tmp
+            start = time.perf_counter()
+            synthetic_corpus(directory, args.positives, args.hours)
+            print(f"generated corpus in {time.perf_counter() - start:.0f} s")
+        templates = WakeWordDetector.load_templates(os.path.join(directory, 'templates'))
+        with open(os.path.join(directory, 'labels.json')) as f:
+            labels = json.load(f)
+        positives = sorted(os.path.join(directory, 'positive', name) for name in labels)
+        negatives = sorted(os.path.join(directory, 'negative', name) for name in os.listdir(os.path.join(directory, 'negative')))
+
+        runs = [(f"tier {tier}", {'tier': tier}) for tier in range(len(WakeWordDetector.TIERS))]
+        runs.append((f"budget {args.budget:.1%}", {'cpu_budget': args.budget}))
+        runs += [(f"margin {margin}", {'margin': margin}) for margin in (1.25, 1.75, 2.0)]
+        results = {}
+        voices = {enrolled: sum(1 for label in labels.values() if label['enrolled_voice'] == enrolled)
+                  for enrolled in (True, False)}
+        print(f"{len(templates)} enrolled recordings; {len(positives)} positive clips, {voices[True]} in the enrolled "
+              f"voice; default margin {WakeWordDetector.THRESHOLD_MARGIN}")
+        for label, options in runs:
+            r = results[label] = evaluate(templates, negatives, positives, labels, **options)
+            hours = r['hours']
+            lost = r['lost'] or [0.0]
+            print(f"  {label:12} CPU {r['cpu'] / hours:5.1f} s per hour of ambient audio ({r['cpu'] / r['audio']:.3%} "
+                  f"of a core), ended at tier {r['tier']}")
+            rejected = {enrolled: r['rejected'][enrolled] / max(voices[enrolled], 1) for enrolled in (True, False)}
+            print(f"  {'':12} false accepts {r['accepted'] / hours:5.1f} per hour, false rejects {rejected[True]:6.1%} "
+                  f"enrolled voice, {rejected[False]:6.1%} other voices")
+            print(f"  {'':12} command audio lost p50 {statistics.median(lost) * 1000:.0f} ms, max {max(lost) * 1000:.0f} ms")
+
+        legacy = sum(legacy_recognizer_calls(path) for path in negatives)
+        print(f"recognizer calls per hour of this ambient audio: {legacy / hours:.0f} without a wake word, "
+              f"{results['tier 0']['accepted'] / hours:.0f} with it")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Barge-in on the pipelined loop: the user's voice interrupts playback, its echo does not"""
+import asyncio
+import io
+import math
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+from Ai import AsyncPipeline, StreamInput, VoiceAssistant
+
+RATE = 16000
+NOISE = 100.0
+
+
+def pcm(seconds, amplitude=0.0, pitch=220.0, noise=NOISE, seed=0):
+    """Mono 16-bit PCM: a tone of the given peak amplitude over gaussian noise"""
+    rng = random.Random(seed)
+    samples = (amplitude * math.sin(2 * math.pi * pitch * i / RATE) + rng.gauss(0, noise)
+               for i in range(int(seconds * RATE)))
+    return b''.join(struct.pack('<h', max(-32768, min(32767, int(x)))) for x in samples)
+
+
+def captured(*parts):
+    return sr.AudioData(b''.join(parts), RATE, 2)
+
+
+ECHO = captured(pcm(0.3), pcm(1.0, 3000, pitch=180, seed=1), pcm(0.3, seed=2))  # the response, heard back
+VOICE = captured(pcm(0.3), pcm(1.0, 12000, seed=3), pcm(0.3, seed=4))  # the user talking over it
+QUIET = captured(pcm(1.6, seed=5))  # just the room
+
+
+class FakeOutput:
+    def __init__(self):
+        self.interrupts = 0
+        self.spoken = []
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def interrupt(self):
+        self.interrupts += 1
+
+    def close(self):
+        pass
+
+
+class FakeInput:
+    def __init__(self, clips):
+        self.clips = iter(clips)
+        self.calibrator = types.SimpleNamespace(ambient=NOISE)
+
+    def capture(self):
+        return next(self.clips, None)
+
+
+def pipeline(clips=()):
+    assistant = types.SimpleNamespace(input=FakeInput(clips), output=FakeOutput())
+    return AsyncPipeline(assistant)
+
+
+def calibrated(clips=()):
+    """A pipeline that heard ECHO while the greeting played"""
+    p = pipeline(clips)
+    p.calibrating = True
+    assert not p.is_barge_in(ECHO)
+    p.calibrating = False
+    return p
+
+
+@pytest.mark.parametrize('audio, expected', [(VOICE, True), (ECHO, False), (QUIET, False)])
+def test_is_barge_in(audio, expected):
+    assert calibrated().is_barge_in(audio) is expected
+
+
+def test_greeting_calibrates_the_echo_floor():
+    p = pipeline()
+    p.calibrating = True
+    assert not p.is_barge_in(VOICE)  # nothing heard during the greeting interrupts it
+    assert not p.is_barge_in(QUIET)
+    assert p.echo_floor > 0.0
+
+
+def test_any_speech_barges_in_before_any_echo_was_heard():
+    p = pipeline()
+    assert p.is_barge_in(ECHO)
+    assert not p.is_barge_in(QUIET)
+    assert p.echo_floor is None
+
+
+def test_echo_floor_follows_dropped_echo():
+    p = calibrated()
+    floor = p.echo_floor
+    louder = captured(pcm(0.3), pcm(1.0, 4500, pitch=180, seed=6), pcm(0.3, seed=7))
+    assert not p.is_barge_in(louder)
+    assert p.echo_floor > floor
+
+
+def run_capture(p):
+    async def capture():
+        p.stopped = asyncio.Event()
+        p.speaking = True
+        audio_q = asyncio.Queue()
+        try:
+            await p.capture_stage(audio_q)
+        finally:
+            items = []
+            while not audio_q.empty():
+                items.append(audio_q.get_nowait())
+            p.items = items
+
+    try:
+        asyncio.run(capture())
+    finally:
+        for executor in p.executors.values():
+            executor.shutdown()
+    return p.items
+
+
+def test_capture_stage_interrupts_only_for_the_user():
+    p = calibrated([ECHO, VOICE, ECHO])
+    items = run_capture(p)
+    assert p.assistant.output.interrupts == 1
+    assert [item[0] for item in items[:-1]] == [VOICE]
+    assert items[-1] is AsyncPipeline.END
+
+
+def test_typed_input_always_interrupts():
+    p = calibrated(["stop the music"])
+    items = run_capture(p)
+    assert p.assistant.output.interrupts == 1
+    assert [item[0] for item in items[:-1]] == ["stop the music"]
+
+
+def test_failed_capture_still_ends_the_pipeline():
+    p = pipeline([b'not audio'])
+    with pytest.raises(AttributeError):
+        run_capture(p)
+    assert p.items == [AsyncPipeline.END]
+
+
+class SlowOutput(FakeOutput):
+    def say(self, text):
+        super().say(text)
+        time.sleep(0.2)
+
+
+def test_text_input_with_interruptible_output_finishes(tmp_path):
+    output = SlowOutput()  # typed commands arrive while the greeting is still playing
+    assistant = VoiceAssistant(StreamInput(io.StringIO("list tasks\nwhat's the weather\n")), output,
+                               db_path=str(tmp_path / 'assistant.db'))
+    thread = threading.Thread(target=assistant.run_pipelined, daemon=True)
+    try:
+        thread.start()
+        thread.join(10)
+        assert not thread.is_alive()
+        assert len(output.spoken) == 3
+        assert output.interrupts
+    finally:
+        assistant.close()
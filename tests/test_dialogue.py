@@ -0,0 +1,92 @@
+"""Multi-turn frames: follow-ups fill the pending frame, new commands abandon it"""
+import datetime
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import ManualClock, StreamInput, StreamOutput, VoiceAssistant
+
+NOW = datetime.datetime(2026, 3, 10, 8, 0)  # a Tuesday morning
+TOMORROW_9AM = datetime.datetime(2026, 3, 11, 9, 0)
+
+
+@pytest.fixture
+def assistant(tmp_path):
+    assistant = VoiceAssistant(StreamInput(io.StringIO()), StreamOutput(io.StringIO()),
+                               db_path=str(tmp_path / 'assistant.db'))
+    assistant.reminders.clock = ManualClock(NOW.timestamp())
+    yield assistant
+    assistant.close()
+
+
+def converse(assistant, *turns):
+    return [assistant.process_command(turn) for turn in turns]
+
+
+def reminders(assistant):
+    return [reminder.message for reminder in assistant.reminders.upcoming()]
+
+
+def test_task_frame_gives_way_to_another_module(assistant):
+    _, response = converse(assistant, "add task", "show my budget")
+    assert not response.startswith("Task added")
+    assert assistant.dialogue.pending is None
+    assert assistant.productivity_assistant.store.count() == 0
+
+
+def test_task_frame_takes_a_description_with_keywords_and_a_date(assistant):
+    _, response = converse(assistant, "add task", "finish the science homework tomorrow")
+    assert response.startswith("Task added: finish the science homework")
+
+
+@pytest.mark.parametrize('follow_up', ["list tasks", "show my budget"])
+def test_reminder_frame_gives_way_to_other_commands(assistant, follow_up):
+    converse(assistant, "set a reminder", follow_up)
+    assert assistant.dialogue.pending is None
+    assert reminders(assistant) == []
+
+
+def test_reminder_frame_takes_a_day_as_the_time(assistant):
+    _, response, done = converse(assistant, "set a reminder", "tomorrow", "water the plants")
+    assert response == "What should I remind you about?"
+    assert done.startswith("Okay, I'll remind you to water the plants")
+    reminder, = assistant.reminders.upcoming()
+    assert reminder.due_at == TOMORROW_9AM.timestamp()
+
+
+def test_a_new_reminder_replaces_the_pending_one(assistant):
+    first, second = converse(assistant, "remind me to pay rent", "remind me in five minutes to stretch")
+    assert first == "When should I remind you?"
+    assert second.startswith("Okay, I'll remind you to stretch")
+    assert reminders(assistant) == ["stretch"]
+
+
+def test_reminder_on_a_day_needs_no_follow_up(assistant):
+    first, second = converse(assistant, "remind me to pay rent on friday", "remind me in five minutes to stretch")
+    assert first.startswith("Okay, I'll remind you to pay rent")
+    assert second.startswith("Okay, I'll remind you to stretch")
+    assert sorted(reminders(assistant)) == ["pay rent", "stretch"]
+
+
+def test_reminder_with_a_day_and_a_time(assistant):
+    response, = converse(assistant, "remind me to call mom tomorrow at 9 am")
+    assert response == "Okay, I'll remind you to call mom at Wed 11 Mar 09:00."
+    reminder, = assistant.reminders.upcoming()
+    assert reminder.due_at == TOMORROW_9AM.timestamp()
+
+
+def test_expense_category_answer_is_not_taken_for_a_meal_command(assistant):
+    _, _, response = converse(assistant, "add expense", "12 dollars", "food")
+    assert "food" in response.lower()
+    assert assistant.dialogue.pending is None
+    assert assistant.finance_assistant.ledger.count == 1
+
+
+def test_complete_frame_takes_a_task_number(assistant):
+    converse(assistant, "add task buy milk")
+    _, response = converse(assistant, "complete task", "task 1")
+    assert response == "Marked task 1, buy milk, as complete."
@@ -0,0 +1,78 @@
+"""ExpenseLedger: categories, and the expense_totals rollup kept by triggers"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import ExpenseLedger, Storage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(str(tmp_path / 'expenses.db'))
+    yield storage
+    storage.close()
+
+
+def totals(storage):
+    return {(category, month): (round(total, 6), count) for category, month, total, count in storage.query(
+        'SELECT category, month, total, count FROM expense_totals WHERE count > 0')}
+
+
+def recount(storage):
+    return {(category, month): (round(total, 6), count) for category, month, total, count in storage.query(
+        'SELECT category, substr(date, 1, 7), SUM(amount), COUNT(*) FROM expenses GROUP BY 1, 2')}
+
+
+@pytest.mark.parametrize('category', [None, '', '  '])
+def test_missing_category_is_other(storage, category):
+    ledger = ExpenseLedger(storage)
+    assert ledger.add(4.5, category, 'parking', '2026-03-09')[1] == 'other'
+    assert ledger.month_total('other', '2026-03') == 4.5
+    assert totals(storage) == {('other', '2026-03'): (4.5, 1)}
+
+
+def test_import_without_a_category_column(storage, tmp_path):
+    path = tmp_path / 'expenses.csv'
+    path.write_text("amount,description,date\n3.25,bus,2026-03-01\n7,lunch,2026-03-02\n", encoding='utf-8')
+    ledger = ExpenseLedger(storage)
+    assert ledger.import_csv(str(path)) == 2
+    assert ledger.month_total('other', '2026-03') == 10.25
+
+
+def test_updates_move_expenses_between_totals(storage):
+    ledger = ExpenseLedger(storage)
+    ledger.add(12.0, 'food', '', '2026-03-09')
+    ledger.add(30.0, 'fun', '', '2026-03-10')
+    storage.write("UPDATE expenses SET category = 'fun', amount = 15.0 WHERE category = 'food'").result()
+    storage.write("UPDATE expenses SET date = '2026-04-01' WHERE amount = 30.0").result()
+    assert totals(storage) == recount(storage) == {('fun', '2026-03'): (15.0, 1), ('fun', '2026-04'): (30.0, 1)}
+    ledger.reload()
+    assert ledger.month_total('food', '2026-03') == 0.0
+    assert ledger.month_total('fun', '2026-04') == 30.0
+
+
+def test_migration_fills_in_missing_categories(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path, isolation_level=None)
+    for version, statements in Storage.MIGRATIONS[:7]:
+        for statement in statements:
+            conn.execute(statement)
+    conn.execute('PRAGMA user_version = 7')
+    conn.executemany('INSERT INTO expenses (amount, category, date) VALUES (?, ?, ?)',
+                     [(2.0, None, '2026-03-01'), (3.0, None, '2026-03-02'), (1.0, '', '2026-03-03'),
+                      (8.0, 'food', '2026-03-04')])
+    conn.close()
+
+    storage = Storage(path)
+    try:
+        assert totals(storage) == {('other', '2026-03'): (6.0, 3), ('food', '2026-03'): (8.0, 1)}
+        with pytest.raises(sqlite3.IntegrityError):
+            storage.write('INSERT INTO expenses (amount, category, date) VALUES (1.0, NULL, ?)', ('2026-03-05',)).result()
+        ExpenseLedger(storage).add(4.0, None, '', '2026-03-05')
+        assert totals(storage) == recount(storage)
+    finally:
+        storage.close()
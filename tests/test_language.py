@@ -0,0 +1,110 @@
+"""LanguageBuddy quizzes and the SM-2 review scheduler behind them"""
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import DialogueFrame, LanguageBuddy, ManualClock, ReviewScheduler, Storage, StreamInput, StreamOutput, VoiceAssistant
+
+
+@pytest.fixture
+def assistant(tmp_path):
+    assistant = VoiceAssistant(StreamInput(io.StringIO()), StreamOutput(io.StringIO()),
+                               db_path=str(tmp_path / 'assistant.db'))
+    yield assistant
+    assistant.close()
+
+
+def test_review_intervals_follow_sm2():
+    clock = ManualClock()
+    reviews = ReviewScheduler(clock=clock)
+    card, = reviews.enroll('spanish', [('red', 'rojo')])
+
+    for quality, interval in ((4, 1.0), (4, 6.0), (4, 15.0), (5, 37.5)):
+        reviews.review(card, quality)
+        assert card.interval_days == interval
+        assert card.due_at == clock.now + interval * ReviewScheduler.DAY
+    assert card.easiness == pytest.approx(2.6)
+
+
+def test_missed_card_comes_back_within_the_session():
+    clock = ManualClock()
+    reviews = ReviewScheduler(clock=clock)
+    card, = reviews.enroll('french', [('red', 'rouge')])
+    reviews.review(card, 4)
+    reviews.review(card, 4)
+
+    reviews.review(card, 1)
+    assert (card.repetitions, card.interval_days) == (0, 1.0)
+    assert card.due_at == clock.now + ReviewScheduler.RELEARN_SECONDS
+    assert card.easiness == pytest.approx(1.96)
+    assert reviews.next_due('french') is None
+    clock.now += ReviewScheduler.RELEARN_SECONDS
+    assert reviews.next_due('french') is card
+
+
+def test_easiness_has_a_floor():
+    reviews = ReviewScheduler(clock=ManualClock())
+    card, = reviews.enroll('german', [('red', 'rot')])
+    for _ in range(10):
+        reviews.review(card, 0)
+    assert card.easiness == ReviewScheduler.MIN_EASINESS
+
+
+def test_new_words_resume_where_the_last_ones_stopped(tmp_path):
+    order = [(f"word{i}", f"palabra{i}") for i in range(30)]
+    storage = Storage(str(tmp_path / 'cards.db'))
+    try:
+        reviews = ReviewScheduler(storage, clock=ManualClock())
+        reviews.enroll('spanish', [order[3]])  # already known, e.g. from before the cursor existed
+        assert [card.term for card in reviews.introduce('spanish', order, 5)] == [
+            "word0", "word1", "word2", "word4", "word5"]
+        storage.flush()
+
+        reloaded = ReviewScheduler(storage, clock=ManualClock())
+        assert reloaded.cursors == {'spanish': 6}
+        assert [card.term for card in reloaded.introduce('spanish', order, 3)] == ["word6", "word7", "word8"]
+        assert reloaded.introduce('spanish', order[:9], 3) == []
+    finally:
+        storage.close()
+
+
+def test_quiz_ends_after_a_fixed_number_of_cards():
+    buddy = LanguageBuddy(ReviewScheduler(clock=ManualClock()))
+    result = buddy.quiz('spanish')
+    for _ in range(LanguageBuddy.QUIZ_LENGTH):
+        assert isinstance(result, DialogueFrame)
+        result = result.step('no idea')
+    assert not isinstance(result, DialogueFrame)
+    assert f"{LanguageBuddy.QUIZ_LENGTH} cards" in result
+
+
+@pytest.mark.parametrize('command, intent', [
+    ("my wifi is not working", 'tech'),
+    ("remind me to call mom in 10 minutes", 'productivity'),
+    ("show my reminders", 'productivity'),
+    ("breathing exercise", 'wellness'),
+])
+def test_other_commands_end_the_quiz(assistant, command, intent):
+    assistant.process_command("spanish quiz")
+    assert assistant.dialogue.pending is not None
+
+    handled = []
+    handle = assistant.modules.handle
+    assistant.modules.handle = lambda name, text: handled.append(name) or handle(name, text)
+    response = assistant.process_command(command)
+
+    assert handled == [intent]
+    assert "Not quite" not in response
+    assert assistant.dialogue.stats['abandoned'] == 1
+
+
+def test_quiz_answers_are_still_graded(assistant):
+    question = assistant.process_command("spanish quiz")
+    assert question.startswith("What is ")
+    response = assistant.process_command("no idea")
+    assert response.startswith("Not quite")
+    assert assistant.dialogue.pending is not None
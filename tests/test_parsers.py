@@ -0,0 +1,117 @@
+"""Slot parsers used by the dialogue frames"""
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import parse_amount, parse_date, parse_free_text, parse_priority, parse_task_number, parse_when
+
+TODAY = datetime.date(2026, 3, 10)  # a Tuesday
+
+
+@pytest.mark.parametrize('text, date, rest', [
+    ("buy milk tomorrow", '2026-03-11', "buy milk"),
+    ("day after tomorrow", '2026-03-12', ""),
+    ("report due friday", '2026-03-13', "report"),
+    ("gym next tuesday", '2026-03-17', "gym"),
+    ("renew passport in 2 weeks", '2026-03-24', "renew passport"),
+    ("renew passport in three days", '2026-03-13', "renew passport"),
+    ("renew passport in twenty one days", '2026-03-31', "renew passport"),
+    ("taxes by 2026-04-15", '2026-04-15', "taxes by"),
+    ("dentist on may 1st", '2026-05-01', "dentist"),
+    ("dentist on the 3rd of june", '2026-06-03', "dentist"),
+    ("party on september 12", '2026-09-12', "party"),
+    ("party on sept 12", '2026-09-12', "party"),
+    ("trip jan 5", '2027-01-05', "trip"),
+])
+def test_parse_date(text, date, rest):
+    assert parse_date(text, TODAY) == (date, rest)
+
+
+@pytest.mark.parametrize('text', [
+    "read novel 2",
+    "call mary 5 times",
+    "fix the deck 3 times",
+    "juni 4",
+    "4 marches",
+])
+def test_words_starting_like_months_are_not_dates(text):
+    assert parse_date(text, TODAY) is None
+
+
+@pytest.mark.parametrize('text, seconds, rest', [
+    ("stretch in 10 minutes", 600, "stretch"),
+    ("stretch in five minutes", 300, "stretch"),
+    ("stretch in twenty five minutes", 1500, "stretch"),
+    ("call mom in an hour", 3600, "call mom"),
+    ("water plants in 2 days", 2 * 86400, "water plants"),
+])
+def test_parse_when_relative(text, seconds, rest):
+    now = 1_000_000.0
+    assert parse_when(text, now) == (now + seconds, rest)
+
+
+def test_parse_when_clock_time_is_the_next_one():
+    now = datetime.datetime(2026, 3, 10, 18, 0).timestamp()
+    due, rest = parse_when("call the dentist at 5 pm", now)
+    assert datetime.datetime.fromtimestamp(due) == datetime.datetime(2026, 3, 11, 17, 0)
+    assert rest == "call the dentist"
+    due, _ = parse_when("at 9:30 pm", now)
+    assert datetime.datetime.fromtimestamp(due) == datetime.datetime(2026, 3, 10, 21, 30)
+    assert parse_when("at 25:00", now) is None
+    assert parse_when("stretch later", now) is None
+
+
+@pytest.mark.parametrize('text, due, rest', [
+    ("call mom tomorrow at 9 am", datetime.datetime(2026, 3, 11, 9, 0), "call mom"),
+    ("call mom at 9 am tomorrow", datetime.datetime(2026, 3, 11, 9, 0), "call mom"),
+    ("pay rent on friday", datetime.datetime(2026, 3, 13, 9, 0), "pay rent"),
+    ("dentist on may 1st at 2:30 pm", datetime.datetime(2026, 5, 1, 14, 30), "dentist"),
+    ("stretch today at 8 pm", datetime.datetime(2026, 3, 10, 20, 0), "stretch"),
+])
+def test_parse_when_with_a_day(text, due, rest):
+    now = datetime.datetime(2026, 3, 10, 18, 0).timestamp()
+    assert parse_when(text, now) == (due.timestamp(), rest)
+
+
+def test_parse_when_a_day_already_past_is_none():
+    now = datetime.datetime(2026, 3, 10, 18, 0).timestamp()
+    assert parse_when("call mom today at 9 am", now) is None
+    assert parse_when("call mom yesterday", now) is None
+
+
+@pytest.mark.parametrize('text, amount', [
+    ("$12.50 on lunch", 12.5),
+    ("twenty five dollars for gas", 25),
+    ("spent 7 on coffee", 7),
+])
+def test_parse_amount(text, amount):
+    assert parse_amount(text)[0] == amount
+
+
+@pytest.mark.parametrize('text, priority', [
+    ("with high priority", 'high'),
+    ("priority is low", 'low'),
+    ("normal priority", 'medium'),
+    ("urgent", 'high'),
+])
+def test_parse_priority(text, priority):
+    assert parse_priority(text)[0] == priority
+
+
+@pytest.mark.parametrize('text, number', [
+    ("complete task 3", 3),
+    ("the second one", 2),
+    ("number seven", 7),
+    ("#12", 12),
+])
+def test_parse_task_number(text, number):
+    assert parse_task_number(text)[0] == number
+
+
+def test_parse_free_text_strips_connecting_words():
+    assert parse_free_text("to call the dentist please.") == ("call the dentist", '')
+    assert parse_free_text("to and for") is None
@@ -0,0 +1,160 @@
+"""ReminderScheduler driven by a fake clock, and the assistant announcing what it fires"""
+import io
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import ManualClock, ReminderScheduler, Storage, StreamInput, VoiceAssistant
+
+
+@pytest.fixture
+def clock():
+    return ManualClock()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(str(tmp_path / 'reminders.db'))
+    yield storage
+    storage.close()
+
+
+def messages(reminders):
+    return [reminder.message for reminder in reminders]
+
+
+def test_fires_in_due_order(clock):
+    fired = []
+    scheduler = ReminderScheduler(clock=clock, start=False, on_fire=fired.append)
+    for message, seconds in (("c", 300), ("a", 60), ("d", 301), ("b", 120)):
+        scheduler.add_in(message, seconds)
+
+    assert scheduler.run_pending() == []
+    clock.advance(120)
+    assert messages(scheduler.run_pending()) == ["a", "b"]
+    clock.advance(1000)
+    assert messages(scheduler.run_pending()) == ["c", "d"]
+    assert messages(fired) == ["a", "b", "c", "d"]
+    assert scheduler.run_pending() == []
+
+
+def test_cancelled_reminders_never_fire(clock):
+    scheduler = ReminderScheduler(clock=clock, start=False)
+    keep = scheduler.add_in("keep", 60)
+    drop = scheduler.add_in("drop", 30)
+
+    assert scheduler.cancel(drop.id)
+    assert not scheduler.cancel(drop.id)
+    assert not scheduler.cancel(keep.id, user_id='someone else')
+    assert scheduler.upcoming() == [keep]
+    clock.advance(60)
+    assert scheduler.run_pending() == [keep]
+    assert scheduler.stats['cancelled'] == 1
+
+
+def test_rescheduling_moves_the_due_time(clock):
+    scheduler = ReminderScheduler(clock=clock, start=False)
+    reminder = scheduler.add_in("stretch", 60)
+    scheduler.cancel(reminder.id)
+    moved = scheduler.add_in(reminder.message, 600)
+
+    clock.advance(60)
+    assert scheduler.run_pending() == []
+    clock.advance(540)
+    assert scheduler.run_pending() == [moved]
+
+
+def test_thread_wakes_for_a_sooner_reminder(clock):
+    fired = threading.Event()
+    scheduler = ReminderScheduler(clock=clock, on_fire=lambda reminder: fired.set())
+    try:
+        scheduler.add_in("later", 3600)
+        scheduler.add_in("sooner", 60)
+        clock.advance(60)
+        scheduler.wake()
+        assert fired.wait(5)
+        assert messages(scheduler.upcoming()) == ["later"]
+    finally:
+        scheduler.close()
+
+
+def test_pending_reminders_reload_after_restart(clock, storage):
+    scheduler = ReminderScheduler(storage, clock=clock, start=False)
+    scheduler.add_in("overdue by restart", 60)
+    scheduler.add_in("tomorrow", 86400)
+    cancelled = scheduler.add_in("cancelled", 120)
+    scheduler.add_in("other user", 60, user_id='bob')
+    scheduler.cancel(cancelled.id)
+    clock.advance(30)
+    scheduler.add_in("already fired", -1)
+    assert messages(scheduler.run_pending()) == ["already fired"]
+    storage.flush()
+
+    clock.advance(3600)
+    fired = []
+    restarted = ReminderScheduler(storage, clock=clock, start=False, on_fire=fired.append)
+    assert messages(restarted.upcoming()) == ["overdue by restart", "tomorrow"]
+    assert messages(restarted.run_pending()) == ["overdue by restart"]
+    assert restarted.add_in("new", 10).id > cancelled.id
+
+    storage.flush()
+
+    everyone = ReminderScheduler(storage, clock=clock, start=False, user_id=None)
+    assert sorted(messages(everyone.upcoming())) == ["new", "other user", "tomorrow"]
+
+
+class SpokenOutput:
+    def __init__(self):
+        self.spoken = []
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def close(self):
+        pass
+
+
+def test_delivered_marks_fired_only_when_asked(clock, storage):
+    scheduler = ReminderScheduler(storage, clock=clock, start=False, mark_fired=False)
+    spoken = scheduler.add_in("spoken", -1)
+    scheduler.add_in("unspoken", -1)
+    assert messages(scheduler.run_pending()) == ["spoken", "unspoken"]
+    scheduler.delivered([spoken])
+    storage.flush()
+    assert messages(ReminderScheduler(storage, clock=clock, start=False).upcoming()) == ["unspoken"]
+
+
+def test_assistant_marks_reminders_fired_once_spoken(tmp_path):
+    db_path = str(tmp_path / 'assistant.db')
+
+    def fired_flags():
+        with closing(sqlite3.connect(db_path)) as conn:
+            return conn.execute('SELECT message, fired FROM reminders').fetchall()
+
+    def fire_stretch(assistant):
+        announced = threading.Event()
+        assistant.announce_hook = announced.set
+        assistant.reminders.add_in("stretch", -1)
+        assert announced.wait(5)
+
+    # Fired but never spoken: still pending after a restart
+    assistant = VoiceAssistant(StreamInput(io.StringIO()), SpokenOutput(), db_path=db_path)
+    fire_stretch(assistant)
+    assistant.close()
+    assert fired_flags() == [("stretch", 0)]
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute('DELETE FROM reminders')
+        conn.commit()
+    assistant = VoiceAssistant(StreamInput(io.StringIO()), SpokenOutput(), db_path=db_path)
+    fire_stretch(assistant)
+    assistant.run()
+    assert "Reminder: stretch" in assistant.output.spoken
+    assistant.close()
+    assert fired_flags() == [("stretch", 1)]
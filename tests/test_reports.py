@@ -0,0 +1,113 @@
+"""Reporting rollups kept up to date from the change log"""
+import datetime
+import os
+import random
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import ExpenseLedger, MealLog, Reports, Storage, TaskStore
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(str(tmp_path / 'reports.db'))
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def pacific(monkeypatch):
+    """Run in a time zone behind UTC, so UTC and local days differ in the evening"""
+    monkeypatch.setenv('TZ', 'America/Los_Angeles')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def recompute(storage, reports):
+    """Every rollup row computed from scratch: (user, source, grain, bucket, key) -> (total, count, days)"""
+    rows = {}
+    sources = {
+        'expenses': 'SELECT user_id, date, category, amount FROM expenses',
+        'tasks': "SELECT user_id, date(created_at, 'localtime'), COALESCE(priority, ''), completed FROM tasks",
+        'meals': "SELECT user_id, date, COALESCE(meal_type, ''), COALESCE(calories, 0) FROM meals",
+    }
+    for source, sql in sources.items():
+        for user_id, day, key, value in storage.query(sql):
+            for k in (key, '*'):
+                for grain, bucket in zip(Reports.GRAINS, (day, *reports.periods(day))):
+                    entry = rows.setdefault((user_id, source, grain, bucket, k), [0.0, 0, set()])
+                    entry[0] += value
+                    entry[1] += 1
+                    entry[2].add(day)
+    return {key: (round(total, 6), count, 0 if key[2] == 'day' else len(days))
+            for key, (total, count, days) in rows.items()}
+
+
+def rollups(storage, reports):
+    reports.refresh()
+    return {tuple(row[:5]): (round(row[5], 6), row[6], row[7]) for row in storage.query('SELECT * FROM rollups')}
+
+
+def test_rollups_match_a_full_recompute(storage):
+    reports = Reports(storage)
+    rng = random.Random(1)
+
+    def day():
+        return (datetime.date(2026, 1, 1) + datetime.timedelta(rng.randrange(200))).isoformat()
+
+    for user_id in ('alice', 'bob'):
+        ledger, tasks, meals = ExpenseLedger(storage, user_id), TaskStore(storage, user_id), MealLog(storage, user_id)
+        for i in range(300):
+            r = rng.random()
+            if r < 0.3:
+                ledger.add(rng.uniform(1, 50), rng.choice(['food', 'rent', 'fun']), '', day())
+            elif r < 0.5:
+                storage.write('INSERT INTO tasks (task, priority, created_at, user_id) VALUES (?, ?, ?, ?)',
+                              ('task', rng.choice(['high', 'low', None]), f"{day()} {rng.randrange(24):02d}:00:00",
+                               user_id)).result()
+            elif r < 0.6:
+                ids = [task_id for (task_id,) in storage.query(
+                    'SELECT id FROM tasks WHERE user_id = ? AND completed = 0', (user_id,))]
+                if ids:
+                    tasks.complete(rng.choice(ids))
+            elif r < 0.7:
+                ids = [expense_id for (expense_id,) in storage.query('SELECT id FROM expenses WHERE user_id = ?', (user_id,))]
+                if ids:
+                    storage.write('DELETE FROM expenses WHERE id = ?', (rng.choice(ids),)).result()
+            elif r < 0.85:
+                meals.log_days({day(): [('meal', meal_type, rng.randrange(200, 900), '') for meal_type in
+                                        rng.sample(['breakfast', 'lunch', 'dinner'], rng.randrange(0, 4))]})
+            if i % 50 == 49:
+                assert rollups(storage, reports) == recompute(storage, reports)
+    assert rollups(storage, reports) == recompute(storage, reports)
+    assert storage.query('SELECT COUNT(*) FROM change_log') == [(0,)]
+
+
+def test_tasks_are_counted_on_their_local_day(storage, pacific):
+    reports = Reports(storage)
+    # 03:00 UTC on March 10th is still the evening of March 9th in California
+    storage.write("INSERT INTO tasks (task, created_at, user_id) VALUES ('late', '2026-03-10 03:00:00', 'local')").result()
+    ExpenseLedger(storage, 'local').add(12.0, 'food', '', '2026-03-09')
+    assert [bucket for bucket, *_ in reports.rows('local', 'tasks', 'day')] == ['2026-03-09']
+    assert [bucket for bucket, *_ in reports.rows('local', 'expenses', 'day')] == ['2026-03-09']
+
+
+def test_background_refresh_keeps_the_change_log_small(storage):
+    reports = Reports(storage, interval=0.01)
+    try:
+        ExpenseLedger(storage, 'local').add(5.0, 'coffee', '', '2026-03-09')
+        storage.flush()
+        deadline = time.monotonic() + 5
+        while storage.query('SELECT COUNT(*) FROM change_log') != [(0,)] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert storage.query('SELECT COUNT(*) FROM change_log') == [(0,)]
+        assert storage.query("SELECT total FROM rollups WHERE source = 'expenses' AND grain = 'month' AND key = '*'") \
+            == [(5.0,)]
+    finally:
+        reports.close()
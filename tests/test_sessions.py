@@ -0,0 +1,49 @@
+"""SessionServer: reminders reach their user even when the session was evicted"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import Reminder, SessionServer
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'sessions.db')
+
+
+def request(server, user_id, command="what's the weather"):
+    return asyncio.run(server.handle({'user': user_id, 'command': command}))
+
+
+def test_reminder_survives_session_eviction(db_path):
+    server = SessionServer(db_path, max_sessions=1, idle_timeout=0.0)
+    try:
+        request(server, 'alice')
+        server.remind(Reminder(1, "stretch", 0.0, 'alice'))
+        server.remind(Reminder(2, "drink water", 0.0, 'alice'))
+        request(server, 'bob')  # pushes alice out of the one session slot
+        server.evict_idle()
+        assert 'alice' not in server.sessions
+        assert request(server, 'bob')['announcements'] == []
+
+        assert request(server, 'alice')['announcements'] == ["Reminder: stretch", "Reminder: drink water"]
+        assert request(server, 'alice')['announcements'] == []
+    finally:
+        server.close()
+
+
+def test_reminder_survives_a_restart(db_path):
+    server = SessionServer(db_path)
+    server.remind(Reminder(1, "call mom", 0.0, 'carol'))
+    server.close()
+
+    server = SessionServer(db_path)
+    try:
+        assert request(server, 'carol')['announcements'] == ["Reminder: call mom"]
+    finally:
+        server.close()
+
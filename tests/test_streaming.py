@@ -0,0 +1,90 @@
+"""StreamingSpeechOutput: how responses are cut into chunks, and speaking without a player"""
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import StreamingSpeechOutput
+
+WORDS = ("Here are some spanish words: house is casa, cat is gato, dog is perro, book is libro, "
+         "school is escuela, car is coche, city is ciudad, day is día, night is noche, time is tiempo, "
+         "work is trabajo, to eat is comer, to drink is beber.")
+
+
+class FakeEngine:
+    def __init__(self):
+        self.said = []
+        self.saved = []
+
+    def getProperty(self, name):
+        return [types.SimpleNamespace(id='voice-0'), types.SimpleNamespace(id='voice-1')]
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, text):
+        self.said.append(text)
+
+    def save_to_file(self, text, path):
+        self.saved.append(text)
+        with open(path, 'wb') as f:
+            f.write(text.encode('utf-8'))
+
+    def runAndWait(self):
+        pass
+
+
+class FakePlayer:
+    def __init__(self, available=True):
+        self.available = available
+        self.played = []
+
+    def play(self, path, data):
+        self.played.append(data.decode('utf-8'))
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def output(tmp_path):
+    output = StreamingSpeechOutput(cache_dir=str(tmp_path), tts_engine=FakeEngine(), player=FakePlayer())
+    yield output
+    output.close()
+
+
+def test_sentences_become_chunks(output):
+    text = "The first sentence is long enough to stand alone. So is the second one, just about."
+    assert output.split(text) == ["The first sentence is long enough to stand alone.",
+                                  "So is the second one, just about."]
+
+
+def test_short_sentences_are_merged(output):
+    assert output.split("Okay. Your task list is empty right now.") == ["Okay. Your task list is empty right now."]
+
+
+def test_long_sentences_are_cut_at_clauses(output):
+    chunks = output.split(WORDS)
+    assert len(chunks) > 1
+    assert " ".join(chunks) == WORDS
+    assert all(len(chunk) <= output.max_chunk_chars for chunk in chunks)
+    assert chunks[0].startswith("Here are some spanish words: house is casa,")
+
+
+def test_chunks_play_in_order(output):
+    output.say(WORDS)
+    assert " ".join(output.player.played) == WORDS
+
+
+def test_speaks_live_without_a_player(tmp_path):
+    engine = FakeEngine()
+    output = StreamingSpeechOutput(cache_dir=str(tmp_path), tts_engine=engine, player=FakePlayer(available=False))
+    try:
+        output.say(WORDS)
+    finally:
+        output.close()
+    assert engine.said == [WORDS]
+    assert engine.saved == []
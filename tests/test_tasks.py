@@ -0,0 +1,36 @@
+"""Task listings: which phrasings reach which TaskStore query"""
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Ai import StreamInput, StreamOutput, VoiceAssistant
+
+
+@pytest.fixture
+def assistant(tmp_path):
+    assistant = VoiceAssistant(StreamInput(io.StringIO()), StreamOutput(io.StringIO()),
+                               db_path=str(tmp_path / 'assistant.db'))
+    assistant.productivity_assistant.store.add_many([
+        ("file taxes", "high", None),
+        ("water plants", "low", None),
+        ("call the bank", "high", None),
+    ])
+    yield assistant
+    assistant.close()
+
+
+@pytest.mark.parametrize('command', ["show high priority tasks", "list high priority tasks",
+                                     "what are my high priority tasks", "list tasks high priority"])
+def test_high_priority_filter(assistant, command):
+    response = assistant.process_command(command)
+    assert "file taxes" in response and "call the bank" in response
+    assert "water plants" not in response
+
+
+def test_list_tasks_shows_every_open_task(assistant):
+    response = assistant.process_command("list tasks")
+    assert all(task in response for task in ("file taxes", "water plants", "call the bank"))